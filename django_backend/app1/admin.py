@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import WritingSession, Paragraph, EnhancementLog
+from .models import WritingSession, Paragraph, EnhancementLog, Job, UserStats
 
 admin.site.register(WritingSession)
 admin.site.register(Paragraph)
-admin.site.register(EnhancementLog)
\ No newline at end of file
+admin.site.register(EnhancementLog)
+admin.site.register(Job)
+admin.site.register(UserStats)
\ No newline at end of file
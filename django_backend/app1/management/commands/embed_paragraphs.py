@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app1.models import Paragraph
+from app1.services.ml_client import call_embed
+from app1.services.stats import invalidate_on_commit
+from app1.services.vector_index import decode_embedding
+
+
+class Command(BaseCommand):
+    help = "Embed paragraphs that have no stored embedding yet (e.g. typed in by hand)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--user", help="Only this username's paragraphs.")
+
+    def handle(self, *args, **options):
+
+        pending = (
+            Paragraph.objects.filter(embedding__isnull=True)
+            .select_related("session")
+            .only("id", "content", "session__user_id")
+            .order_by("id")
+        )
+        if options["user"]:
+            pending = pending.filter(session__user__username=options["user"])
+
+        done = 0
+        last_id = 0
+
+        while True:
+            batch = list(pending.filter(id__gt=last_id)[:options["batch_size"]])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            ml_result = call_embed([p.content for p in batch])
+            if "error" in ml_result:
+                raise CommandError(f"ML service error after {done} paragraph(s): {ml_result['error']}")
+
+            for paragraph, packed in zip(batch, ml_result["embeddings"]):
+                paragraph.embedding = decode_embedding(packed)
+
+            with transaction.atomic():
+                Paragraph.objects.bulk_update(batch, ["embedding"])
+                for user_id in {p.session.user_id for p in batch}:
+                    invalidate_on_commit(user_id)
+
+            done += len(batch)
+            self.stdout.write(f"Embedded {done} paragraph(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {done} paragraph(s) embedded"))
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app1.models import UserStats
+from app1.services.stats import COUNTERS, count_for_user, reconcile_user
+
+
+class Command(BaseCommand):
+    help = "Recount the per-user dashboard counters (UserStats) from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", help="Username to reconcile (repeatable).")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted counters without writing them.",
+        )
+
+    def handle(self, *args, **options):
+
+        users = User.objects.order_by("id")
+        if options["user"]:
+            users = users.filter(username__in=options["user"])
+
+        stored = {
+            stats.user_id: stats
+            for stats in UserStats.objects.filter(user__in=users)
+        }
+        drifted = 0
+
+        for user in users.iterator():
+            expected = count_for_user(user.id)
+            current = stored.get(user.id)
+
+            if current is not None and all(
+                getattr(current, name) == expected[name] for name in COUNTERS
+            ):
+                continue
+
+            drifted += 1
+            before = {name: getattr(current, name) for name in COUNTERS} if current else None
+            self.stdout.write(f"{user.username}: {before} -> {expected}")
+
+            if not options["dry_run"]:
+                with transaction.atomic():
+                    reconcile_user(user.id, expected)
+
+        verb = "Found" if options["dry_run"] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {drifted} drifted user(s)"))
@@ -0,0 +1,87 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from app1.services.jobs import claim_next_job, requeue_stale_jobs, run_job, run_pending_jobs
+
+
+def worker_loop(poll_interval, stop_event):
+    # Each process opens its own database connection on first use.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while not stop_event.is_set():
+        close_old_connections()
+        job = claim_next_job()
+
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        run_job(job)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run background AI jobs with a local pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--poll-interval", type=float, default=0.5)
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=900,
+            help="Requeue jobs that have been running longer than this many seconds.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every pending job in this process, then exit.",
+        )
+
+    def handle(self, *args, **options):
+
+        requeued = requeue_stale_jobs(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        if options["once"]:
+            count = run_pending_jobs()
+            self.stdout.write(f"Ran {count} job(s)")
+            return
+
+        # Forked children must not share the parent's DB connection.
+        connections.close_all()
+
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=worker_loop,
+                args=(options["poll_interval"], stop_event),
+                daemon=True,
+            )
+            for _ in range(options["processes"])
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        self.stdout.write(f"Started {len(workers)} job worker(s)")
+
+        def stop(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, stop)
+
+        try:
+            while not stop_event.is_set() and any(w.is_alive() for w in workers):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            stop_event.set()
+
+        for worker in workers:
+            worker.join()
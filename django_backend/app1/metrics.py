@@ -0,0 +1,56 @@
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+
+# Seconds; from single queries up to full ML round trips
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Prometheus text format, served at /metrics from prometheus_client's
+# default registry (which adds the process / GC series). Series are per
+# process, like the rest of the in-memory state here; scrape every worker.
+disable_created_metrics()
+
+
+def render():
+    return generate_latest().decode()
+
+
+# ------------------------
+# SERIES
+# ------------------------
+
+REQUEST_SECONDS = Histogram(
+    "django_request_seconds", "HTTP request latency.", ["route", "method", "status"], buckets=DEFAULT_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("django_requests_in_flight", "HTTP requests being served.")
+
+DB_SECONDS = Histogram("django_db_seconds", "Database time per request.", ["route"], buckets=DEFAULT_BUCKETS)
+DB_QUERIES = Counter("django_db_queries_total", "Queries executed.", ["route"])
+
+ML_CALL_SECONDS = Histogram(
+    "django_ml_call_seconds", "ML service call latency.", ["endpoint", "outcome"], buckets=DEFAULT_BUCKETS
+)
+ML_IN_FLIGHT = Gauge("django_ml_in_flight", "ML service calls in flight.", ["endpoint"])
+ML_REJECTED = Counter("django_ml_rejected_total", "ML calls refused by the client (busy / circuit open).", ["endpoint"])
+
+
+# ------------------------
+# REQUEST CONTEXT
+# ------------------------
+
+request_id = ContextVar("request_id", default=None)
+
+# Milliseconds spent in the database and the ML service by the current request
+request_timings = ContextVar("request_timings", default=None)
+
+
+def add_timing(name, seconds):
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0) + seconds * 1000, 2)
+
+
+def trace_headers():
+    """Headers that carry the current request id to the ML service."""
+    rid = request_id.get()
+    return {"X-Request-ID": rid} if rid else {}
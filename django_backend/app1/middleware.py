@@ -0,0 +1,129 @@
+import json
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import (
+    DB_QUERIES,
+    DB_SECONDS,
+    REQUEST_SECONDS,
+    REQUESTS_IN_FLIGHT,
+    add_timing,
+    request_id,
+    request_timings,
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    Request latency, in-flight and database-time series, an
+    ``X-Request-ID`` (kept from the caller or generated) that ml_client
+    forwards to the ML service, and the optional per-request timing log.
+
+    A streaming response is measured until its body is exhausted: the
+    request id and timings stay set while the body is produced, since
+    that is when the streaming views call the ML service.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        rid = request.headers.get("X-Request-ID", "")[:64] or uuid.uuid4().hex
+        request.request_id = rid
+        trace = {"rid": rid, "timings": {}, "queries": 0, "started": time.perf_counter()}
+        REQUESTS_IN_FLIGHT.inc()
+
+        try:
+            with self.traced(trace):
+                response = self.get_response(request)
+            response["X-Request-ID"] = rid
+        except BaseException:
+            self.finish(request, None, trace)
+            raise
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = TracedStream(self, request, response, trace)
+        else:
+            self.finish(request, response, trace)
+
+        return response
+
+    @contextmanager
+    def traced(self, trace):
+        """Set the request context and count database time while the block runs."""
+
+        def time_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                trace["queries"] += 1
+                add_timing("db", time.perf_counter() - started)
+
+        rid_token = request_id.set(trace["rid"])
+        timings_token = request_timings.set(trace["timings"])
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(time_query))
+                yield
+        finally:
+            request_timings.reset(timings_token)
+            request_id.reset(rid_token)
+
+    def finish(self, request, response, trace):
+        elapsed = time.perf_counter() - trace["started"]
+        REQUESTS_IN_FLIGHT.dec()
+
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+        status = response.status_code if response is not None else 500
+        timings = trace["timings"]
+
+        REQUEST_SECONDS.labels(route=route, method=request.method, status=status).observe(elapsed)
+        DB_SECONDS.labels(route=route).observe(timings.get("db", 0) / 1000)
+        DB_QUERIES.labels(route=route).inc(trace["queries"])
+
+        if settings.REQUEST_TIMING_LOG:
+            print(json.dumps({
+                "request_id": trace["rid"],
+                "method": request.method,
+                "route": route,
+                "status": status,
+                "ms": round(elapsed * 1000, 2),
+                "db_queries": trace["queries"],
+                "timings_ms": timings,
+            }))
+
+
+class TracedStream:
+    """
+    A streaming body run inside the request's trace. The request is
+    recorded when the body is exhausted or, if it never is, when the
+    server closes the response.
+    """
+
+    def __init__(self, middleware, request, response, trace):
+        self.middleware = middleware
+        self.request = request
+        self.response = response
+        self.trace = trace
+        self.content = response.streaming_content
+        self.finished = False
+
+    def __iter__(self):
+        try:
+            with self.middleware.traced(self.trace):
+                yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.finished:
+            self.finished = True
+            self.middleware.finish(self.request, self.response, self.trace)
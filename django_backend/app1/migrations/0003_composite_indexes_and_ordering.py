@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0002_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='enhancementlog',
+            options={'ordering': ['created_at', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='job',
+            options={'ordering': ['created_at', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='paragraph',
+            options={'ordering': ['created_at', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='writingsession',
+            options={'ordering': ['created_at', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='enhancementlog',
+            index=models.Index(fields=['created_at', 'id'], name='enhancement_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='job_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paragraph',
+            index=models.Index(fields=['session', 'created_at', 'id'], name='paragraph_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='writingsession',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='session_user_created_idx'),
+        ),
+    ]
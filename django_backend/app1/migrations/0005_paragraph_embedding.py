@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0004_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paragraph',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0007_drop_job_status_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='enhancementlog',
+            name='enhancement_created_idx',
+        ),
+    ]
@@ -7,6 +7,12 @@ class WritingSession(models.Model):
     title = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="session_user_created_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -17,8 +23,16 @@ class Paragraph(models.Model):
     drift_score = models.FloatField(null=True, blank=True)
     consistency_score = models.FloatField(null=True, blank=True)
     emotion = models.CharField(max_length=100, null=True, blank=True)
+    # MiniLM vector as raw float32 bytes (see services/vector_index.py)
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(fields=["session", "created_at", "id"], name="paragraph_session_created_idx"),
+        ]
+
     def __str__(self):
         return f"Paragraph {self.id}"
 
@@ -32,5 +46,92 @@ class EnhancementLog(models.Model):
     readability_after = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Reached through the paragraph (unique paragraph_id); no created_at index
+        ordering = ["created_at", "id"]
+
+    def __str__(self):
+        return f"Enhancement for Paragraph {self.paragraph.id}"
+
+
+class Job(models.Model):
+    KIND_GENERATE = "generate"
+    KIND_WRITER = "writer"
+    KIND_ENHANCE = "enhance"
+
+    KIND_CHOICES = [
+        (KIND_GENERATE, "Generate"),
+        (KIND_WRITER, "Writer"),
+        (KIND_ENHANCE, "Enhance"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    ]
+
+    TERMINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="jobs")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "idempotency_key"],
+                name="unique_job_idempotency_key"
+            )
+        ]
+        indexes = [
+            # The worker's "oldest pending job" lookup; its status prefix
+            # also serves the status-only filters (stale-job requeue)
+            models.Index(fields=["status", "created_at", "id"], name="job_status_created_idx"),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in self.TERMINAL_STATUSES
+
+    def __str__(self):
+        return f"Job {self.id} ({self.kind}, {self.status})"
+
+
+class UserStats(models.Model):
+    """
+    Per-user dashboard counters, kept in step with the writes in
+    services/persistence.py and the create/delete views (see
+    services/stats.py). ``manage.py reconcile_stats`` rebuilds them.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    sessions = models.IntegerField(default=0)
+    paragraphs = models.IntegerField(default=0)
+    enhancements = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def ai_operations(self):
+        return self.paragraphs + self.enhancements
+
     def __str__(self):
-        return f"Enhancement for Paragraph {self.paragraph.id}"
\ No newline at end of file
+        return f"Stats for {self.user}"
@@ -0,0 +1,103 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward keyset pagination on (created_at, id).
+
+    Unlike offset pagination, every page is an index range scan no matter
+    how deep it is, and rows inserted meanwhile never shift the window.
+
+    Query parameters:
+      cursor  opaque position returned as ``next`` / ``cursor``
+      since   id of the last row the client already has; only newer rows
+              are returned (incremental refresh). If that row has since
+              been deleted, the nearest lower id in the listing is used.
+      limit   page size, capped at ``max_page_size``
+
+    Response: ``{"results": [...], "next": <cursor|null>, "cursor": <cursor|null>}``.
+    ``next`` is set while more rows exist; ``cursor`` always points after
+    the last row returned, so it can be stored and replayed later.
+    """
+
+    page_size = 50
+    max_page_size = 200
+
+    def encode_cursor(self, row):
+        raw = json.dumps([row.created_at.isoformat(), row.id])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            created_at = parse_datetime(created_at)
+        except (ValueError, TypeError):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+        if created_at is None:
+            raise ValidationError({"cursor": "Invalid cursor."})
+        return created_at, int(row_id)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get("limit", self.page_size))
+        except ValueError:
+            limit = self.page_size
+        return max(1, min(limit, self.max_page_size))
+
+    def get_position(self, queryset, request):
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            return self.decode_cursor(cursor)
+
+        since = request.query_params.get("since")
+        if since:
+            try:
+                since = int(since)
+            except ValueError:
+                raise ValidationError({"since": "Must be an id."})
+            # Ids grow with created_at, so the nearest lower id is the
+            # last row the client can still have; none left means every
+            # row is newer than ``since``.
+            return (
+                queryset.filter(id__lte=since)
+                .order_by("-id")
+                .values_list("created_at", "id")
+                .first()
+            )
+
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        limit = self.get_limit(request)
+        position = self.get_position(queryset, request)
+
+        queryset = queryset.order_by("created_at", "id")
+
+        if position is not None:
+            created_at, row_id = position
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=row_id)
+            )
+
+        rows = list(queryset[:limit + 1])
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+
+        self.cursor = self.encode_cursor(rows[-1]) if rows else request.query_params.get("cursor")
+        self.next = self.cursor if has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "results": data,
+            "next": self.next,
+            "cursor": self.cursor,
+        })
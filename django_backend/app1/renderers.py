@@ -0,0 +1,32 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets streaming views pass DRF content negotiation for
+    ``Accept: text/event-stream``. Successful responses are
+    StreamingHttpResponses and bypass rendering; anything DRF does render
+    here (validation errors, 404s) is sent as a single ``error`` event.
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode(self.charset)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Prometheus text exposition format; the view hands over the finished text."""
+
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset) if isinstance(data, str) else json.dumps(data).encode(self.charset)
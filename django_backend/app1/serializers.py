@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import WritingSession, Paragraph, EnhancementLog
+from .models import WritingSession, Paragraph, EnhancementLog, Job
 
 
 # ------------------------
@@ -38,10 +38,40 @@ class ParagraphSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Paragraph
-        fields = "__all__"
+        fields = [
+            "id", "session", "content", "drift_score", "consistency_score",
+            "emotion", "created_at",
+        ]
         read_only_fields = ["drift_score", "consistency_score", "emotion", "created_at"]
 
 
+class ParagraphListSerializer(serializers.ModelSerializer):
+    """
+    List representation without the full text. ``preview``,
+    ``content_length`` and ``enhanced`` are computed in the database
+    (see ListParagraphView), so the content column is never loaded.
+    """
+
+    preview = serializers.CharField(read_only=True)
+    content_length = serializers.IntegerField(read_only=True)
+    enhanced = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Paragraph
+        fields = [
+            "id", "session", "preview", "content_length", "enhanced",
+            "drift_score", "consistency_score", "emotion", "created_at",
+        ]
+        read_only_fields = fields
+
+
+class ParagraphFullListSerializer(ParagraphListSerializer):
+
+    class Meta(ParagraphListSerializer.Meta):
+        fields = ParagraphListSerializer.Meta.fields + ["content"]
+        read_only_fields = fields
+
+
 # ------------------------
 # ENHANCEMENT LOG
 # ------------------------
@@ -69,6 +99,29 @@ class EnhanceParagraphSerializer(serializers.Serializer):
     )
 
 
+class BatchEnhanceSerializer(serializers.Serializer):
+    session_id = serializers.IntegerField(required=False)
+    paragraph_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+        max_length=500
+    )
+    tone = serializers.ChoiceField(
+        choices=["formal", "casual", "academic", "storyteller", "technical", "persuasive"],
+        default="formal"
+    )
+    level = serializers.ChoiceField(
+        choices=["low", "medium", "high"],
+        default="medium"
+    )
+
+    def validate(self, attrs):
+        if "session_id" not in attrs and "paragraph_ids" not in attrs:
+            raise serializers.ValidationError("Provide session_id or paragraph_ids.")
+        return attrs
+
+
 class GenerateSerializer(serializers.Serializer):
     session_id = serializers.IntegerField()
     prompt = serializers.CharField()
@@ -89,4 +142,45 @@ class WriterSerializer(serializers.Serializer):
     language = serializers.CharField(default="english")
 
     target_words = serializers.IntegerField(required=False)
-    target_sentences = serializers.IntegerField(required=False)
\ No newline at end of file
+    target_sentences = serializers.IntegerField(required=False)
+
+
+# ------------------------
+# ANALYTICS
+# ------------------------
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    bins = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    bucket = serializers.ChoiceField(choices=["hour", "day", "week", "month"], default="day")
+    days = serializers.IntegerField(min_value=1, max_value=3650, default=90)
+
+
+# ------------------------
+# SEARCH
+# ------------------------
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=2000)
+    k = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    session_id = serializers.IntegerField(required=False)
+
+
+# ------------------------
+# BACKGROUND JOBS
+# ------------------------
+
+class JobSubmitSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=[choice for choice, _ in Job.KIND_CHOICES])
+    payload = serializers.DictField()
+    idempotency_key = serializers.CharField(max_length=255, required=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "result", "error", "idempotency_key",
+            "cancel_requested", "attempts", "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,158 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, IntegerField, Value
+from django.db.models.functions import Cast, Floor, Greatest, Least, TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from ..models import EnhancementLog, Paragraph
+
+
+TRUNCATE = {
+    "hour": TruncHour,
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+# ------------------------
+# CACHE
+# ------------------------
+# Every cached result for a user carries the user's current version in its
+# key, so one incr() on write drops all of them (per user and per session,
+# whatever the query parameters were).
+
+def version_key(user_id):
+    return f"analytics-version:{user_id}"
+
+
+def current_version(user_id):
+    # Seeded from the clock so an evicted version never matches old entries.
+    return cache.get_or_set(version_key(user_id), time.time_ns(), None)
+
+
+def invalidate_analytics(user_id):
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        pass  # nothing cached for this user
+
+
+# ------------------------
+# AGGREGATES
+# ------------------------
+
+def histogram(paragraphs, field, bins):
+    """Counts of ``field`` over ``bins`` equal buckets of [0, 1], in one GROUP BY."""
+
+    bucket = Greatest(
+        Least(Cast(Floor(F(field) * bins), IntegerField()), Value(bins - 1)),
+        Value(0)
+    )
+    rows = (
+        paragraphs.filter(**{f"{field}__isnull": False})
+        .annotate(bucket=bucket)
+        .values("bucket")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    counts = {row["bucket"]: row["count"] for row in rows}
+
+    return [
+        {
+            "start": round(i / bins, 4),
+            "end": round((i + 1) / bins, 4),
+            "count": counts.get(i, 0),
+        }
+        for i in range(bins)
+    ]
+
+
+def emotion_distribution(paragraphs):
+    rows = (
+        paragraphs.exclude(emotion__isnull=True)
+        .exclude(emotion="")
+        .values("emotion")
+        .annotate(count=Count("id"))
+        .order_by("-count", "emotion")
+    )
+    return list(rows)
+
+
+def paragraph_trend(paragraphs, bucket):
+    rows = (
+        paragraphs.annotate(bucket=TRUNCATE[bucket]("created_at"))
+        .values("bucket")
+        .annotate(
+            paragraphs=Count("id"),
+            avg_drift=Avg("drift_score"),
+            avg_consistency=Avg("consistency_score"),
+        )
+        .order_by("bucket")
+    )
+    return list(rows)
+
+
+def readability_trend(logs, bucket):
+    rows = (
+        logs.annotate(bucket=TRUNCATE[bucket]("created_at"))
+        .values("bucket")
+        .annotate(
+            enhancements=Count("id"),
+            avg_before=Avg("readability_before"),
+            avg_after=Avg("readability_after"),
+        )
+        .order_by("bucket")
+    )
+    return list(rows)
+
+
+def compute_analytics(user_id, session_id=None, bins=10, bucket="day", days=90):
+
+    paragraphs = Paragraph.objects.filter(session__user_id=user_id)
+    logs = EnhancementLog.objects.filter(paragraph__session__user_id=user_id)
+
+    if session_id is not None:
+        paragraphs = paragraphs.filter(session_id=session_id)
+        logs = logs.filter(paragraph__session_id=session_id)
+
+    # Trends cover the last ``days``; distributions cover everything.
+    since = timezone.now() - timedelta(days=days)
+
+    summary = paragraphs.aggregate(
+        paragraphs=Count("id"),
+        avg_drift=Avg("drift_score"),
+        avg_consistency=Avg("consistency_score"),
+    )
+    summary.update(logs.aggregate(
+        enhancements=Count("id"),
+        avg_readability_before=Avg("readability_before"),
+        avg_readability_after=Avg("readability_after"),
+    ))
+
+    return {
+        "summary": summary,
+        "drift_histogram": histogram(paragraphs, "drift_score", bins),
+        "consistency_histogram": histogram(paragraphs, "consistency_score", bins),
+        "emotions": emotion_distribution(paragraphs),
+        "trend": paragraph_trend(paragraphs.filter(created_at__gte=since), bucket),
+        "readability_trend": readability_trend(logs.filter(created_at__gte=since), bucket),
+    }
+
+
+def get_analytics(user_id, session_id=None, bins=10, bucket="day", days=90):
+    """``compute_analytics`` behind the cache, for ANALYTICS_CACHE_TTL seconds."""
+
+    key = "analytics:{}:{}:{}:{}:{}:{}".format(
+        user_id, current_version(user_id), session_id or "all", bins, bucket, days
+    )
+
+    data = cache.get(key)
+    if data is None:
+        data = compute_analytics(user_id, session_id, bins, bucket, days)
+        cache.set(key, data, settings.ANALYTICS_CACHE_TTL)
+
+    return data
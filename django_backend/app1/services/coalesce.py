@@ -0,0 +1,64 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# ------------------------
+# SINGLE FLIGHT
+# ------------------------
+#
+# Guard for views that call the ML service and then persist the result:
+# identical requests from the same user that arrive while one is running
+# (double clicks, frontend retries), or within COALESCE['WINDOW'] seconds
+# after it finished, get its response instead of running and saving again.
+# The lock and the result live in the default cache, so the guard spans
+# processes when that cache is shared.
+
+def request_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def single_flight(key, fn):
+    """
+    ``(result, shared)``. ``fn()`` returns the response body; bodies with
+    an ``"error"`` key are not shared, so a failure is retried by the
+    next caller rather than replayed to it.
+    """
+
+    options = settings.COALESCE
+    if options["WINDOW"] <= 0:
+        return fn(), False
+
+    result_key = f"coalesce:result:{key}"
+    lock_key = f"coalesce:lock:{key}"
+
+    result = cache.get(result_key)
+    if result is not None:
+        return result, True
+
+    if cache.add(lock_key, 1, timeout=options["WAIT"]):
+        try:
+            result = fn()
+            if "error" not in result:
+                cache.set(result_key, result, options["WINDOW"])
+            return result, False
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + options["WAIT"]
+    while time.monotonic() < deadline:
+        time.sleep(options["POLL_INTERVAL"])
+
+        result = cache.get(result_key)
+        if result is not None:
+            return result, True
+
+        # The first request failed; do the work ourselves
+        if cache.get(lock_key) is None:
+            break
+
+    return fn(), False
@@ -0,0 +1,216 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Job, Paragraph, WritingSession
+from .ml_client import call_analyze, call_generate, call_writer
+from .persistence import save_enhancement, save_generated, save_writer_result
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ------------------------
+# QUEUE OPERATIONS
+# ------------------------
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to running and return it, or
+    return None. The conditional UPDATE makes this safe with several
+    worker processes and no broker: only one of them can win the row.
+    """
+
+    while True:
+        job_id = (
+            Job.objects.filter(status=Job.STATUS_PENDING, cancel_requested=False)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+
+        if job_id is None:
+            return None
+
+        claimed = Job.objects.filter(id=job_id, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1
+        )
+
+        if claimed:
+            return Job.objects.select_related("user").get(id=job_id)
+
+
+def requeue_stale_jobs(max_age_seconds):
+    """
+    Return jobs left running by a crashed worker to the queue; those
+    already tried JOB_MAX_ATTEMPTS times fail instead.
+    """
+
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=cutoff)
+
+    stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status=Job.STATUS_FAILED,
+        error="Worker stopped while running the job",
+        finished_at=timezone.now()
+    )
+    return stale.update(status=Job.STATUS_PENDING, started_at=None)
+
+
+def cancel_job(job):
+    """Cancel a pending job now, or flag a running one for the worker."""
+
+    if job.status == Job.STATUS_PENDING:
+        updated = Job.objects.filter(id=job.id, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_CANCELLED,
+            cancel_requested=True,
+            finished_at=timezone.now()
+        )
+        if updated:
+            job.refresh_from_db()
+            return job
+
+    if job.status == Job.STATUS_RUNNING:
+        Job.objects.filter(id=job.id).update(cancel_requested=True)
+
+    job.refresh_from_db()
+    return job
+
+
+def _finish(job, status, result=None, error=""):
+    Job.objects.filter(id=job.id).update(
+        status=status,
+        result=result,
+        error=error,
+        finished_at=timezone.now()
+    )
+
+
+def _fail_or_retry(job, error, result=None):
+    """Back on the queue while attempts remain, otherwise failed."""
+
+    if job.attempts < settings.JOB_MAX_ATTEMPTS:
+        requeued = Job.objects.filter(
+            id=job.id, status=Job.STATUS_RUNNING, cancel_requested=False
+        ).update(status=Job.STATUS_PENDING, started_at=None, error=error)
+        if requeued:
+            return
+
+    _finish(job, Job.STATUS_FAILED, result=result, error=error)
+
+
+# ------------------------
+# EXECUTION
+# ------------------------
+
+def _check_cancelled(job):
+    if Job.objects.filter(id=job.id, cancel_requested=True).exists():
+        raise JobCancelled()
+
+
+def _run_generate(job):
+    data = job.payload
+    session = WritingSession.objects.get(id=data["session_id"], user=job.user)
+
+    ml_result = call_generate(**data)
+    if "error" in ml_result:
+        return ml_result
+
+    _check_cancelled(job)
+    with transaction.atomic():
+        paragraph = save_generated(session, ml_result)
+
+    return {**ml_result, "paragraph_id": paragraph.id}
+
+
+def _run_writer(job):
+    data = job.payload
+    session = WritingSession.objects.get(id=data["session_id"], user=job.user)
+
+    ml_result = call_writer(**data)
+    if "error" in ml_result:
+        return ml_result
+
+    _check_cancelled(job)
+    with transaction.atomic():
+        paragraph = save_writer_result(session, data["user_input"], ml_result)
+
+    return {**ml_result, "paragraph_id": paragraph.id}
+
+
+def _run_enhance(job):
+    data = job.payload
+    paragraph = Paragraph.objects.select_related("session").get(
+        id=data["paragraph_id"],
+        session__user=job.user
+    )
+
+    ml_result = call_analyze(
+        text=paragraph.content,
+        session_id=paragraph.session.id,
+        tone=data["tone"],
+        level=data["level"]
+    )
+    if "error" in ml_result:
+        return ml_result
+
+    _check_cancelled(job)
+    with transaction.atomic():
+        save_enhancement(paragraph, ml_result)
+
+    return {**ml_result, "paragraph_id": paragraph.id}
+
+
+RUNNERS = {
+    Job.KIND_GENERATE: _run_generate,
+    Job.KIND_WRITER: _run_writer,
+    Job.KIND_ENHANCE: _run_enhance,
+}
+
+
+def run_job(job):
+    """
+    Execute a claimed job and record its outcome. A transient ML failure
+    (see MLClient.post) or an unexpected error is retried up to
+    JOB_MAX_ATTEMPTS times; any other ML error fails the job at once.
+    """
+
+    try:
+        _check_cancelled(job)
+        result = RUNNERS[job.kind](job)
+    except JobCancelled:
+        _finish(job, Job.STATUS_CANCELLED)
+        return
+    except (WritingSession.DoesNotExist, Paragraph.DoesNotExist):
+        _finish(job, Job.STATUS_FAILED, error="Target not found")
+        return
+    except Exception as e:
+        _fail_or_retry(job, str(e))
+        return
+
+    if "error" not in result:
+        _finish(job, Job.STATUS_SUCCEEDED, result=result)
+    elif result.get("retryable"):
+        _fail_or_retry(job, str(result["error"]), result=result)
+    else:
+        # A rejected payload fails the same way every time
+        _finish(job, Job.STATUS_FAILED, result=result, error=str(result["error"]))
+
+
+def run_pending_jobs(limit=None):
+    """Drain the queue in this process. Returns the number of jobs run."""
+
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
@@ -1,71 +1,421 @@
+import json
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
 
-BASE_ML_URL = "http://127.0.0.1:8001"
+from ..metrics import ML_CALL_SECONDS, ML_IN_FLIGHT, ML_REJECTED, add_timing, trace_headers
 
 
-def call_analyze(text, session_id, tone, level):
-    try:
-        response = requests.post(
-            f"{BASE_ML_URL}/analyze",
-            json={
-                "text": text,
-                "session_id": session_id,
-                "tone": tone,
-                "level": level
-            },
-            timeout=180
+class MLServiceUnavailable(Exception):
+    pass
+
+
+# ------------------------
+# CIRCUIT BREAKER
+# ------------------------
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures; open
+    rejects calls for ``reset_timeout`` seconds, then lets one trial call
+    through (half-open). The trial's outcome closes or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+
+            if self.trial_in_flight:
+                return False
+
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_rejected(self):
+        """
+        The service answered but refused the call (a 4xx). That says
+        nothing about its health, so the failure count is left alone; a
+        half-open trial still ends, and the service is reachable again.
+        """
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# ------------------------
+# METRICS
+# ------------------------
+
+class ClientMetrics:
+
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def _entry(self, endpoint):
+        return self.endpoints.setdefault(endpoint, {
+            "requests": 0,
+            "errors": 0,
+            "rejected": 0,
+            "latency_sum": 0.0,
+            "latency_max": 0.0,
+        })
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            entry = self._entry(endpoint)
+            entry["requests"] += 1
+            entry["latency_sum"] += seconds
+            entry["latency_max"] = max(entry["latency_max"], seconds)
+            if not ok:
+                entry["errors"] += 1
+
+    def record_rejected(self, endpoint):
+        ML_REJECTED.labels(endpoint=endpoint).inc()
+        with self.lock:
+            self._entry(endpoint)["rejected"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: {
+                    **entry,
+                    "latency_avg": entry["latency_sum"] / entry["requests"] if entry["requests"] else 0.0,
+                }
+                for endpoint, entry in self.endpoints.items()
+            }
+
+
+# ------------------------
+# CLIENT
+# ------------------------
+
+ENDPOINT_PATHS = {
+    "analyze": "/analyze",
+    "analyze_batch": "/analyze/batch",
+    "generate": "/generate",
+    "writer": "/writer",
+    "analyze_stream": "/analyze/stream",
+    "generate_stream": "/generate/stream",
+    "embed": "/embed",
+}
+
+# Statuses that mean "the ML service is struggling", as opposed to a bad request.
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+
+
+class MLClient:
+    """
+    Synchronous client for the ML service: one pooled keep-alive
+    requests.Session, per-endpoint read timeouts, a cap on in-flight
+    calls per process, and a circuit breaker that fails fast while the
+    service is overloaded. Errors are returned as ``{"error": ...}``,
+    which is what the views expect.
+    """
+
+    def __init__(self, base_url=None, options=None):
+        options = {**settings.ML_CLIENT, **(options or {})}
+        self.base_url = (base_url or settings.ML_SERVICE_URL).rstrip("/")
+        self.timeouts = options["TIMEOUTS"]
+        self.connect_timeout = options["CONNECT_TIMEOUT"]
+        self.max_concurrency = options["MAX_CONCURRENCY"]
+        self.pool_size = options["POOL_SIZE"]
+        self.acquire_timeout = options["ACQUIRE_TIMEOUT"]
+        self.breaker = CircuitBreaker(
+            failure_threshold=options["BREAKER_FAILURE_THRESHOLD"],
+            reset_timeout=options["BREAKER_RESET_TIMEOUT"],
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+        self.metrics = ClientMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+    def url(self, endpoint):
+        return f"{self.base_url}{ENDPOINT_PATHS[endpoint]}"
+
+    def read_timeout(self, endpoint):
+        return self.timeouts.get(endpoint, self.timeouts["default"])
+
+    def _settle(self, endpoint, started, status=None, error=None):
+        """Feed one call's outcome to the breaker and metrics."""
+
+        failed = error is not None or (status is not None and status in OVERLOAD_STATUSES)
+        ok = not failed and (status or 200) < 400
+        elapsed = time.perf_counter() - started
+
+        self.metrics.record(endpoint, elapsed, ok)
+        ML_CALL_SECONDS.labels(endpoint=endpoint, outcome="ok" if ok else "error").observe(elapsed)
+        add_timing(f"ml.{endpoint}", elapsed)
+
+        if failed:
+            self.breaker.record_failure()
+        elif ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_rejected()
+
+    def snapshot(self):
+        """Breaker state and per-endpoint call stats, for /health/ml."""
+
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "max_concurrency": self.max_concurrency,
+            "endpoints": self.metrics.snapshot(),
+        }
+
+    def _admit(self, endpoint):
+        if not self.semaphore.acquire(timeout=self.acquire_timeout):
+            self.metrics.record_rejected(endpoint)
+            raise MLServiceUnavailable("ML service busy, too many requests in flight")
+
+        if not self.breaker.allow():
+            self.semaphore.release()
+            self.metrics.record_rejected(endpoint)
+            raise MLServiceUnavailable("ML service unavailable (circuit open)")
+
+    def post(self, endpoint, payload):
+        """
+        The decoded JSON reply, or ``{"error": ...}``. Errors worth trying
+        again later (busy, circuit open, connection problems, 429 / 5xx)
+        also carry ``"retryable": True``.
+        """
+
+        try:
+            self._admit(endpoint)
+        except MLServiceUnavailable as e:
+            return {"error": str(e), "retryable": True}
+
+        started = time.perf_counter()
+        status, error = None, None
+        ML_IN_FLIGHT.labels(endpoint=endpoint).inc()
+        try:
+            response = self.session.post(
+                self.url(endpoint),
+                json=payload,
+                headers=trace_headers(),
+                timeout=(self.connect_timeout, self.read_timeout(endpoint))
+            )
+            status = response.status_code
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.HTTPError as e:
+            return {"error": str(e), "retryable": status in OVERLOAD_STATUSES}
+        except requests.exceptions.RequestException as e:
+            # Transport errors, and a body that is not JSON
+            error = e
+            transient = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+            return {"error": str(e), "retryable": transient}
+        finally:
+            # Once per call, after the body was parsed
+            self._settle(endpoint, started, status=status, error=error)
+            ML_IN_FLIGHT.labels(endpoint=endpoint).dec()
+            self.semaphore.release()
+
+    def stream(self, endpoint, payload):
+        """Yield (event, data) pairs from an SSE endpoint."""
+
+        try:
+            self._admit(endpoint)
+        except MLServiceUnavailable as e:
+            yield "error", {"error": str(e)}
+            return
+
+        started = time.perf_counter()
+        ML_IN_FLIGHT.labels(endpoint=endpoint).inc()
+        try:
+            with self.session.post(
+                self.url(endpoint),
+                json=payload,
+                headers=trace_headers(),
+                stream=True,
+                timeout=(self.connect_timeout, self.read_timeout(endpoint))
+            ) as response:
+                if response.status_code >= 400:
+                    self._settle(endpoint, started, status=response.status_code)
+                    yield "error", {"error": f"ML service returned {response.status_code}"}
+                    return
+
+                yield from _iter_events(response.iter_lines(decode_unicode=True))
+                self._settle(endpoint, started, status=response.status_code)
+        except requests.exceptions.RequestException as e:
+            self._settle(endpoint, started, error=e)
+            yield "error", {"error": str(e)}
+        except GeneratorExit:
+            # The consumer went away; that says nothing about the service.
+            self._settle(endpoint, started, status=200)
+            raise
+        finally:
+            ML_IN_FLIGHT.labels(endpoint=endpoint).dec()
+            self.semaphore.release()
+
+
+class _EventParser:
+    """Incremental text/event-stream parser: feed lines, get (event, data) pairs."""
+
+    def __init__(self):
+        self.event, self.data = "message", []
+
+    def feed(self, line):
+
+        if not line:
+            parsed = None
+            if self.data:
+                try:
+                    parsed = (self.event, json.loads("\n".join(self.data)))
+                except ValueError:
+                    parsed = ("error", {"error": "Malformed event from ML service"})
+            self.event, self.data = "message", []
+            return parsed
+
+        if line.startswith("event:"):
+            self.event = line[6:].strip()
+        elif line.startswith("data:"):
+            self.data.append(line[5:].strip())
+
+        return None
+
+
+def _iter_events(lines):
+    parser = _EventParser()
+    for line in lines:
+        parsed = parser.feed(line)
+        if parsed is not None:
+            yield parsed
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MLClient()
+    return _client
+
+
+# ------------------------
+# CALL HELPERS
+# ------------------------
+
+def call_analyze(text, session_id, tone, level):
+    return get_client().post("analyze", {
+        "text": text,
+        "session_id": session_id,
+        "tone": tone,
+        "level": level
+    })
+
+
+def call_analyze_batch(session_id, items, max_concurrency=8):
+    return get_client().post("analyze_batch", {
+        "session_id": session_id,
+        "items": items,
+        "max_concurrency": max_concurrency
+    })
 
 
 def call_generate(session_id, prompt, genre, tone, length,
                   target_words=None, target_sentences=None):
 
-    try:
-        response = requests.post(
-            f"{BASE_ML_URL}/generate",
-            json={
-                "session_id": session_id,
-                "prompt": prompt,
-                "genre": genre,
-                "tone": tone,
-                "length": length,
-                "target_words": target_words,
-                "target_sentences": target_sentences
-            },
-            timeout=180
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    return get_client().post("generate", {
+        "session_id": session_id,
+        "prompt": prompt,
+        "genre": genre,
+        "tone": tone,
+        "length": length,
+        "target_words": target_words,
+        "target_sentences": target_sentences
+    })
 
 
 def call_writer(session_id, user_input, **kwargs):
 
     language = kwargs.get("language", "english").lower()
-    
+
     # Simple prompt injection to handle translation in 5 mins
     if language == "hindi":
         user_input = f"[OUTPUT IN HINDI] {user_input}"
     elif language != "english":
         user_input = f"[OUTPUT IN {language.upper()}] {user_input}"
 
-    try:
-        payload = {
-            "session_id": session_id,
-            "user_input": user_input,
-            **kwargs
-        }
-        response = requests.post(
-            f"{BASE_ML_URL}/writer",
-            json=payload,
-            timeout=180
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
\ No newline at end of file
+    return get_client().post("writer", {
+        "session_id": session_id,
+        "user_input": user_input,
+        **kwargs
+    })
+
+
+def call_embed(texts):
+    return get_client().post("embed", {"texts": list(texts)})
+
+
+# ------------------------
+# STREAMING (SSE)
+# ------------------------
+
+def stream_analyze(text, session_id, tone, level):
+    return get_client().stream("analyze_stream", {
+        "text": text,
+        "session_id": session_id,
+        "tone": tone,
+        "level": level
+    })
+
+
+def stream_generate(session_id, prompt, genre, tone, length,
+                    target_words=None, target_sentences=None):
+    return get_client().stream("generate_stream", {
+        "session_id": session_id,
+        "prompt": prompt,
+        "genre": genre,
+        "tone": tone,
+        "length": length,
+        "target_words": target_words,
+        "target_sentences": target_sentences
+    })
@@ -0,0 +1,141 @@
+from collections import Counter
+
+from django.db import transaction
+
+from ..models import Paragraph, EnhancementLog
+from .stats import bump
+from .vector_index import decode_embedding
+
+# Every helper updates the owner's UserStats counters in the same
+# transaction as its write. The ML result's packed "embedding" is always
+# taken out of ml_result (it is not sent on to the browser) and only kept
+# when it is the embedding of the paragraph's own content, so search
+# ranks what the paragraph actually says. An enhancement leaves the
+# content as written (the rewrite lives on the EnhancementLog), so its
+# embedding is dropped; embed_paragraphs fills in paragraphs without one.
+
+
+def _content_embedding(ml_result, text_field):
+    """The embedding as stored, if ``text_field`` (the text it was computed from) became the content."""
+
+    packed = ml_result.pop("embedding", None)
+    return decode_embedding(packed) if ml_result.get(text_field) else None
+
+
+@transaction.atomic
+def save_enhancement(paragraph, ml_result):
+    paragraph.drift_score = ml_result.get("drift_score")
+    paragraph.consistency_score = ml_result.get("consistency_score")
+    paragraph.emotion = ml_result.get("emotion")
+    ml_result.pop("embedding", None)
+    paragraph.save()
+
+    _, created = EnhancementLog.objects.update_or_create(
+        paragraph=paragraph,
+        defaults={
+            "original_text": paragraph.content,
+            "enhanced_text": ml_result.get("enhanced_text"),
+            "explanation": ml_result.get("explanation"),
+            "readability_before": ml_result.get("readability_before"),
+            "readability_after": ml_result.get("readability_after"),
+        }
+    )
+
+    bump(paragraph.session.user_id, enhancements=int(created))
+
+
+@transaction.atomic
+def save_generated(session, ml_result, fallback_text=None):
+    paragraph = Paragraph.objects.create(
+        session=session,
+        content=ml_result.get("generated_text") or fallback_text,
+        drift_score=ml_result.get("drift_score"),
+        consistency_score=ml_result.get("consistency_score"),
+        emotion=ml_result.get("emotion"),
+        embedding=_content_embedding(ml_result, "generated_text")
+    )
+
+    bump(session.user_id, paragraphs=1)
+    return paragraph
+
+
+@transaction.atomic
+def save_writer_result(session, user_input, ml_result):
+
+    if ml_result.get("mode") != "enhancement":
+        return save_generated(session, ml_result, fallback_text=user_input)
+
+    paragraph = Paragraph.objects.create(
+        session=session,
+        content=ml_result.get("enhanced_text") or user_input,
+        drift_score=ml_result.get("drift_score"),
+        consistency_score=ml_result.get("consistency_score"),
+        emotion=ml_result.get("emotion"),
+        embedding=_content_embedding(ml_result, "enhanced_text")
+    )
+
+    EnhancementLog.objects.update_or_create(
+        paragraph=paragraph,
+        defaults={
+            "original_text": user_input,
+            "enhanced_text": ml_result.get("enhanced_text"),
+            "explanation": ml_result.get("explanation"),
+            "readability_before": ml_result.get("readability_before"),
+            "readability_after": ml_result.get("readability_after"),
+        }
+    )
+
+    bump(session.user_id, paragraphs=1, enhancements=1)
+    return paragraph
+
+
+def save_enhancements_bulk(paragraphs, ml_results):
+    """
+    Write a batch of ML results back with one bulk_update / bulk_create
+    per table. ``paragraphs`` should come with select_related("session").
+    """
+
+    existing = {
+        log.paragraph_id: log
+        for log in EnhancementLog.objects.filter(paragraph__in=paragraphs)
+    }
+    to_update, to_create = [], []
+
+    for paragraph, ml_result in zip(paragraphs, ml_results):
+        paragraph.drift_score = ml_result.get("drift_score")
+        paragraph.consistency_score = ml_result.get("consistency_score")
+        paragraph.emotion = ml_result.get("emotion")
+        ml_result.pop("embedding", None)
+
+        values = {
+            "original_text": paragraph.content,
+            "enhanced_text": ml_result.get("enhanced_text"),
+            "explanation": ml_result.get("explanation"),
+            "readability_before": ml_result.get("readability_before"),
+            "readability_after": ml_result.get("readability_after"),
+        }
+
+        log = existing.get(paragraph.id)
+        if log is None:
+            to_create.append(EnhancementLog(paragraph=paragraph, **values))
+        else:
+            for field, value in values.items():
+                setattr(log, field, value)
+            to_update.append(log)
+
+    with transaction.atomic():
+        Paragraph.objects.bulk_update(
+            paragraphs, ["drift_score", "consistency_score", "emotion"]
+        )
+        EnhancementLog.objects.bulk_update(
+            to_update,
+            ["original_text", "enhanced_text", "explanation",
+             "readability_before", "readability_after"]
+        )
+        EnhancementLog.objects.bulk_create(to_create)
+
+        # Users whose paragraphs were only updated still need their
+        # cached stats dropped, so bump every owner (count may be 0)
+        created = Counter(log.paragraph.session.user_id for log in to_create)
+        for user_id in {paragraph.session.user_id for paragraph in paragraphs}:
+            bump(user_id, enhancements=created[user_id])
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from ..models import EnhancementLog, Paragraph, UserStats, WritingSession
+from .analytics import invalidate_analytics
+
+
+COUNTERS = ("sessions", "paragraphs", "enhancements")
+
+
+def cache_key(user_id):
+    return f"user-stats:{user_id}"
+
+
+def count_for_user(user_id):
+    """The counters computed from scratch (what StatsView used to run)."""
+
+    return {
+        "sessions": WritingSession.objects.filter(user_id=user_id).count(),
+        "paragraphs": Paragraph.objects.filter(session__user_id=user_id).count(),
+        "enhancements": EnhancementLog.objects.filter(paragraph__session__user_id=user_id).count(),
+    }
+
+
+def invalidate_on_commit(user_id):
+    """Drop the user's cached stats and analytics once the write commits."""
+
+    def invalidate():
+        cache.delete(cache_key(user_id))
+        invalidate_analytics(user_id)
+
+    transaction.on_commit(invalidate)
+
+
+def reconcile_user(user_id, counts=None):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults=counts or count_for_user(user_id)
+    )
+    invalidate_on_commit(user_id)
+    return stats
+
+
+def ensure_stats(user_id):
+    """
+    The user's stats row, built by counting when it is missing. Two
+    first writes racing here both try to insert; get_or_create hands the
+    loser the winner's row instead of overwriting it. Returns
+    ``(stats, created)``.
+    """
+
+    return UserStats.objects.get_or_create(user_id=user_id, defaults=count_for_user(user_id))
+
+
+def bump(user_id, **deltas):
+    """
+    Add ``deltas`` (e.g. ``paragraphs=1``) to the user's counters.
+
+    Call it inside the transaction that made the write, after the write,
+    even with no deltas (an updated row still changes the analytics).
+    A user without a stats row yet gets one built by counting, which
+    already includes that write.
+    """
+
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    increments = {name: F(name) + delta for name, delta in deltas.items()}
+
+    if deltas and not UserStats.objects.filter(user_id=user_id).update(**increments):
+        _, created = ensure_stats(user_id)
+        if not created:
+            # Another transaction created the row since; its count
+            # could not see this uncommitted write
+            UserStats.objects.filter(user_id=user_id).update(**increments)
+
+    invalidate_on_commit(user_id)
+
+
+def get_stats(user_id):
+    """The user's counters as the dashboard shows them, cached for STATS_CACHE_TTL."""
+
+    data = cache.get(cache_key(user_id))
+    if data is not None:
+        return data
+
+    stats = UserStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        with transaction.atomic():
+            stats, _ = ensure_stats(user_id)
+
+    data = {
+        "total_paragraphs": stats.paragraphs,
+        "total_enhancements": stats.enhancements,
+        "total_sessions": stats.sessions,
+        "ai_operations": stats.ai_operations,
+    }
+    cache.set(cache_key(user_id), data, settings.STATS_CACHE_TTL)
+    return data
@@ -0,0 +1,178 @@
+import base64
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from ..models import Paragraph
+from .analytics import current_version
+
+
+# ------------------------
+# ENCODING
+# ------------------------
+
+def decode_embedding(packed):
+    """ML service form (base64 float32) -> bytes for Paragraph.embedding."""
+
+    if not packed:
+        return None
+    return base64.b64decode(packed)
+
+
+def to_vector(raw):
+    return np.frombuffer(raw, dtype=np.float32)
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+# ------------------------
+# INDEX
+# ------------------------
+
+def train_centroids(vectors, nlist, iterations=10, sample=20000, seed=0):
+    """Spherical k-means on (a sample of) unit vectors."""
+
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)]
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = vectors[assignment == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = normalize(centroids)
+
+    return centroids
+
+
+class VectorIndex:
+    """
+    Cosine search over one user's paragraph embeddings.
+
+    Up to ``ivf_threshold`` vectors every query is one matrix-vector
+    product. Past it, vectors are bucketed under sqrt(n) k-means
+    centroids (IVF) and a query only scans the ``nprobe`` nearest
+    buckets. Per-session queries always scan that session's rows.
+    """
+
+    def __init__(self, ids, session_ids, vectors, ivf_threshold, nprobe, centroids=None):
+        self.ids = ids
+        self.session_ids = session_ids
+        self.vectors = normalize(vectors) if len(vectors) else vectors
+        self.nprobe = nprobe
+        self.centroids = None
+        self.lists = None
+
+        if len(ids) > ivf_threshold:
+            # Centroids are reused from the previous build until the index
+            # has doubled, so a rebuild is one assignment pass, not k-means.
+            if centroids is None or len(centroids) ** 2 * 2 < len(ids):
+                centroids = train_centroids(self.vectors, int(np.sqrt(len(ids))))
+            self.centroids = centroids
+            assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+            self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(centroids))]
+
+    @property
+    def kind(self):
+        return "flat" if self.centroids is None else "ivf"
+
+    def __len__(self):
+        return len(self.ids)
+
+    def candidates(self, query, session_id):
+        if session_id is not None:
+            return np.flatnonzero(self.session_ids == session_id)
+
+        if self.centroids is None:
+            return None  # all rows
+
+        nearest = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        return np.concatenate([self.lists[c] for c in nearest])
+
+    def search(self, query, k=10, session_id=None):
+        """``[(paragraph_id, score), ...]``, best first."""
+
+        if not len(self.ids):
+            return []
+
+        query = normalize(np.asarray(query, dtype=np.float32))
+        rows = self.candidates(query, session_id)
+
+        if rows is None:
+            scores = self.vectors @ query
+            rows = np.arange(len(self.ids))
+        else:
+            if not len(rows):
+                return []
+            scores = self.vectors[rows] @ query
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top]
+
+
+# ------------------------
+# PER-USER CACHE
+# ------------------------
+# Indexes are built lazily on search and kept per process, keyed by the
+# user's data version (bumped on every paragraph write, see stats.py).
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def build_index(user_id, previous=None):
+    rows = (
+        Paragraph.objects.filter(session__user_id=user_id, embedding__isnull=False)
+        .order_by()
+        .values_list("id", "session_id", "embedding")
+    )
+
+    ids, session_ids, vectors = [], [], []
+    for paragraph_id, session_id, raw in rows.iterator():
+        ids.append(paragraph_id)
+        session_ids.append(session_id)
+        vectors.append(to_vector(raw))
+
+    config = settings.VECTOR_INDEX
+    return VectorIndex(
+        np.array(ids, dtype=np.int64),
+        np.array(session_ids, dtype=np.int64),
+        np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32),
+        ivf_threshold=config["IVF_THRESHOLD"],
+        nprobe=config["NPROBE"],
+        centroids=previous.centroids if previous is not None else None
+    )
+
+
+def get_index(user_id):
+    version = current_version(user_id)
+
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == version:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    index = build_index(user_id, previous=cached[1] if cached else None)
+
+    with _indexes_lock:
+        _indexes[user_id] = (version, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.VECTOR_INDEX["CACHED_USERS"]:
+            _indexes.popitem(last=False)
+
+    return index
@@ -1,3 +1,1142 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+import numpy as np
+import requests
+from django.db import connection
+from rest_framework.test import APIClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from .models import WritingSession, Paragraph, EnhancementLog, Job, UserStats
+from .services.jobs import claim_next_job, requeue_stale_jobs
+from .services.ml_client import CircuitBreaker, MLClient, get_client
+from .services.stats import count_for_user, reconcile_user
+from .services.vector_index import VectorIndex
+
+
+ML_ANALYZE_RESULT = {
+    "mode": "enhancement",
+    "enhanced_text": "Enhanced text.",
+    "emotion": "joy",
+    "drift_score": 0.1,
+    "consistency_score": 0.9,
+    "readability_before": 60.0,
+    "readability_after": 70.0,
+    "explanation": "Refined.",
+}
+
+ML_GENERATE_RESULT = {
+    "mode": "script_generation",
+    "generated_text": "Once upon a time.",
+    "emotion": "neutral",
+    "drift_score": 0.0,
+    "consistency_score": 1.0,
+    "readability": 80.0,
+}
+
+
+# ------------------------
+# QUERY AUDIT HELPER
+# ------------------------
+
+class QueryAuditMixin:
+    """
+    ``with self.audit_queries("label", max_queries=n):`` fails when the
+    block runs more than ``n`` queries, and when any SELECT on an app1
+    table plans as a full table scan. The EXPLAIN output of every
+    captured query is kept in ``self.query_plans`` and, if
+    QUERY_PLAN_DIR is set, written there as ``<label>.json``.
+    """
+
+    # Tables that must always be reached through an index.
+    INDEXED_TABLES = (
+        "app1_writingsession",
+        "app1_paragraph",
+        "app1_enhancementlog",
+        "app1_job",
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.query_plans = {}
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+            return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+
+    def full_scans(self, plan):
+        # SQLite reports "SCAN <table>" for a table scan and
+        # "SCAN <table> USING [COVERING] INDEX ..." for an index scan.
+        scans = []
+        for line in plan:
+            for table in self.INDEXED_TABLES:
+                if f"SCAN {table}" in line and "INDEX" not in line:
+                    scans.append(line)
+        return scans
+
+    def plan_lines(self, label, table):
+        """Plan lines of the queries captured as ``label`` that touch ``table``."""
+        return [
+            line
+            for entry in self.query_plans[label]
+            for line in entry["plan"]
+            if f" {table} " in f"{line} "
+        ]
+
+    @contextmanager
+    def audit_queries(self, label, max_queries):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+
+        # Savepoints come from atomic() blocks, not from the query shape.
+        queries = [
+            q["sql"] for q in context.captured_queries
+            if not q["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT"))
+        ]
+        plans = [
+            {"sql": sql, "plan": self.explain(sql)}
+            for sql in queries
+            if sql.lstrip().upper().startswith("SELECT")
+        ]
+        self.query_plans[label] = plans
+
+        plan_dir = os.getenv("QUERY_PLAN_DIR")
+        if plan_dir:
+            os.makedirs(plan_dir, exist_ok=True)
+            with open(os.path.join(plan_dir, f"{label}.json"), "w") as f:
+                json.dump(plans, f, indent=2)
+
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f"{label}: {len(queries)} queries (budget {max_queries}):\n" + "\n".join(queries)
+        )
+
+        if connection.vendor == "sqlite":
+            for entry in plans:
+                scans = self.full_scans(entry["plan"])
+                self.assertFalse(scans, f"{label}: full table scan in\n{entry['sql']}\n{scans}")
+
+
+# ------------------------
+# WRITER FIXTURE
+# ------------------------
+
+class WriterSessionMixin:
+    """
+    ``self.user`` ("writer"), a "Draft" ``self.session`` of theirs and
+    ``self.client`` authenticated as them. Set ``session_title = None``
+    to start without a session.
+    """
+
+    session_title = "Draft"
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user("writer", password="secret-pass-123")
+        if self.session_title is not None:
+            self.session = WritingSession.objects.create(user=self.user, title=self.session_title)
+        self.client.force_authenticate(self.user)
+
+
+# ------------------------
+# VIEW QUERY BUDGETS
+# ------------------------
+
+class ViewQueryAuditTests(QueryAuditMixin, WriterSessionMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("other", password="secret-pass-123")
+        self.paragraphs = [
+            Paragraph.objects.create(session=self.session, content=f"Paragraph {i}.")
+            for i in range(5)
+        ]
+        EnhancementLog.objects.create(
+            paragraph=self.paragraphs[0],
+            original_text="a",
+            enhanced_text="b",
+            explanation="c",
+        )
+
+        # Noise that the user's queries must not touch
+        other_session = WritingSession.objects.create(user=self.other, title="Other")
+        Paragraph.objects.create(session=other_session, content="Not yours.")
+
+        cache.clear()
+        reconcile_user(self.user.id)
+
+    def test_register(self):
+        self.client.force_authenticate(None)
+        with self.audit_queries("register", max_queries=2):
+            response = self.client.post(
+                "/api/register/",
+                {"username": "new", "email": "n@example.com", "password": "secret-pass-123"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        self.client.force_authenticate(None)
+        with self.audit_queries("login", max_queries=2):
+            response = self.client.post(
+                "/api/login/",
+                {"username": "writer", "password": "secret-pass-123"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_session(self):
+        with self.audit_queries("session_create", max_queries=2):
+            response = self.client.post("/api/session/create/", {"title": "New"}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_list_sessions(self):
+        with self.audit_queries("session_list", max_queries=1):
+            response = self.client.get("/api/session/list/")
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_delete_session(self):
+        with self.audit_queries("session_delete", max_queries=8):
+            response = self.client.delete(f"/api/session/delete/{self.session.id}/")
+        self.assertEqual(response.status_code, 204)
+
+    def test_create_paragraph(self):
+        with self.audit_queries("paragraph_create", max_queries=4):
+            response = self.client.post(
+                "/api/paragraph/create/",
+                {"session": self.session.id, "content": "More."},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_list_paragraphs(self):
+        with self.audit_queries("paragraph_list", max_queries=1):
+            response = self.client.get(f"/api/paragraph/list/{self.session.id}/")
+        self.assertEqual(len(response.json()["results"]), 5)
+
+    def test_list_paragraphs_since(self):
+        since = self.paragraphs[2].id
+        with self.audit_queries("paragraph_list_since", max_queries=2):
+            response = self.client.get(f"/api/paragraph/list/{self.session.id}/?since={since}&full=1")
+        self.assertEqual([p["id"] for p in response.json()["results"]], [p.id for p in self.paragraphs[3:]])
+
+    def test_list_paragraphs_since_deleted_row(self):
+        since = self.paragraphs[2].id
+        self.paragraphs[2].delete()
+        with self.audit_queries("paragraph_list_since_deleted", max_queries=2):
+            response = self.client.get(f"/api/paragraph/list/{self.session.id}/?since={since}")
+        self.assertEqual([p["id"] for p in response.json()["results"]], [p.id for p in self.paragraphs[3:]])
+
+    def test_paragraph_detail(self):
+        with self.audit_queries("paragraph_detail", max_queries=1):
+            response = self.client.get(f"/api/paragraph/{self.paragraphs[0].id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_enhancement(self):
+        log = EnhancementLog.objects.get()
+        with self.audit_queries("enhancement_retrieve", max_queries=1):
+            response = self.client.get(f"/api/enhancement/{log.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    @patch("app1.views.call_analyze", return_value=ML_ANALYZE_RESULT)
+    def test_enhance(self, _):
+        with self.audit_queries("enhance", max_queries=6):
+            response = self.client.post(
+                "/api/enhance/",
+                {"paragraph_id": self.paragraphs[1].id},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(EnhancementLog.objects.count(), 2)
+
+    @patch("app1.views.call_analyze_batch")
+    def test_enhance_batch(self, call_analyze_batch):
+        call_analyze_batch.side_effect = lambda session_id, items: {
+            "results": [ML_ANALYZE_RESULT for _ in items]
+        }
+        with self.audit_queries("enhance_batch", max_queries=7):
+            response = self.client.post(
+                "/api/enhance/batch/",
+                {"session_id": self.session.id},
+                format="json",
+            )
+        self.assertEqual(len(response.json()["results"]), 5)
+        self.assertEqual(EnhancementLog.objects.count(), 5)
+
+    @patch("app1.views.call_generate", return_value=ML_GENERATE_RESULT)
+    def test_generate(self, _):
+        with self.audit_queries("generate", max_queries=3):
+            response = self.client.post(
+                "/api/generate/",
+                {"session_id": self.session.id, "prompt": "A story"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    @patch("app1.views.call_writer", return_value=ML_ANALYZE_RESULT)
+    def test_writer(self, _):
+        with self.audit_queries("writer", max_queries=5):
+            response = self.client.post(
+                "/api/writer/",
+                {"session_id": self.session.id, "user_input": "Fix this"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    @patch("app1.views.stream_generate")
+    def test_generate_stream(self, stream_generate):
+        stream_generate.return_value = iter([
+            ("token", {"delta": "Once"}),
+            ("result", dict(ML_GENERATE_RESULT)),
+        ])
+        with self.audit_queries("generate_stream", max_queries=3):
+            response = self.client.post(
+                "/api/generate/stream/",
+                {"session_id": self.session.id, "prompt": "A story"},
+                format="json",
+            )
+            body = b"".join(response.streaming_content).decode()
+        self.assertIn("event: result", body)
+
+    @patch("app1.views.stream_analyze")
+    def test_enhance_stream(self, stream_analyze):
+        stream_analyze.return_value = iter([
+            ("token", {"delta": "Enhanced"}),
+            ("result", dict(ML_ANALYZE_RESULT)),
+        ])
+        with self.audit_queries("enhance_stream", max_queries=5):
+            response = self.client.post(
+                "/api/enhance/stream/",
+                {"paragraph_id": self.paragraphs[1].id},
+                format="json",
+            )
+            b"".join(response.streaming_content)
+        self.assertTrue(EnhancementLog.objects.filter(paragraph=self.paragraphs[1]).exists())
+
+    def test_job_submit_poll_cancel(self):
+        with self.audit_queries("job_submit", max_queries=4):
+            response = self.client.post(
+                "/api/jobs/submit/",
+                {"kind": "generate", "payload": {"session_id": self.session.id, "prompt": "x"},
+                 "idempotency_key": "k1"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+
+        with self.audit_queries("job_detail", max_queries=1):
+            self.client.get(f"/api/jobs/{job_id}/")
+
+        with self.audit_queries("job_wait", max_queries=1):
+            self.client.get(f"/api/jobs/{job_id}/wait/?timeout=0")
+
+        with self.audit_queries("job_cancel", max_queries=3):
+            response = self.client.post(f"/api/jobs/{job_id}/cancel/")
+        self.assertEqual(response.json()["status"], Job.STATUS_CANCELLED)
+
+    def test_analytics(self):
+        with self.audit_queries("analytics", max_queries=7):
+            self.client.get("/api/analytics/")
+        with self.audit_queries("analytics_session", max_queries=8):
+            self.client.get(f"/api/analytics/session/{self.session.id}/?bucket=week")
+        with self.audit_queries("analytics_cached", max_queries=1):
+            self.client.get(f"/api/analytics/session/{self.session.id}/?bucket=week")
+
+        # Logs are joined in per paragraph through the unique paragraph_id
+        # index, which is why EnhancementLog needs no created_at index
+        if connection.vendor != "sqlite":
+            return
+        for label in ("analytics", "analytics_session"):
+            lines = self.plan_lines(label, "app1_enhancementlog")
+            self.assertTrue(lines)
+            for line in lines:
+                self.assertIn("SEARCH app1_enhancementlog USING INDEX", line)
+                self.assertIn("(paragraph_id=?)", line)
+
+    def test_stats(self):
+        with self.audit_queries("stats", max_queries=1):
+            response = self.client.get("/api/stats/")
+        self.assertEqual(response.json()["total_paragraphs"], 5)
+
+        with self.audit_queries("stats_cached", max_queries=0):
+            self.client.get("/api/stats/")
+
+
+class BatchEnhanceTests(WriterSessionMixin, APITestCase):
+
+    session_title = None
+
+    def setUp(self):
+        super().setUp()
+        self.sessions = [
+            WritingSession.objects.create(user=self.user, title=title) for title in ("A", "B")
+        ]
+        for session in self.sessions:
+            for i in range(2):
+                Paragraph.objects.create(session=session, content=f"{session.title} {i}")
+
+    def batch(self, failing):
+        def analyze(session_id, items):
+            if session_id in failing:
+                return {"error": "ML service unavailable"}
+            return {"results": [dict(ML_ANALYZE_RESULT) for _ in items]}
+
+        with patch("app1.views.call_analyze_batch", side_effect=analyze):
+            return self.client.post(
+                "/api/enhance/batch/",
+                {"paragraph_ids": list(Paragraph.objects.values_list("id", flat=True))},
+                format="json",
+            )
+
+    def test_partial_failure_is_207(self):
+        failed = self.sessions[1]
+        response = self.batch(failing={failed.id})
+
+        self.assertEqual(response.status_code, 207)
+        data = response.json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual([e["session_id"] for e in data["errors"]], [failed.id])
+        self.assertEqual(len(data["errors"][0]["paragraph_ids"]), 2)
+        self.assertFalse(EnhancementLog.objects.filter(paragraph__session=failed).exists())
+        self.assertEqual(EnhancementLog.objects.count(), 2)
+
+    def test_total_failure_is_500(self):
+        response = self.batch(failing={s.id for s in self.sessions})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(response.json()["errors"]), 2)
+
+
+# ------------------------
+# BACKGROUND JOBS
+# ------------------------
+
+class JobWorkerTests(WriterSessionMixin, APITestCase):
+
+    def job(self, **fields):
+        return Job.objects.create(
+            user=self.user,
+            kind=Job.KIND_GENERATE,
+            payload={"session_id": self.session.id, "prompt": "p"},
+            **fields
+        )
+
+    def runjobs(self, *args):
+        call_command("runjobs", "--once", *args, stdout=open(os.devnull, "w"))
+
+    def test_claim_takes_oldest_pending(self):
+        first, second = self.job(), self.job()
+        self.job(cancel_requested=True)
+        self.job(status=Job.STATUS_SUCCEEDED)
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (first.id, Job.STATUS_RUNNING, 1))
+        self.assertEqual(claim_next_job().id, second.id)
+        self.assertIsNone(claim_next_job())
+
+    @patch("app1.services.jobs.call_generate", return_value=ML_GENERATE_RESULT)
+    def test_runjobs_once(self, call_generate):
+        job = self.job()
+        self.runjobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        call_generate.assert_called_once_with(session_id=self.session.id, prompt="p")
+        paragraph = Paragraph.objects.get(id=job.result["paragraph_id"])
+        self.assertEqual(paragraph.content, ML_GENERATE_RESULT["generated_text"])
+
+    @patch("app1.services.jobs.call_generate")
+    def test_failed_call_is_retried(self, call_generate):
+        call_generate.side_effect = [{"error": "ML service busy", "retryable": True}, ML_GENERATE_RESULT]
+        job = self.job()
+        self.runjobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_SUCCEEDED, 2))
+
+    @patch("app1.services.jobs.call_generate")
+    def test_rejected_payload_is_not_retried(self, call_generate):
+        call_generate.return_value = {"error": "422 Client Error: Unprocessable Entity", "retryable": False}
+        job = self.job()
+        self.runjobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 1))
+        self.assertIn("422", job.error)
+        call_generate.assert_called_once()
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    @patch("app1.services.jobs.call_generate", side_effect=RuntimeError("boom"))
+    def test_gives_up_after_max_attempts(self, call_generate):
+        job = self.job()
+        self.runjobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.STATUS_FAILED, 2, "boom"))
+        self.assertEqual(call_generate.call_count, 2)
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    @patch("app1.services.jobs.call_generate", return_value=ML_GENERATE_RESULT)
+    def test_stale_lease_recovery(self, _):
+        long_ago = timezone.now() - timedelta(hours=1)
+        orphaned = self.job(status=Job.STATUS_RUNNING, started_at=long_ago, attempts=1)
+        exhausted = self.job(status=Job.STATUS_RUNNING, started_at=long_ago, attempts=2)
+        current = self.job(status=Job.STATUS_RUNNING, started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(requeue_stale_jobs(60), 1)
+        self.runjobs()
+
+        statuses = dict(Job.objects.values_list("id", "status"))
+        self.assertEqual(statuses[orphaned.id], Job.STATUS_SUCCEEDED)
+        self.assertEqual(statuses[exhausted.id], Job.STATUS_FAILED)
+        self.assertEqual(statuses[current.id], Job.STATUS_RUNNING)
+
+    def test_wait_returns_202_until_finished(self):
+        job = self.job()
+
+        response = self.client.get(f"/api/jobs/{job.id}/wait/?timeout=0")
+        self.assertEqual(response.status_code, 202)
+        self.assertIn("Retry-After", response)
+
+        Job.objects.filter(id=job.id).update(status=Job.STATUS_SUCCEEDED)
+        response = self.client.get(f"/api/jobs/{job.id}/wait/?timeout=0")
+        self.assertEqual(response.status_code, 200)
+
+
+# ------------------------
+# DENORMALISED STATS
+# ------------------------
+
+class UserStatsTests(WriterSessionMixin, APITransactionTestCase):
+    # Cache invalidation runs on commit, so the writes must really commit.
+
+    session_title = None
+
+    def stats(self):
+        return self.client.get("/api/stats/").json()
+
+    def assertCountersMatch(self):
+        stored = UserStats.objects.get(user=self.user)
+        expected = count_for_user(self.user.id)
+        self.assertEqual(
+            {"sessions": stored.sessions, "paragraphs": stored.paragraphs,
+             "enhancements": stored.enhancements},
+            expected
+        )
+
+    @patch("app1.views.call_writer", return_value=ML_ANALYZE_RESULT)
+    @patch("app1.views.call_generate", return_value=ML_GENERATE_RESULT)
+    @patch("app1.views.call_analyze", return_value=ML_ANALYZE_RESULT)
+    def test_counters_follow_writes(self, *_):
+        self.assertEqual(self.stats()["total_sessions"], 0)
+
+        session_id = self.client.post("/api/session/create/", {"title": "A"}, format="json").json()["id"]
+        self.assertEqual(self.stats()["total_sessions"], 1)
+
+        paragraph_id = self.client.post(
+            "/api/paragraph/create/", {"session": session_id, "content": "Hi."}, format="json"
+        ).json()["id"]
+        self.client.post("/api/enhance/", {"paragraph_id": paragraph_id}, format="json")
+        # Re-enhancing replaces the log, it does not add one
+        self.client.post("/api/enhance/", {"paragraph_id": paragraph_id}, format="json")
+        self.client.post("/api/generate/", {"session_id": session_id, "prompt": "p"}, format="json")
+        self.client.post("/api/writer/", {"session_id": session_id, "user_input": "w"}, format="json")
+
+        self.assertEqual(self.stats(), {
+            "total_paragraphs": 3,
+            "total_enhancements": 2,
+            "total_sessions": 1,
+            "ai_operations": 5,
+        })
+        self.assertCountersMatch()
+
+        self.client.delete(f"/api/session/delete/{session_id}/")
+        self.assertEqual(self.stats()["ai_operations"], 0)
+        self.assertCountersMatch()
+
+    def test_first_write_without_a_row_counts_everything(self):
+        # Written before the stats row existed
+        session = WritingSession.objects.create(user=self.user, title="Imported")
+        Paragraph.objects.create(session=session, content="Old.")
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+
+        self.client.post("/api/paragraph/create/", {"session": session.id, "content": "New."}, format="json")
+
+        stored = UserStats.objects.get(user=self.user)
+        self.assertEqual((stored.sessions, stored.paragraphs), (1, 2))
+
+    def test_racing_first_write_adds_to_the_other_row(self):
+        session = WritingSession.objects.create(user=self.user, title="Draft")
+        counted = count_for_user(self.user.id)
+
+        def count_while_another_write_commits(user_id):
+            # Another request's first write creates the row from its own
+            # count, which cannot see our uncommitted paragraph
+            UserStats.objects.create(user_id=user_id, sessions=1, paragraphs=4)
+            return {**counted, "paragraphs": counted["paragraphs"] + 1}
+
+        with patch("app1.services.stats.count_for_user", side_effect=count_while_another_write_commits):
+            self.client.post("/api/paragraph/create/", {"session": session.id, "content": "Mine."}, format="json")
+
+        stored = UserStats.objects.get(user=self.user)
+        self.assertEqual((stored.sessions, stored.paragraphs), (1, 5))
+
+    def test_reconcile_command_fixes_drift(self):
+        session = WritingSession.objects.create(user=self.user, title="Imported")
+        Paragraph.objects.create(session=session, content="Written outside the API.")
+        UserStats.objects.create(user=self.user, sessions=7)
+
+        call_command("reconcile_stats", stdout=open(os.devnull, "w"))
+
+        self.assertCountersMatch()
+
+
+# ------------------------
+# ANALYTICS
+# ------------------------
+
+class AnalyticsTests(WriterSessionMixin, APITransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for drift, emotion in [(0.05, "joy"), (0.15, "joy"), (0.95, "fear"), (1.0, "joy"), (None, None)]:
+            Paragraph.objects.create(
+                session=self.session,
+                content="x",
+                drift_score=drift,
+                consistency_score=None if drift is None else 1 - drift,
+                emotion=emotion
+            )
+
+    def test_aggregates(self):
+        data = self.client.get("/api/analytics/?bins=10").json()
+
+        self.assertEqual([b["count"] for b in data["drift_histogram"]], [1, 1, 0, 0, 0, 0, 0, 0, 0, 2])
+        self.assertEqual(data["emotions"], [{"emotion": "joy", "count": 3}, {"emotion": "fear", "count": 1}])
+        self.assertEqual(data["summary"]["paragraphs"], 5)
+        self.assertEqual(sum(row["paragraphs"] for row in data["trend"]), 5)
+
+    def test_other_users_session_is_hidden(self):
+        other = User.objects.create_user("other", password="secret-pass-123")
+        session = WritingSession.objects.create(user=other, title="Other")
+
+        response = self.client.get(f"/api/analytics/session/{session.id}/")
+        self.assertEqual(response.status_code, 404)
+
+    @patch("app1.views.call_analyze", return_value=ML_ANALYZE_RESULT)
+    def test_writes_invalidate_cache(self, _):
+        before = self.client.get("/api/analytics/").json()
+        self.assertEqual(before["summary"]["enhancements"], 0)
+
+        paragraph = Paragraph.objects.filter(session=self.session).first()
+        self.client.post("/api/enhance/", {"paragraph_id": paragraph.id}, format="json")
+
+        after = self.client.get("/api/analytics/").json()
+        self.assertEqual(after["summary"]["enhancements"], 1)
+        self.assertEqual(after["readability_trend"][0]["avg_after"], 70.0)
+
+    @patch("app1.views.call_analyze_batch")
+    def test_batch_reenhance_invalidates_cache(self, call_analyze_batch):
+        call_analyze_batch.side_effect = lambda session_id, items: {
+            "results": [dict(ML_ANALYZE_RESULT) for _ in items]
+        }
+        self.client.post("/api/enhance/batch/", {"session_id": self.session.id}, format="json")
+        self.assertEqual(self.client.get("/api/analytics/").json()["summary"]["enhancements"], 5)
+
+        # Only updates existing logs: no counter changes, but the cache must go
+        call_analyze_batch.side_effect = lambda session_id, items: {
+            "results": [{**ML_ANALYZE_RESULT, "readability_after": 90.0} for _ in items]
+        }
+        self.client.post("/api/enhance/batch/", {"session_id": self.session.id}, format="json")
+
+        after = self.client.get("/api/analytics/").json()
+        self.assertEqual(after["readability_trend"][0]["avg_after"], 90.0)
+
+
+# ------------------------
+# CONCURRENT WRITES
+# ------------------------
+
+class ConcurrentWriteStressTests(WriterSessionMixin, APITransactionTestCase):
+    """
+    Parallel clients on the paragraph write paths. With the SQLite
+    settings in project/settings.py none of them may fail with
+    "database is locked", and the shared UserStats row must add up.
+    STRESS_CLIENTS / STRESS_WRITES scale the run.
+    """
+
+    CLIENTS = int(os.getenv("STRESS_CLIENTS", "8"))
+    WRITES = int(os.getenv("STRESS_WRITES", "10"))
+
+    def setUp(self):
+        super().setUp()
+        reconcile_user(self.user.id)
+
+    def hammer(self, index, barrier, statuses, errors):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        barrier.wait()
+
+        try:
+            for i in range(self.WRITES):
+                if i % 2:
+                    response = client.post(
+                        "/api/writer/",
+                        {"session_id": self.session.id, "user_input": f"{index}-{i}"},
+                        format="json",
+                    )
+                else:
+                    response = client.post(
+                        "/api/paragraph/create/",
+                        {"session": self.session.id, "content": f"{index}-{i}"},
+                        format="json",
+                    )
+                statuses.append(response.status_code)
+        except Exception as e:
+            errors.append(repr(e))
+        finally:
+            connection.close()
+
+    @patch("app1.views.call_writer", return_value=ML_ANALYZE_RESULT)
+    def test_parallel_paragraph_writes(self, _):
+        barrier = threading.Barrier(self.CLIENTS)
+        statuses, errors = [], []
+
+        threads = [
+            threading.Thread(target=self.hammer, args=(i, barrier, statuses, errors))
+            for i in range(self.CLIENTS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(status in (200, 201) for status in statuses), statuses)
+
+        total = self.CLIENTS * self.WRITES
+        writer_calls = self.CLIENTS * (self.WRITES // 2)
+        self.assertEqual(Paragraph.objects.filter(session=self.session).count(), total)
+        self.assertEqual(count_for_user(self.user.id)["enhancements"], writer_calls)
+
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.paragraphs, stats.enhancements), (total, writer_calls))
+
+
+# ------------------------
+# SEMANTIC SEARCH
+# ------------------------
+
+def packed(vector):
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+
+
+class VectorIndexTests(SimpleTestCase):
+
+    def clustered(self, n, dim=32, clusters=20, seed=0):
+        rng = np.random.default_rng(seed)
+        centers = rng.normal(size=(clusters, dim))
+        vectors = centers[rng.integers(0, clusters, n)] + 0.1 * rng.normal(size=(n, dim))
+        return vectors.astype(np.float32)
+
+    def test_flat_search_is_exact(self):
+        vectors = self.clustered(200)
+        index = VectorIndex(np.arange(200), np.zeros(200, dtype=np.int64), vectors, ivf_threshold=1000, nprobe=4)
+
+        hits = index.search(vectors[17], k=1)
+
+        self.assertEqual(index.kind, "flat")
+        self.assertEqual(hits[0][0], 17)
+        self.assertAlmostEqual(hits[0][1], 1.0, places=5)
+
+    def test_ivf_recall_against_flat(self):
+        n = 4000
+        vectors = self.clustered(n)
+        ids = np.arange(n)
+        sessions = np.zeros(n, dtype=np.int64)
+        flat = VectorIndex(ids, sessions, vectors, ivf_threshold=n, nprobe=8)
+        ivf = VectorIndex(ids, sessions, vectors, ivf_threshold=100, nprobe=8)
+        self.assertEqual(ivf.kind, "ivf")
+
+        queries = self.clustered(50, seed=1)
+        recall = np.mean([
+            len({i for i, _ in flat.search(q, 10)} & {i for i, _ in ivf.search(q, 10)}) / 10
+            for q in queries
+        ])
+        self.assertGreaterEqual(recall, 0.9)
+
+    def test_session_filter(self):
+        vectors = self.clustered(100)
+        sessions = np.array([1, 2] * 50)
+        index = VectorIndex(np.arange(100), sessions, vectors, ivf_threshold=10, nprobe=1)
+
+        hits = index.search(vectors[0], k=5, session_id=2)
+        self.assertTrue(all(sessions[i] == 2 for i, _ in hits))
+
+
+class SearchViewTests(WriterSessionMixin, APITransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_session = WritingSession.objects.create(user=self.user, title="Notes")
+        self.basis = np.eye(8, dtype=np.float32)
+
+        self.paragraphs = [
+            Paragraph.objects.create(
+                session=self.session if i < 3 else self.other_session,
+                content=f"Passage {i}",
+                embedding=self.basis[i].tobytes()
+            )
+            for i in range(5)
+        ]
+
+    def search(self, vector, **params):
+        with patch("app1.views.call_embed", return_value={"embeddings": [packed(vector)], "dim": 8}):
+            return self.client.get("/api/search/", {"q": "query", **params})
+
+    def test_nearest_passage_first(self):
+        response = self.search(self.basis[1] + 0.1 * self.basis[2], k=2).json()
+
+        self.assertEqual([r["id"] for r in response["results"]], [self.paragraphs[1].id, self.paragraphs[2].id])
+        self.assertEqual(response["results"][0]["preview"], "Passage 1")
+        self.assertEqual(response["index"], {"kind": "flat", "size": 5})
+
+    def test_session_scope(self):
+        response = self.search(self.basis[1], k=5, session_id=self.other_session.id).json()
+        self.assertEqual({r["session_id"] for r in response["results"]}, {self.other_session.id})
+
+    @patch("app1.views.call_generate")
+    def test_new_paragraphs_are_searchable(self, call_generate):
+        self.search(self.basis[0])  # builds and caches the index
+
+        call_generate.return_value = {**ML_GENERATE_RESULT, "embedding": packed(self.basis[7])}
+        response = self.client.post(
+            "/api/generate/", {"session_id": self.session.id, "prompt": "p"}, format="json"
+        )
+        self.assertNotIn("embedding", response.json())
+
+        hits = self.search(self.basis[7], k=1).json()["results"]
+        self.assertEqual(hits[0]["preview"], ML_GENERATE_RESULT["generated_text"])
+
+    @patch("app1.views.call_analyze")
+    def test_enhancing_keeps_content_embedding(self, call_analyze):
+        # The analyze result embeds the rewrite, not the paragraph's content
+        call_analyze.return_value = {**ML_ANALYZE_RESULT, "embedding": packed(self.basis[7])}
+        response = self.client.post("/api/enhance/", {"paragraph_id": self.paragraphs[1].id}, format="json")
+        self.assertNotIn("embedding", response.json())
+
+        hits = self.search(self.basis[1], k=1).json()["results"]
+        self.assertEqual(hits[0]["id"], self.paragraphs[1].id)
+        self.assertEqual(self.search(self.basis[7], k=1).json()["results"][0]["score"], 0.0)
+
+
+# ------------------------
+# METRICS / TRACING
+# ------------------------
+
+class MetricsTests(WriterSessionMixin, APITestCase):
+
+    def generate(self, **headers):
+        response = MagicMock(status_code=200)
+        response.json.return_value = ML_GENERATE_RESULT
+
+        with patch.object(get_client().session, "post", return_value=response) as post:
+            result = self.client.post(
+                "/api/generate/", {"session_id": self.session.id, "prompt": "p"}, format="json", headers=headers
+            )
+        return result, post
+
+    def test_request_id_reaches_ml_service(self):
+        response, post = self.generate(**{"X-Request-ID": "trace-123"})
+
+        self.assertEqual(response["X-Request-ID"], "trace-123")
+        self.assertEqual(post.call_args.kwargs["headers"], {"X-Request-ID": "trace-123"})
+
+        generated, _ = self.generate()
+        self.assertEqual(len(generated["X-Request-ID"]), 32)
+
+    def test_request_id_reaches_ml_service_when_streaming(self):
+        ml_response = MagicMock(status_code=200)
+        ml_response.iter_lines.return_value = iter(
+            ["event: result", "data: " + json.dumps(ML_GENERATE_RESULT), ""]
+        )
+
+        with patch.object(get_client().session, "post") as post:
+            post.return_value.__enter__.return_value = ml_response
+            response = self.client.post(
+                "/api/generate/stream/", {"session_id": self.session.id, "prompt": "p"},
+                format="json", headers={"X-Request-ID": "trace-789"}
+            )
+            # The ML call happens while the body is produced
+            post.assert_not_called()
+            body = b"".join(response.streaming_content).decode()
+
+        self.assertIn("event: result", body)
+        self.assertEqual(post.call_args.kwargs["headers"], {"X-Request-ID": "trace-789"})
+
+    def test_metrics_endpoint(self):
+        self.generate()
+
+        self.client.force_authenticate(None)
+        response = self.client.get("/metrics")
+        body = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn('django_request_seconds_count{method="POST",route="api/generate/",status="200"}', body)
+        self.assertIn('django_ml_call_seconds_count{endpoint="generate",outcome="ok"}', body)
+        self.assertIn('django_ml_in_flight{endpoint="generate"} 0.0', body)
+        self.assertIn('django_db_queries_total{route="api/generate/"}', body)
+
+    @override_settings(REQUEST_TIMING_LOG=True)
+    def test_timing_log(self):
+        with patch("builtins.print") as printed:
+            self.generate(**{"X-Request-ID": "trace-456"})
+
+        line = json.loads(printed.call_args.args[0])
+        self.assertEqual(line["request_id"], "trace-456")
+        self.assertEqual(line["route"], "api/generate/")
+        self.assertGreater(line["db_queries"], 0)
+        self.assertIn("ml.generate", line["timings_ms"])
+        self.assertIn("db", line["timings_ms"])
+
+
+# ------------------------
+# ML CLIENT
+# ------------------------
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch("app1.services.ml_client.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    def trip(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.trip()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        self.trip()
+        self.now += 10
+
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        self.now += 10
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.now += 10
+        self.assertTrue(self.breaker.allow())
+
+
+    def test_rejected_call_keeps_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_rejected()
+        self.assertEqual(self.breaker.failures, 1)
+
+        # A rejected half-open trial still shows the service is reachable
+        self.breaker.record_success()
+        self.trip()
+        self.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_rejected()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class MLClientPostTests(SimpleTestCase):
+
+    def setUp(self):
+        self.ml = MLClient(base_url="http://ml.test")
+
+    def respond(self, status, body=b'{"ok": true}'):
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.url = "http://ml.test/embed"
+        return patch.object(self.ml.session, "post", return_value=response)
+
+    def test_body_that_is_not_json_settles_once(self):
+        with self.respond(200, b"<html>gateway</html>"):
+            result = self.ml.post("embed", {"texts": ["x"]})
+
+        self.assertIn("error", result)
+        stats = self.ml.metrics.snapshot()["embed"]
+        self.assertEqual((stats["requests"], stats["errors"]), (1, 1))
+        self.assertEqual(self.ml.breaker.failures, 1)
+
+    def test_client_error_does_not_reset_the_breaker(self):
+        with self.respond(503):
+            self.ml.post("embed", {"texts": ["x"]})
+        with self.respond(400, b'{"detail": "bad"}'):
+            result = self.ml.post("embed", {"texts": ["x"]})
+
+        self.assertIn("400", result["error"])
+        self.assertEqual(self.ml.breaker.failures, 1)
+        self.assertEqual(self.ml.metrics.snapshot()["embed"]["errors"], 2)
+
+    def test_only_transient_errors_are_retryable(self):
+        with self.respond(503):
+            self.assertTrue(self.ml.post("embed", {})["retryable"])
+        with self.respond(422, b'{"detail": []}'):
+            self.assertFalse(self.ml.post("embed", {})["retryable"])
+        with patch.object(self.ml.session, "post", side_effect=requests.exceptions.ConnectionError("refused")):
+            self.assertTrue(self.ml.post("embed", {})["retryable"])
+
+        self.ml.breaker.state = CircuitBreaker.OPEN
+        self.ml.breaker.opened_at = float("inf")
+        self.assertEqual(
+            self.ml.post("embed", {}),
+            {"error": "ML service unavailable (circuit open)", "retryable": True}
+        )
+
+    def test_success_resets_the_breaker(self):
+        with self.respond(503):
+            self.ml.post("embed", {"texts": ["x"]})
+        with self.respond(200):
+            self.assertEqual(self.ml.post("embed", {"texts": ["x"]}), {"ok": True})
+
+        self.assertEqual(self.ml.breaker.failures, 0)
+
+
+class HealthViewTests(APITestCase):
+
+    def test_liveness_is_public_and_minimal(self):
+        response = self.client.get("/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ok"})
+
+    def test_ml_client_snapshot_is_staff_only(self):
+        self.assertEqual(self.client.get("/health/ml").status_code, 401)
+
+        user = User.objects.create_user("writer", password="secret-pass-123")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get("/health/ml").status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        data = self.client.get("/health/ml").json()
+        self.assertEqual(data["breaker"], CircuitBreaker.CLOSED)
+        self.assertIn("endpoints", data)
+
+
+# ------------------------
+# REQUEST COALESCING
+# ------------------------
+
+class CoalescingTests(WriterSessionMixin, APITransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.paragraph = Paragraph.objects.create(session=self.session, content="The rain kept falling.")
+
+    def enhance(self, tone="formal"):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post(
+            "/api/enhance/", {"paragraph_id": self.paragraph.id, "tone": tone}, format="json"
+        )
+
+    def slow_result(self, result):
+        def call(**kwargs):
+            threading.Event().wait(0.3)
+            return dict(result)
+        return call
+
+    @patch("app1.views.call_analyze")
+    def test_concurrent_duplicates_share_one_call(self, call_analyze):
+        call_analyze.side_effect = self.slow_result(ML_ANALYZE_RESULT)
+        responses = []
+
+        threads = [threading.Thread(target=lambda: responses.append(self.enhance())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(call_analyze.call_count, 1)
+        self.assertEqual([r.status_code for r in responses], [200] * 4)
+        self.assertEqual(sorted(r.get("X-Coalesced") or "" for r in responses), ["", "1", "1", "1"])
+        self.assertEqual({r.json()["enhanced_text"] for r in responses}, {"Enhanced text."})
+        self.assertEqual(EnhancementLog.objects.count(), 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).enhancements, 1)
+
+    @patch("app1.views.call_analyze")
+    def test_window_and_distinct_requests(self, call_analyze):
+        call_analyze.side_effect = lambda **kwargs: dict(ML_ANALYZE_RESULT)
+
+        self.enhance()
+        self.assertEqual(self.enhance()["X-Coalesced"], "1")
+        self.assertEqual(call_analyze.call_count, 1)
+
+        self.enhance(tone="casual")
+        self.assertEqual(call_analyze.call_count, 2)
+
+        with override_settings(COALESCE={"WINDOW": 0, "WAIT": 1, "POLL_INTERVAL": 0.05}):
+            self.enhance()
+        self.assertEqual(call_analyze.call_count, 3)
+
+    @patch("app1.views.call_analyze")
+    def test_errors_are_not_shared(self, call_analyze):
+        call_analyze.side_effect = [{"error": "ML service busy"}, dict(ML_ANALYZE_RESULT)]
+
+        self.assertEqual(self.enhance().status_code, 500)
+        self.assertEqual(self.enhance().status_code, 200)
+        self.assertEqual(call_analyze.call_count, 2)
+
+    @patch("app1.views.call_writer")
+    def test_writer_duplicates(self, call_writer):
+        call_writer.side_effect = self.slow_result({**ML_GENERATE_RESULT, "intent_source": "rule"})
+        client = APIClient()
+        client.force_authenticate(self.user)
+        body = {"session_id": self.session.id, "user_input": "Write a story about a fox."}
+        responses = []
+
+        threads = [
+            threading.Thread(target=lambda: responses.append(client.post("/api/writer/", body, format="json")))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(call_writer.call_count, 1)
+        self.assertEqual([r.status_code for r in responses], [200] * 3)
+        self.assertEqual(Paragraph.objects.filter(session=self.session).count(), 2)
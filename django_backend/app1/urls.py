@@ -8,11 +8,21 @@ from .views import (
     DeleteSessionView,
     CreateParagraphView,
     ListParagraphView,
+    ParagraphDetailView,
     EnhanceParagraphView,
+    BatchEnhanceView,
     RetrieveEnhancementView,
     GenerateScriptView,
     WriterView,
+    EnhanceStreamView,
+    GenerateStreamView,
     StatsView,
+    AnalyticsView,
+    SearchView,
+    JobSubmitView,
+    JobDetailView,
+    JobWaitView,
+    JobCancelView,
 )
 
 urlpatterns = [
@@ -30,15 +40,34 @@ urlpatterns = [
     # Paragraphs
     path("paragraph/create/", CreateParagraphView.as_view()),
     path("paragraph/list/<int:session_id>/", ListParagraphView.as_view()),
+    path("paragraph/<int:pk>/", ParagraphDetailView.as_view()),
 
     # Enhancement
     path("enhance/", EnhanceParagraphView.as_view()),
+    path("enhance/batch/", BatchEnhanceView.as_view()),
     path("enhancement/<int:pk>/", RetrieveEnhancementView.as_view()),
     
     # AI
     path("generate/", GenerateScriptView.as_view()),
     path("writer/", WriterView.as_view()),
+
+    # AI (streaming, Server-Sent Events)
+    path("enhance/stream/", EnhanceStreamView.as_view()),
+    path("generate/stream/", GenerateStreamView.as_view()),
     
+    # Background jobs
+    path("jobs/submit/", JobSubmitView.as_view()),
+    path("jobs/<int:pk>/", JobDetailView.as_view()),
+    path("jobs/<int:pk>/wait/", JobWaitView.as_view()),
+    path("jobs/<int:pk>/cancel/", JobCancelView.as_view()),
+
     # Stats
     path("stats/", StatsView.as_view()),
+
+    # Semantic search
+    path("search/", SearchView.as_view()),
+
+    # Analytics
+    path("analytics/", AnalyticsView.as_view()),
+    path("analytics/session/<int:session_id>/", AnalyticsView.as_view()),
 ]
\ No newline at end of file
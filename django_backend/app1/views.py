@@ -1,24 +1,60 @@
+import json
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Length, Substr
+from django.http import StreamingHttpResponse
 from rest_framework.generics import (
     CreateAPIView,
     ListAPIView,
     RetrieveAPIView,
     DestroyAPIView
 )
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
-from .models import WritingSession, Paragraph, EnhancementLog
+from .models import WritingSession, Paragraph, EnhancementLog, Job
+from .pagination import KeysetPagination
 from .serializers import (
+    BatchEnhanceSerializer,
     RegisterSerializer,
     WritingSessionSerializer,
     ParagraphSerializer,
+    ParagraphListSerializer,
+    ParagraphFullListSerializer,
     EnhancementLogSerializer,
     EnhanceParagraphSerializer,
 )
 from rest_framework.views import APIView
-from .services.ml_client import call_generate, call_writer, call_analyze
+from .renderers import EventStreamRenderer, PrometheusRenderer
+from .metrics import render as render_metrics
+from .services.persistence import (
+    save_enhancement,
+    save_enhancements_bulk,
+    save_generated,
+    save_writer_result,
+)
+from .services.ml_client import (
+    call_generate,
+    call_writer,
+    call_analyze,
+    call_analyze_batch,
+    call_embed,
+    get_client,
+    stream_analyze,
+    stream_generate,
+)
 from .serializers import GenerateSerializer, WriterSerializer
+from .serializers import JobSerializer, JobSubmitSerializer
+from .serializers import AnalyticsQuerySerializer, SearchQuerySerializer
+from .services.analytics import get_analytics
+from .services.vector_index import get_index, to_vector, decode_embedding
+from .services.jobs import cancel_job
+from .services.stats import bump, get_stats
+from .services.coalesce import request_key, single_flight
 
 
 # ------------------------
@@ -47,7 +83,9 @@ class CreateSessionView(CreateAPIView):
         print(f"DEBUG: Creating session for user: {self.request.user}")
         print(f"DEBUG: Data: {self.request.data}")
         try:
-            serializer.save(user=self.request.user)
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+                bump(self.request.user.id, sessions=1)
             print("DEBUG: Session created successfully")
         except Exception as e:
             print(f"DEBUG: Error creating session: {str(e)}")
@@ -57,6 +95,7 @@ class CreateSessionView(CreateAPIView):
 class ListSessionView(ListAPIView):
     serializer_class = WritingSessionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return WritingSession.objects.filter(user=self.request.user)
@@ -69,6 +108,18 @@ class DeleteSessionView(DestroyAPIView):
     def get_queryset(self):
         return WritingSession.objects.filter(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            paragraphs = Paragraph.objects.filter(session=instance).count()
+            enhancements = EnhancementLog.objects.filter(paragraph__session=instance).count()
+            instance.delete()
+            bump(
+                self.request.user.id,
+                sessions=-1,
+                paragraphs=-paragraphs,
+                enhancements=-enhancements
+            )
+
 
 # ------------------------
 # PARAGRAPH VIEWS
@@ -84,20 +135,57 @@ class CreateParagraphView(CreateAPIView):
             id=session_id,
             user=self.request.user
         )
-        serializer.save(session=session)
+        with transaction.atomic():
+            serializer.save(session=session)
+            bump(self.request.user.id, paragraphs=1)
 
 
 class ListParagraphView(ListAPIView):
-    serializer_class = ParagraphSerializer
+    """
+    Keyset-paginated paragraphs of a session (see KeysetPagination).
+
+    Rows carry a ``PREVIEW_CHARS`` preview instead of the full text;
+    ``?full=1`` adds ``content`` (e.g. for ``?since=`` refreshes that
+    only fetch new paragraphs). Full single rows: ParagraphDetailView.
+    """
+
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    PREVIEW_CHARS = 200
+
+    def wants_full(self):
+        return self.request.query_params.get("full") in ("1", "true")
+
+    def get_serializer_class(self):
+        if self.wants_full():
+            return ParagraphFullListSerializer
+        return ParagraphListSerializer
 
     def get_queryset(self):
         session_id = self.kwargs.get("session_id")
-        return Paragraph.objects.filter(
+        queryset = Paragraph.objects.filter(
             session__id=session_id,
             session__user=self.request.user
+        ).annotate(
+            preview=Substr("content", 1, self.PREVIEW_CHARS),
+            content_length=Length("content"),
+            enhanced=Exists(EnhancementLog.objects.filter(paragraph=OuterRef("pk"))),
         )
 
+        queryset = queryset.defer("embedding")
+        if not self.wants_full():
+            queryset = queryset.defer("content")
+        return queryset
+
+
+class ParagraphDetailView(RetrieveAPIView):
+    serializer_class = ParagraphSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Paragraph.objects.filter(session__user=self.request.user).defer("embedding")
+
 
 # ------------------------
 # ENHANCEMENT - TRIGGER ML
@@ -117,40 +205,101 @@ class EnhanceParagraphView(CreateAPIView):
         level = serializer.validated_data["level"]
 
         try:
-            paragraph = Paragraph.objects.get(
+            paragraph = Paragraph.objects.select_related("session").get(
                 id=paragraph_id,
                 session__user=request.user
             )
         except Paragraph.DoesNotExist:
             return Response({"error": "Paragraph not found"}, status=404)
 
-        ml_result = call_analyze(
-            text=paragraph.content,
-            session_id=paragraph.session.id,
-            tone=tone,
-            level=level
+        def enhance():
+            ml_result = call_analyze(
+                text=paragraph.content,
+                session_id=paragraph.session.id,
+                tone=tone,
+                level=level
+            )
+            if "error" not in ml_result:
+                save_enhancement(paragraph, ml_result)
+            return ml_result
+
+        ml_result, shared = single_flight(
+            request_key("enhance", request.user.id, paragraph.id, paragraph.content, tone, level),
+            enhance
         )
 
         if "error" in ml_result:
             return Response(ml_result, status=500)
 
-        paragraph.drift_score = ml_result.get("drift_score")
-        paragraph.consistency_score = ml_result.get("consistency_score")
-        paragraph.emotion = ml_result.get("emotion")
-        paragraph.save()
-
-        EnhancementLog.objects.update_or_create(
-            paragraph=paragraph,
-            defaults={
-                "original_text": paragraph.content,
-                "enhanced_text": ml_result.get("enhanced_text"),
-                "explanation": ml_result.get("explanation"),
-                "readability_before": ml_result.get("readability_before"),
-                "readability_after": ml_result.get("readability_after"),
-            }
-        )
+        return Response(ml_result, headers={"X-Coalesced": "1"} if shared else None)
+
+# ------------------------
+# BATCH ENHANCEMENT
+# ------------------------
+
+class BatchEnhanceView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+
+        serializer = BatchEnhanceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        tone = serializer.validated_data["tone"]
+        level = serializer.validated_data["level"]
+
+        paragraphs = Paragraph.objects.select_related("session").filter(session__user=request.user)
+
+        if "session_id" in serializer.validated_data:
+            paragraphs = paragraphs.filter(session_id=serializer.validated_data["session_id"])
+        if "paragraph_ids" in serializer.validated_data:
+            paragraphs = paragraphs.filter(id__in=serializer.validated_data["paragraph_ids"])
+
+        paragraphs = list(paragraphs.order_by("session_id", "created_at", "id"))
+
+        if not paragraphs:
+            return Response({"error": "No paragraphs found"}, status=404)
+
+        # Drift is tracked per session on the ML side, so send one batch
+        # per session, each in session order. Each session is saved as
+        # soon as it succeeds, so a failure in one does not undo another:
+        # partial success is reported as 207 with the failed sessions.
+        by_session = {}
+        for paragraph in paragraphs:
+            by_session.setdefault(paragraph.session_id, []).append(paragraph)
+
+        results, errors = [], []
+
+        for session_id, session_paragraphs in by_session.items():
+
+            ml_result = call_analyze_batch(
+                session_id=session_id,
+                items=[
+                    {"text": p.content, "tone": tone, "level": level}
+                    for p in session_paragraphs
+                ]
+            )
+
+            if "error" in ml_result:
+                errors.append({
+                    "session_id": session_id,
+                    "paragraph_ids": [p.id for p in session_paragraphs],
+                    "error": ml_result["error"],
+                })
+                continue
+
+            save_enhancements_bulk(session_paragraphs, ml_result["results"])
+
+            results.extend(
+                {"paragraph_id": p.id, **r}
+                for p, r in zip(session_paragraphs, ml_result["results"])
+            )
+
+        if not errors:
+            return Response({"results": results})
+
+        return Response({"results": results, "errors": errors}, status=207 if results else 500)
 
-        return Response(ml_result)
 
 # ------------------------
 # ENHANCEMENT RETRIEVE
@@ -189,13 +338,7 @@ class GenerateScriptView(APIView):
         if "error" in ml_result:
             return Response(ml_result, status=500)
 
-        Paragraph.objects.create(
-            session=session,
-            content=ml_result.get("generated_text"),
-            drift_score=ml_result.get("drift_score"),
-            consistency_score=ml_result.get("consistency_score"),
-            emotion=ml_result.get("emotion")
-        )
+        save_generated(session, ml_result)
 
         return Response(ml_result)
 
@@ -217,54 +360,357 @@ class WriterView(APIView):
         except WritingSession.DoesNotExist:
             return Response({"error": "Session not found"}, status=404)
 
-        ml_result = call_writer(**serializer.validated_data)
+        def write():
+            ml_result = call_writer(**serializer.validated_data)
+            if "error" not in ml_result:
+                save_writer_result(
+                    session,
+                    serializer.validated_data["user_input"],
+                    ml_result
+                )
+            return ml_result
+
+        ml_result, shared = single_flight(
+            request_key("writer", request.user.id, serializer.validated_data),
+            write
+        )
 
         if "error" in ml_result:
             return Response(ml_result, status=500)
 
-        if ml_result.get("mode") == "enhancement":
+        return Response(ml_result, headers={"X-Coalesced": "1"} if shared else None)
+
+# ------------------------
+# STREAMING (SSE) PROXIES
+# ------------------------
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+class EnhanceStreamView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request):
+
+        serializer = EnhanceParagraphSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-            paragraph = Paragraph.objects.create(
-                session=session,
-                content=ml_result.get("enhanced_text") or serializer.validated_data["user_input"],
-                drift_score=ml_result.get("drift_score"),
-                consistency_score=ml_result.get("consistency_score"),
-                emotion=ml_result.get("emotion")
+        try:
+            paragraph = Paragraph.objects.select_related("session").get(
+                id=serializer.validated_data["paragraph_id"],
+                session__user=request.user
             )
+        except Paragraph.DoesNotExist:
+            return Response({"error": "Paragraph not found"}, status=404)
+
+        def events():
+            for event, data in stream_analyze(
+                text=paragraph.content,
+                session_id=paragraph.session.id,
+                tone=serializer.validated_data["tone"],
+                level=serializer.validated_data["level"]
+            ):
+                # Persist before the client sees the final event.
+                if event == "result":
+                    save_enhancement(paragraph, data)
+                yield sse(event, data)
+
+        return event_stream(events())
+
+
+class GenerateStreamView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request):
+
+        serializer = GenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-            EnhancementLog.objects.update_or_create(
-                paragraph=paragraph,
-                defaults={
-                    "original_text": serializer.validated_data["user_input"],
-                    "enhanced_text": ml_result.get("enhanced_text"),
-                    "explanation": ml_result.get("explanation"),
-                    "readability_before": ml_result.get("readability_before"),
-                    "readability_after": ml_result.get("readability_after"),
-                }
+        try:
+            session = WritingSession.objects.get(
+                id=serializer.validated_data["session_id"],
+                user=request.user
             )
+        except WritingSession.DoesNotExist:
+            return Response({"error": "Session not found"}, status=404)
+
+        def events():
+            for event, data in stream_generate(**serializer.validated_data):
+                if event == "result":
+                    paragraph = save_generated(session, data)
+                    data["paragraph_id"] = paragraph.id
+                yield sse(event, data)
+
+        return event_stream(events())
+
+
+# ------------------------
+# BACKGROUND JOBS
+# ------------------------
+
+JOB_PAYLOAD_SERIALIZERS = {
+    Job.KIND_GENERATE: GenerateSerializer,
+    Job.KIND_WRITER: WriterSerializer,
+    Job.KIND_ENHANCE: EnhanceParagraphSerializer,
+}
+
+# A waiting request holds a sync worker, so keep the wait short and let
+# the client come back (202 + Retry-After) rather than park it for long.
+JOB_WAIT_MAX_SECONDS = 5
+JOB_WAIT_POLL_SECONDS = 0.5
+JOB_RETRY_AFTER_SECONDS = 2
+
+
+class JobSubmitView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
 
+        serializer = JobSubmitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        kind = serializer.validated_data["kind"]
+        key = (
+            serializer.validated_data.get("idempotency_key")
+            or request.headers.get("Idempotency-Key")
+        )
+
+        if key:
+            existing = Job.objects.filter(user=request.user, idempotency_key=key).first()
+            if existing:
+                return Response(JobSerializer(existing).data)
+
+        payload = JOB_PAYLOAD_SERIALIZERS[kind](data=serializer.validated_data["payload"])
+        payload.is_valid(raise_exception=True)
+
+        if kind == Job.KIND_ENHANCE:
+            found = Paragraph.objects.filter(
+                id=payload.validated_data["paragraph_id"],
+                session__user=request.user
+            ).exists()
         else:
-            Paragraph.objects.create(
-                session=session,
-                content=ml_result.get("generated_text") or serializer.validated_data["user_input"],
-                drift_score=ml_result.get("drift_score"),
-                consistency_score=ml_result.get("consistency_score"),
-                emotion=ml_result.get("emotion")
+            found = WritingSession.objects.filter(
+                id=payload.validated_data["session_id"],
+                user=request.user
+            ).exists()
+
+        if not found:
+            return Response({"error": "Target not found"}, status=404)
+
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(
+                    user=request.user,
+                    kind=kind,
+                    payload=payload.validated_data,
+                    idempotency_key=key
+                )
+        except IntegrityError:
+            # Lost a race with an identical submission.
+            job = Job.objects.get(user=request.user, idempotency_key=key)
+            return Response(JobSerializer(job).data)
+
+        return Response(JobSerializer(job).data, status=202)
+
+
+class JobDetailView(RetrieveAPIView):
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+
+class JobWaitView(APIView):
+    """
+    Long-poll: 200 once the job has finished, or 202 with Retry-After if
+    it is still queued / running after ``timeout`` seconds (at most
+    JOB_WAIT_MAX_SECONDS).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+
+        try:
+            timeout = float(request.query_params.get("timeout", JOB_WAIT_MAX_SECONDS))
+        except ValueError:
+            timeout = JOB_WAIT_MAX_SECONDS
+        timeout = max(0.0, min(timeout, JOB_WAIT_MAX_SECONDS))
+
+        try:
+            job = Job.objects.get(id=pk, user=request.user)
+        except Job.DoesNotExist:
+            return Response({"error": "Job not found"}, status=404)
+
+        deadline = time.monotonic() + timeout
+
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(JOB_WAIT_POLL_SECONDS)
+            job.refresh_from_db()
+
+        if not job.is_finished:
+            return Response(
+                JobSerializer(job).data,
+                status=202,
+                headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)}
             )
 
-        return Response(ml_result)
+        return Response(JobSerializer(job).data)
+
+
+class JobCancelView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+
+        try:
+            job = Job.objects.get(id=pk, user=request.user)
+        except Job.DoesNotExist:
+            return Response({"error": "Job not found"}, status=404)
+
+        return Response(JobSerializer(cancel_job(job)).data)
+
+
+# ------------------------
+# ANALYTICS
+# ------------------------
+
+class AnalyticsView(APIView):
+    """
+    Drift/consistency histograms, emotion distribution and drift,
+    consistency and readability trends, aggregated in the database for
+    all of the user's sessions or for ``session_id``.
+
+    Query: ``bins`` (histogram buckets over [0, 1]), ``bucket``
+    (hour/day/week/month) and ``days`` (trend window).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id=None):
+
+        serializer = AnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        if session_id is not None and not WritingSession.objects.filter(
+            id=session_id,
+            user=request.user
+        ).exists():
+            return Response({"error": "Session not found"}, status=404)
+
+        return Response(get_analytics(
+            request.user.id,
+            session_id=session_id,
+            **serializer.validated_data
+        ))
+
+
+# ------------------------
+# SEMANTIC SEARCH
+# ------------------------
+
+class SearchView(APIView):
+    """
+    "Find similar passages": embeds ``q`` once on the ML service and
+    ranks the user's stored paragraph embeddings against it (see
+    services/vector_index.py). ``session_id`` limits the search to one
+    session; ``k`` is the number of hits.
+    """
 
-class StatsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    PREVIEW_CHARS = 200
+
     def get(self, request):
-        paragraphs_count = Paragraph.objects.filter(session__user=request.user).count()
-        enhancements_count = EnhancementLog.objects.filter(paragraph__session__user=request.user).count()
-        sessions_count = WritingSession.objects.filter(user=request.user).count()
-        
+
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        session_id = serializer.validated_data.get("session_id")
+        if session_id is not None and not WritingSession.objects.filter(
+            id=session_id,
+            user=request.user
+        ).exists():
+            return Response({"error": "Session not found"}, status=404)
+
+        ml_result = call_embed([serializer.validated_data["q"]])
+
+        if "error" in ml_result:
+            return Response(ml_result, status=500)
+
+        query = to_vector(decode_embedding(ml_result["embeddings"][0]))
+        index = get_index(request.user.id)
+        hits = index.search(query, serializer.validated_data["k"], session_id)
+
+        rows = {
+            row["id"]: row
+            for row in Paragraph.objects.filter(
+                id__in=[paragraph_id for paragraph_id, _ in hits],
+                session__user=request.user
+            ).annotate(
+                preview=Substr("content", 1, self.PREVIEW_CHARS)
+            ).values("id", "session_id", "preview", "emotion", "created_at")
+        }
+
         return Response({
-            "total_paragraphs": paragraphs_count,
-            "total_enhancements": enhancements_count,
-            "total_sessions": sessions_count,
-            "ai_operations": paragraphs_count + enhancements_count
+            "results": [
+                {**rows[paragraph_id], "score": round(score, 4)}
+                for paragraph_id, score in hits
+                if paragraph_id in rows
+            ],
+            "index": {"kind": index.kind, "size": len(index)},
         })
+
+
+class StatsView(APIView):
+    """Dashboard counters from the denormalised UserStats row (see services/stats.py)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_stats(request.user.id))
+
+
+# ------------------------
+# METRICS
+# ------------------------
+
+class MetricsView(APIView):
+    """Prometheus scrape target: request, database and ML-call series of this process."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class HealthView(APIView):
+    """Liveness only; anything about the ML service is in MLClientHealthView."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        return Response({"status": "ok"})
+
+
+class MLClientHealthView(APIView):
+    """This process's ML client: breaker state and per-endpoint call stats (staff only)."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_client().snapshot())
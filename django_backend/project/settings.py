@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app1.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -83,11 +86,68 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# DB_ENGINE=sqlite (default) or postgres. SQLite is tuned per connection by
+# app1/db.py (SQLITE_PRAGMAS below) and takes its write lock at BEGIN, so
+# concurrent writers queue on busy_timeout instead of failing with
+# "database is locked" when a read transaction tries to upgrade.
+
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DB_NAME", "atarva"),
+            'USER': os.getenv("DB_USER", "postgres"),
+            'PASSWORD': os.getenv("DB_PASSWORD", ""),
+            'HOST': os.getenv("DB_HOST", "127.0.0.1"),
+            'PORT': os.getenv("DB_PORT", "5432"),
+            # Keep connections open across requests, and check them before reuse
+            'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+            },
+        }
     }
+
+    # psycopg 3 connection pool per process instead of one persistent
+    # connection per thread (needs psycopg[pool]; CONN_MAX_AGE must be 0).
+    if os.getenv("DB_POOL_MAX_SIZE"):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DB_POOL_MAX_SIZE")),
+            'timeout': int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DB_NAME", BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # The default in-memory test database has no WAL and shares
+            # one cache between threads, so ConcurrentWriteStressTests
+            # would not exercise the locking settings below. Keep it on
+            # disk, outside the source tree.
+            'TEST': {
+                'NAME': os.getenv(
+                    "TEST_DB_NAME",
+                    os.path.join(tempfile.gettempdir(), 'atarva_test_db.sqlite3')
+                ),
+            },
+        }
+    }
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    'mmap_size': int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    'temp_store': 'MEMORY',
 }
 
 
@@ -146,3 +206,65 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
+
+
+# ML service client (app1/services/ml_client.py)
+ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://127.0.0.1:8001")
+
+ML_CLIENT = {
+    # Read timeouts in seconds, per endpoint
+    'TIMEOUTS': {
+        'default': 60,
+        'analyze': 90,
+        'analyze_batch': 600,
+        'generate': 180,
+        'writer': 180,
+        'analyze_stream': 180,
+        'generate_stream': 180,
+        'embed': 30,
+    },
+    'CONNECT_TIMEOUT': float(os.getenv("ML_CONNECT_TIMEOUT", "3")),
+    # In-flight calls per Django process; extra callers wait ACQUIRE_TIMEOUT then fail fast
+    'MAX_CONCURRENCY': int(os.getenv("ML_MAX_CONCURRENCY", "32")),
+    'ACQUIRE_TIMEOUT': float(os.getenv("ML_ACQUIRE_TIMEOUT", "2")),
+    'POOL_SIZE': int(os.getenv("ML_POOL_SIZE", "32")),
+    'BREAKER_FAILURE_THRESHOLD': int(os.getenv("ML_BREAKER_FAILURES", "5")),
+    'BREAKER_RESET_TIMEOUT': float(os.getenv("ML_BREAKER_RESET", "30")),
+}
+
+
+# Background jobs (app1/services/jobs.py): a job whose ML call fails, or
+# whose worker dies, is put back on the queue until it has been tried
+# this many times.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+# One JSON line per request (route, status, ms, database and ML service
+# time) from app1/middleware.py; series are always on at /metrics.
+REQUEST_TIMING_LOG = os.getenv("REQUEST_TIMING_LOG", "0") == "1"
+
+
+# Identical enhance / writer requests share one ML call (app1/services/coalesce.py):
+# repeats wait for the running one, or reuse its answer for WINDOW seconds.
+# WINDOW 0 turns the guard off.
+COALESCE = {
+    'WINDOW': float(os.getenv("COALESCE_WINDOW", "5")),
+    'WAIT': float(os.getenv("COALESCE_WAIT", str(ML_CLIENT['TIMEOUTS']['writer']))),
+    'POLL_INTERVAL': 0.05,
+}
+
+
+# Dashboard counters (app1/services/stats.py) are served from the default
+# cache for this many seconds; writes invalidate them on commit.
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "30"))
+
+# Aggregated analytics (app1/services/analytics.py); also dropped on write.
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+
+# Semantic search (app1/services/vector_index.py): users with more embedded
+# paragraphs than this get an IVF index instead of a flat scan.
+VECTOR_INDEX = {
+    'IVF_THRESHOLD': int(os.getenv("VECTOR_IVF_THRESHOLD", "5000")),
+    'NPROBE': int(os.getenv("VECTOR_NPROBE", "8")),
+    'CACHED_USERS': int(os.getenv("VECTOR_CACHED_USERS", "64")),
+}
@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.urls import path,include
 
+from app1.views import HealthView, MetricsView, MLClientHealthView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/',include('app1.urls')),
+    path('metrics', MetricsView.as_view()),
+    path('health', HealthView.as_view()),
+    path('health/ml', MLClientHealthView.as_view()),
 ]
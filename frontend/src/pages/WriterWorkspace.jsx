@@ -17,7 +17,11 @@ const WriterWorkspace = () => {
     const navigate = useNavigate();
     const sessionId = location.state?.sessionId;
     const scrollRef = useRef(null);
+    const sentinelRef = useRef(null);
+    const stickToBottom = useRef(false);
     const [copiedId, setCopiedId] = useState(null);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const [options, setOptions] = useState({
         mode: 'enhance', // Default to Enhance as per user's preference in text
@@ -37,16 +41,64 @@ const WriterWorkspace = () => {
         fetchParagraphs();
     }, [sessionId]);
 
+    // Only jump to the end for the user's own new output, not for pages
+    // loaded by scrolling (that would pull in the next page, and the next).
     useEffect(() => {
-        if (scrollRef.current) {
+        if (stickToBottom.current && scrollRef.current) {
             scrollRef.current.scrollTop = scrollRef.current.scrollHeight;
+            stickToBottom.current = false;
         }
     }, [paragraphs]);
 
+    // Load the next page when the end of the list scrolls into view.
+    useEffect(() => {
+        if (!nextCursor || !sentinelRef.current) return;
+        const observer = new IntersectionObserver(
+            (entries) => entries[0].isIntersecting && loadMore(),
+            { root: scrollRef.current, rootMargin: '400px' }
+        );
+        observer.observe(sentinelRef.current);
+        return () => observer.disconnect();
+    }, [nextCursor, paragraphs, loadingMore]);
+
+    const appendPage = (res) => {
+        setParagraphs((prev) => {
+            const seen = new Set(prev.map((p) => p.id));
+            return [...prev, ...res.data.results.filter((p) => !seen.has(p.id))];
+        });
+        setNextCursor(res.data.next);
+    };
+
+    // First page only; further pages come from loadMore.
     const fetchParagraphs = async () => {
         try {
-            const res = await listParagraphs(sessionId);
-            setParagraphs(res.data);
+            const res = await listParagraphs(sessionId, { full: true });
+            setParagraphs(res.data.results);
+            setNextCursor(res.data.next);
+        } catch (err) {
+            console.error(err);
+        }
+    };
+
+    const loadMore = async () => {
+        if (loadingMore || !nextCursor) return;
+        setLoadingMore(true);
+        try {
+            appendPage(await listParagraphs(sessionId, { cursor: nextCursor, full: true }));
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    // After a send: the page after the last paragraph shown, which holds the
+    // new output once every earlier page is loaded.
+    const fetchNewParagraphs = async () => {
+        const lastId = paragraphs.length ? paragraphs[paragraphs.length - 1].id : undefined;
+        try {
+            stickToBottom.current = !nextCursor;
+            appendPage(await listParagraphs(sessionId, { sinceId: lastId, full: true }));
         } catch (err) {
             console.error(err);
         }
@@ -73,7 +125,7 @@ const WriterWorkspace = () => {
             });
 
             toast.success(options.mode === 'generate' ? "Script generated!" : "Content enhanced!");
-            await fetchParagraphs();
+            await fetchNewParagraphs();
         } catch (err) {
             toast.error("Failed to process request");
             setInput(currentInput);
@@ -192,6 +244,18 @@ const WriterWorkspace = () => {
                     ))}
                 </AnimatePresence>
 
+                {nextCursor && (
+                    <div ref={sentinelRef} className="flex justify-center">
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="px-5 py-2 rounded-xl text-xs font-bold text-gray-400 hover:text-white hover:bg-white/5 transition-all"
+                        >
+                            {loadingMore ? <Loader2 className="w-4 h-4 animate-spin" /> : 'Load more'}
+                        </button>
+                    </div>
+                )}
+
                 {loading && (
                     <motion.div
                         initial={{ opacity: 0 }}
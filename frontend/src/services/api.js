@@ -29,13 +29,33 @@ axios.interceptors.response.use(
     }
 );
 
+// List endpoints are keyset-paginated: { results, next, cursor }.
+// Follows `next` until exhausted and returns the rows as `data`.
+const fetchAllPages = async (url, params = {}) => {
+    let res = await axios.get(url, { params: { limit: 200, ...params } });
+    const rows = [...res.data.results];
+    while (res.data.next) {
+        res = await axios.get(url, { params: { limit: 200, ...params, cursor: res.data.next } });
+        rows.push(...res.data.results);
+    }
+    return { ...res, data: rows };
+};
+
 // Sessions
-export const listSessions = () => axios.get(`${API_BASE}/session/list/`);
+export const listSessions = () => fetchAllPages(`${API_BASE}/session/list/`);
 export const createSession = (title) => axios.post(`${API_BASE}/session/create/`, { title });
 export const deleteSession = (id) => axios.delete(`${API_BASE}/session/delete/${id}/`);
 
 // Paragraphs
-export const listParagraphs = (sessionId) => axios.get(`${API_BASE}/paragraph/list/${sessionId}/`);
+// One page at a time: { results, next, cursor }. Pass cursor (a page's `next`)
+// for the following page, or sinceId (last paragraph id already loaded) to
+// fetch only newer paragraphs. Rows carry a `preview`; pass full: true where
+// the whole `content` is shown.
+export const listParagraphs = (sessionId, { cursor, sinceId, full = false, limit = 50 } = {}) => axios.get(
+    `${API_BASE}/paragraph/list/${sessionId}/`,
+    { params: { limit, ...(full && { full: 1 }), ...(cursor ? { cursor } : sinceId && { since: sinceId }) } }
+);
+export const getParagraph = (id) => axios.get(`${API_BASE}/paragraph/${id}/`);
 export const createParagraph = (sessionId, content) => axios.post(`${API_BASE}/paragraph/create/`, { session: sessionId, content });
 
 // AI
@@ -43,3 +63,10 @@ export const generateScript = (data) => axios.post(`${API_BASE}/generate/`, data
 export const writerAPI = (data) => axios.post(`${API_BASE}/writer/`, data);
 export const enhanceParagraph = (data) => axios.post(`${API_BASE}/enhance/`, data);
 export const fetchStats = () => axios.get(`${API_BASE}/stats/`);
+
+// Analytics (aggregated server-side; params: bins, bucket, days)
+export const fetchAnalytics = (params) => axios.get(`${API_BASE}/analytics/`, { params });
+export const fetchSessionAnalytics = (sessionId, params) => axios.get(`${API_BASE}/analytics/session/${sessionId}/`, { params });
+
+// Semantic search over the user's own paragraphs (params: q, k, session_id)
+export const searchPassages = (params) => axios.get(`${API_BASE}/search/`, { params });
@@ -0,0 +1,103 @@
+# ml_service/benchmarks/bench_drift.py
+#
+# Checks the incremental drift engine against a direct recomputation
+# from the full paragraph history, and times one update per backend.
+#
+# Usage (from ml_service/):
+#   python benchmarks/bench_drift.py [--paragraphs 2000] [--window 8] [--check]
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.drift_engine import DriftEngine, unit  # noqa: E402
+from utils.session_store import create_session_store  # noqa: E402
+
+DIM = 384
+TOLERANCE = 1e-4
+
+
+def reference(history, vector, window, alpha):
+    """Drift of ``vector`` against ``history`` (unit vectors), recomputed from scratch."""
+
+    if not history:
+        return 0.0, 0.0, 0.0
+
+    centroid = history[0].astype(np.float64)
+    for previous in history[1:]:
+        centroid = (1 - alpha) * centroid + alpha * previous
+
+    window_mean = np.sum(history[-window:], axis=0)
+
+    def drift(direction):
+        return 1 - float(np.dot(vector, direction) / np.linalg.norm(direction))
+
+    return drift(history[-1]), drift(window_mean), drift(centroid)
+
+
+def random_walk(count, seed=0):
+    # Paragraphs that wander slowly, with occasional topic jumps
+    rng = np.random.default_rng(seed)
+    position = rng.normal(size=DIM)
+    for i in range(count):
+        if i % 200 == 199:
+            position = rng.normal(size=DIM)
+        position = position + 0.3 * rng.normal(size=DIM)
+        yield position.astype(np.float32)
+
+
+def run(backend, paragraphs, window, alpha, check):
+    with tempfile.TemporaryDirectory() as directory:
+        kwargs = {"directory": directory, "shards": 1, "slots": 4} if backend == "mmap" else {}
+        engine = DriftEngine(create_session_store(backend, dim=DIM, **kwargs), window=window, alpha=alpha)
+
+        history, latencies, worst = [], [], 0.0
+
+        for embedding in random_walk(paragraphs):
+            started = time.perf_counter()
+            result = engine.update(1, embedding)
+            latencies.append((time.perf_counter() - started) * 1e6)
+
+            if check:
+                vector = unit(embedding)
+                expected = reference(history, vector, window, alpha)
+                got = (result["drift_score"], result["window_drift"], result["centroid_drift"])
+                worst = max(worst, max(abs(a - b) for a, b in zip(expected, got)))
+                history.append(vector)
+
+        latencies.sort()
+        print(
+            f"{backend:>6}: p50 {statistics.median(latencies):7.1f} µs  "
+            f"p99 {latencies[int(len(latencies) * 0.99)]:7.1f} µs"
+            + (f"  max |Δ| vs reference {worst:.2e}" if check else "")
+        )
+        return worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=8)
+    parser.add_argument("--alpha", type=float, default=0.2)
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any score is off by > 1e-4.")
+    args = parser.parse_args()
+
+    worst = max(
+        run(backend, args.paragraphs, args.window, args.alpha, args.check)
+        for backend in ("memory", "mmap")
+    )
+
+    if args.check and worst > TOLERANCE:
+        print(f"FAIL: drift differs from the reference by {worst:.2e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# ml_service/benchmarks/bench_embedding.py
+#
+# Compare the embedding backends on this machine:
+#   - per-encode latency at batch size 1 and 32
+#   - resident memory added by loading each backend
+#   - parity: cosine similarity of every row against the PyTorch output
+#
+# Usage (from ml_service/):
+#   python benchmarks/bench_embedding.py [--backends onnx onnx-int8] [--check]
+#
+# With --check the script exits non-zero when a backend falls below its
+# parity threshold, so it can gate a deployment that flips EMBEDDING_BACKEND.
+# tests/test_onnx_parity.py checks the same thresholds.
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.onnx_embedder import OnnxEmbedder  # noqa: E402
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+PARITY_THRESHOLDS = {
+    "onnx": 0.999,
+    "onnx-int8": 0.98,
+}
+
+CORPUS = [
+    "The rain had not stopped for three days, and the river was rising.",
+    "Please rewrite this paragraph in a more formal tone for the report.",
+    "She opened the letter slowly, afraid of what it might say.",
+    "Quarterly revenue grew by twelve percent, driven by subscription renewals.",
+    "Write a short fantasy story about a dragon who is afraid of heights.",
+    "The experiment failed because the control group was contaminated.",
+    "He laughed so hard that the whole table turned to look at him.",
+    "Night fell over the city, and the neon signs flickered to life one by one.",
+] * 8
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load(backend):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_NAME)
+    return OnnxEmbedder(MODEL_NAME, quantize=backend == "onnx-int8")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    failed = False
+    reference = None
+
+    for backend in ["torch"] + args.backends:
+
+        before = rss_mb()
+        model = load(backend)
+        model.encode(CORPUS[:2])  # warm up
+        loaded = rss_mb() - before
+
+        single = timed(lambda: model.encode(CORPUS[:1]), args.repeat)
+        batched = timed(lambda: model.encode(CORPUS[:32], batch_size=32), max(args.repeat // 4, 1))
+
+        embeddings = np.asarray(model.encode(CORPUS, batch_size=32), dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        if reference is None:
+            reference = embeddings
+            parity = "reference"
+        else:
+            cosines = (reference * embeddings).sum(axis=1)
+            parity = f"min cos {cosines.min():.5f}, mean {cosines.mean():.5f}"
+            if cosines.min() < PARITY_THRESHOLDS.get(backend, 0.99):
+                parity += "  FAIL"
+                failed = True
+
+        print(
+            f"{backend:10s} batch1 {single:7.2f} ms | batch32 {batched:8.2f} ms "
+            f"| +RSS {loaded:7.1f} MB | {parity}"
+        )
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# ml_service/benchmarks/bench_intent.py
+#
+# Accuracy, coverage and latency of the local intent fast path
+# (models/intent_classifier.py) on benchmarks/data/intent_eval.jsonl.
+#
+#   coverage   share of inputs answered without the LLM
+#   accuracy   of those local answers
+#   saved      LLM round trips avoided x LLM latency, minus local cost
+#
+# The LLM latency is measured against Groq when --llm is given (needs
+# GROQ_API_KEY), else taken from --llm-ms. --rules-only skips MiniLM.
+# Fixed rule cases (RULE_CASES) are checked first and fail the run.
+#
+# Usage (from ml_service/):
+#   python benchmarks/bench_intent.py [--rules-only] [--llm | --llm-ms 400] [--check 0.9]
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.intent_classifier import (  # noqa: E402
+    ENHANCEMENT, GENERATION, IntentClassifier, apply_rules, LANGUAGE_TAG
+)
+
+EVAL_SET = Path(__file__).resolve().parent / "data" / "intent_eval.jsonl"
+
+FILLER = (
+    "The old lighthouse keeper had watched the same stretch of grey water for forty years, "
+    "counting ships, logging storms and mending the lamp whenever the winter wind cracked its glass. "
+)
+
+# (text, task the rules must give; None = leave it to the prototypes / LLM)
+RULE_CASES = [
+    ("Write a story about a lighthouse keeper. " + FILLER * 4, GENERATION),
+    ("Tell me a long story, nothing fancy. " + FILLER * 4, GENERATION),
+    ("I want a screenplay. " + FILLER * 4, None),
+    (FILLER * 4, ENHANCEMENT),
+    (FILLER, None),
+    # Pasted prose that mentions a story is not a request for one
+    ("The story of our founding is simple: two friends, one garage and a loan.", None),
+    ("Once upon a time I worked at a bank; the hours were long and the coffee was worse.", None),
+    ("She sat down to write a story about her father. " + FILLER, None),
+    ("Please write a short poem about rain.", GENERATION),
+    ("Can you tell me a story about a brave rabbit?", GENERATION),
+]
+
+
+def check_rules():
+    """
+    The lexical rules: generation needs an imperative request, and
+    generation cues must beat the long-input shortcut.
+    """
+
+    failures = []
+    for text, expected in RULE_CASES:
+        task, reason = apply_rules(text)
+        if task != expected:
+            failures.append(f"rules gave {task} ({reason}), expected {expected}: {text[:50]}...")
+    return failures
+
+
+def load_eval_set(path=EVAL_SET):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def classify_rules_only(text):
+    task, reason = apply_rules(LANGUAGE_TAG.sub("", text))
+    return ({"task_type": task} if task else None), {"source": reason}
+
+
+async def measure_llm(examples):
+    from models.intent_model import classify_with_llm, parse_intent
+
+    latencies, correct = [], 0
+    for example in examples:
+        started = time.perf_counter()
+        raw = await classify_with_llm(example["text"])
+        latencies.append((time.perf_counter() - started) * 1000)
+        try:
+            correct += parse_intent(raw).get("task_type") == example["task_type"]
+        except Exception:
+            pass
+    return statistics.median(latencies), correct / len(examples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules-only", action="store_true")
+    parser.add_argument("--llm", action="store_true", help="Measure real LLM latency and accuracy.")
+    parser.add_argument("--llm-ms", type=float, default=400.0, help="Assumed LLM latency without --llm.")
+    parser.add_argument("--check", type=float, help="Exit 1 if local accuracy is below this.")
+    args = parser.parse_args()
+
+    failures = check_rules()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+    examples = load_eval_set()
+
+    if args.rules_only:
+        classify = classify_rules_only
+    else:
+        from models.embedding_model import encode_batch
+        classifier = IntentClassifier(encode_batch)
+        classifier._load_prototypes()  # not part of the per-request cost
+        classify = classifier.classify
+
+    latencies, answered, correct, sources = [], 0, 0, {}
+    misses = []
+
+    for example in examples:
+        started = time.perf_counter()
+        intent, info = classify(example["text"])
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        source = info["source"] if intent is not None else "llm"
+        sources[source] = sources.get(source, 0) + 1
+
+        if intent is not None:
+            answered += 1
+            if intent["task_type"] == example["task_type"]:
+                correct += 1
+            else:
+                misses.append(example["text"])
+
+    llm_ms, llm_accuracy = args.llm_ms, None
+    if args.llm:
+        llm_ms, llm_accuracy = asyncio.run(measure_llm(examples))
+
+    coverage = answered / len(examples)
+    accuracy = correct / answered if answered else 0.0
+    local_ms = statistics.median(latencies)
+    saved_ms = coverage * llm_ms - local_ms
+
+    print(f"examples        {len(examples)}")
+    print(f"sources         {sources}")
+    print(f"coverage        {coverage:.1%}")
+    print(f"local accuracy  {accuracy:.1%} ({correct}/{answered})")
+    if llm_accuracy is not None:
+        print(f"llm accuracy    {llm_accuracy:.1%}")
+    print(f"local p50       {local_ms:.2f} ms   p95 {sorted(latencies)[int(len(latencies) * 0.95)]:.2f} ms")
+    print(f"llm p50         {llm_ms:.0f} ms" + ("" if args.llm else " (assumed)"))
+    print(f"saved / request {saved_ms:.0f} ms on average")
+
+    for text in misses:
+        print(f"  miss: {text}")
+
+    if args.check is not None and accuracy < args.check:
+        print(f"FAIL: local accuracy below {args.check:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# ml_service/benchmarks/bench_long.py
+#
+# Long-document mode (/analyze/long): wall time against chunk count and
+# concurrency, with the LLM replaced by the in-process fake Groq server
+# (benchmarks/fake_groq.py) and a random stand-in for MiniLM, so only the
+# chunking, scheduling and stitching are measured.
+#
+# With concurrency >= chunks the rewrite should take about as long as the
+# slowest chunk; with concurrency 1, the sum of all chunks. Before timing,
+# splitting and stitching a dialogue-heavy text unchanged must give the
+# text back byte for byte.
+#
+# Usage (from ml_service/):
+#   python benchmarks/bench_long.py [--words 4000] [--latency fixed:400] [--concurrency 1,4,8,32] [--check]
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("GROQ_API_KEY", "fake")
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+os.environ.setdefault("ML_WARMUP", "0")
+os.environ.setdefault("ML_COALESCE", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import models.embedding_model as embedding_model  # noqa: E402
+from fake_groq import WORDS, FakeConfig, create_app  # noqa: E402
+from pipelines.long_document import clean_rewrite, split_into_chunks, stitch  # noqa: E402
+from utils import llm_gateway  # noqa: E402
+from utils.llm_cache import llm_cache  # noqa: E402
+
+
+class RandomEncoder:
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        return np.random.default_rng(len(texts)).random((len(texts), 384), dtype=np.float32)
+
+
+def manuscript(words, seed=0):
+    rng = random.Random(seed)
+    paragraphs, total = [], 0
+    while total < words:
+        sentences = []
+        for _ in range(rng.choice([1, 2, 4, 8, 20])):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20)))
+            sentences.append(sentence.capitalize() + ".")
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph.split())
+    return "\n\n".join(paragraphs)
+
+
+DIALOGUE = [
+    'He said "Stop." Then he ran (as fast as he could). "Why?" she asked.',
+    "'Wait!' The door slammed [loudly]. Nobody answered... \"Hello?\" (Silence.)",
+    "She whispered, \u201cNot yet.\u201d He nodded \u2018slowly\u2019! Was it over?",
+]
+
+
+def check_round_trip():
+    """Split + stitch must be lossless, at every chunk size."""
+
+    failures = []
+    text = "\n\n".join(" ".join(DIALOGUE[i % 3] for i in range(n)) for n in (1, 4, 12, 40))
+
+    for max_tokens in (16, 64, 350):
+        chunks = split_into_chunks(text, max_tokens)
+        if stitch(chunks, [c.text for c in chunks]) != text:
+            failures.append(f"split + stitch is not lossless at max_chunk_tokens={max_tokens}")
+
+    packed = next(c for c in split_into_chunks(text, 350) if len(c.paragraphs) > 1)
+    if clean_rewrite(packed, "one merged paragraph") is not None:
+        failures.append("a rewrite that merged paragraphs was accepted")
+
+    return failures
+
+
+async def run(args):
+    import main
+
+    embedding_model._model = RandomEncoder()
+    config = FakeConfig(latency=args.latency, token_ms=args.token_ms, tokens=400, seed=args.seed)
+    llm_gateway.gateway._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_app(config)), base_url="http://fake-groq/v1"
+    )
+
+    text = manuscript(args.words, args.seed)
+    rows = []
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://ml", timeout=None
+    ) as client:
+        for session_id, concurrency in enumerate(args.concurrency, start=1):
+            llm_cache.memory.entries.clear()
+            response = await client.post("/analyze/long", json={
+                "session_id": session_id,
+                "text": text,
+                "max_chunk_tokens": args.chunk_tokens,
+                "max_concurrency": concurrency,
+            })
+            result = response.json()
+            rows.append((concurrency, result))
+
+    breaks = text.count("\n\n")
+    print(f"manuscript {len(text.split())} words, {breaks + 1} paragraphs")
+    print(f"{'concurrency':>11} {'chunks':>6} {'rewrite ms':>11} {'sum chunks':>11} {'slowest':>8} {'breaks kept':>11}")
+
+    failures = []
+    for concurrency, result in rows:
+        chunk_ms = [c["rewrite_ms"] for c in result["chunks"]]
+        rewrite_ms = result["timings_ms"]["enhanced_text"]
+        kept = result["enhanced_text"].count("\n\n") == breaks
+        print(
+            f"{concurrency:>11} {len(chunk_ms):>6} {rewrite_ms:>11.0f} {sum(chunk_ms):>11.0f} "
+            f"{max(chunk_ms):>8.0f} {str(kept):>11}"
+        )
+
+        if not kept:
+            failures.append(f"paragraph breaks lost at concurrency {concurrency}")
+        if concurrency >= len(chunk_ms) and rewrite_ms > 2 * max(chunk_ms):
+            failures.append(f"rewrite took {rewrite_ms:.0f} ms, slowest chunk {max(chunk_ms):.0f} ms")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=4000)
+    parser.add_argument("--chunk-tokens", type=int, default=350)
+    parser.add_argument("--latency", default="fixed:400", help="Fake LLM time to first token (see fake_groq.py).")
+    parser.add_argument("--token-ms", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 8, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="Exit 1 if breaks are lost or full concurrency is slow.")
+    args = parser.parse_args()
+
+    failures = check_round_trip() + asyncio.run(run(args))
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
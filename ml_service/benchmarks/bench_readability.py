@@ -0,0 +1,142 @@
+# ml_service/benchmarks/bench_readability.py
+#
+# Micro-benchmark of the readability engine against the previous
+# implementation (kept inline below) and textstat, if installed.
+#
+# Usage (from ml_service/):
+#   python benchmarks/bench_readability.py [--words 3000] [--repeat 50]
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.readability_model import (  # noqa: E402
+    analyze_readability,
+    analyze_readability_batch,
+    count_syllables,
+)
+
+
+# ============================
+# PREVIOUS IMPLEMENTATION
+# ============================
+
+def legacy_count_sentences(text):
+    sentences = re.split(r'[.!?]+', text)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    return max(len(sentences), 1)
+
+
+def legacy_count_syllables(word):
+    word = word.lower()
+    vowels = "aeiouy"
+    syllables = 0
+    prev_char_was_vowel = False
+
+    for char in word:
+        if char in vowels:
+            if not prev_char_was_vowel:
+                syllables += 1
+            prev_char_was_vowel = True
+        else:
+            prev_char_was_vowel = False
+
+    if word.endswith("e"):
+        syllables = max(syllables - 1, 1)
+
+    return max(syllables, 1)
+
+
+def legacy_analyze_readability(text):
+    sentences = legacy_count_sentences(text)
+    words = re.findall(r'\w+', text)
+
+    total_words = max(len(words), 1)
+    total_syllables = sum(legacy_count_syllables(word) for word in words)
+
+    asl = total_words / sentences
+    asw = total_syllables / total_words
+
+    return round(206.835 - (1.015 * asl) - (84.6 * asw), 2)
+
+
+# ============================
+# BENCHMARK
+# ============================
+
+VOCABULARY = (
+    "the night river quietly carried every forgotten promise toward a "
+    "distant harbour where lanterns burned and sailors whispered stories "
+    "about courage betrayal memory and the impossible architecture of home"
+).split()
+
+
+def make_text(words, seed):
+    rng = random.Random(seed)
+    out = []
+    for i in range(words):
+        out.append(rng.choice(VOCABULARY))
+        if i % rng.randint(8, 20) == 0:
+            out[-1] += rng.choice([".", "!", "?", ","])
+    return " ".join(out)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--texts", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = [make_text(args.words, seed) for seed in range(args.texts)]
+
+    for text in texts:
+        assert analyze_readability(text) == legacy_analyze_readability(text)
+
+    count_syllables.cache_clear()
+    cold = timed(lambda: [analyze_readability(t) for t in texts], 1)
+
+    results = {
+        "legacy": timed(lambda: [legacy_analyze_readability(t) for t in texts], args.repeat),
+        "engine (cold cache)": cold,
+        "engine": timed(lambda: [analyze_readability(t) for t in texts], args.repeat),
+        "engine batch": timed(lambda: analyze_readability_batch(texts), args.repeat),
+    }
+
+    try:
+        import textstat
+    except ImportError:
+        textstat = None
+
+    if textstat is not None:
+        results["textstat flesch + fk"] = timed(
+            lambda: [
+                (textstat.flesch_reading_ease(t), textstat.flesch_kincaid_grade(t))
+                for t in texts
+            ],
+            args.repeat
+        )
+
+    print(f"{args.texts} texts x {args.words} words, median of {args.repeat} runs")
+    for name, ms in results.items():
+        print(f"  {name:22s} {ms:9.3f} ms")
+    print(f"  syllable cache: {count_syllables.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
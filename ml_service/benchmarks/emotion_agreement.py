@@ -0,0 +1,125 @@
+# ml_service/benchmarks/emotion_agreement.py
+#
+# Agreement report: local emotion head (EMOTION_BACKEND=local) against the
+# LLM labels on benchmarks/data/emotion_fixtures.jsonl.
+#
+# The fixture's "label" column holds the reference labels. --relabel
+# refreshes it from the LLM (needs GROQ_API_KEY); --llm compares against
+# live LLM answers without rewriting the file.
+#
+# Usage (from ml_service/):
+#   python benchmarks/emotion_agreement.py [--llm | --relabel] [--out report.md] [--check 0.7]
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.emotion_model import ALLOWED_EMOTIONS, detect_emotion, detect_emotions_local, local_emotion  # noqa: E402
+from models.embedding_model import encode_batch  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "data" / "emotion_fixtures.jsonl"
+
+
+def load_fixtures(path=FIXTURES):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def llm_labels(texts):
+    labels, latencies = [], []
+    for text in texts:
+        started = time.perf_counter()
+        labels.append(await detect_emotion(text))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return labels, statistics.median(latencies)
+
+
+def cohen_kappa(a, b, classes):
+    index = {c: i for i, c in enumerate(classes)}
+    matrix = np.zeros((len(classes), len(classes)))
+    for x, y in zip(a, b):
+        matrix[index[x], index[y]] += 1
+
+    total = matrix.sum()
+    observed = np.trace(matrix) / total
+    expected = (matrix.sum(axis=0) * matrix.sum(axis=1)).sum() / total ** 2
+    return (observed - expected) / (1 - expected) if expected < 1 else 1.0, matrix
+
+
+def render(fixtures, reference, local, local_ms, llm_ms):
+    agreement = np.mean([r == p for r, p in zip(reference, local)])
+    kappa, matrix = cohen_kappa(reference, local, ALLOWED_EMOTIONS)
+
+    lines = [
+        "# Emotion agreement: local head vs LLM",
+        "",
+        f"- fixtures: {len(fixtures)}",
+        f"- agreement: {agreement:.1%}",
+        f"- Cohen's kappa: {kappa:.3f}",
+        f"- local per item (one batch, embedding included): {local_ms:.2f} ms",
+        f"- LLM p50 per item: {llm_ms:.0f} ms" if llm_ms else "- LLM latency: not measured (use --llm)",
+        "",
+        "Confusion (rows: LLM, columns: local)",
+        "",
+        "| | " + " | ".join(ALLOWED_EMOTIONS) + " |",
+        "|---" * (len(ALLOWED_EMOTIONS) + 1) + "|",
+    ]
+    for emotion, row in zip(ALLOWED_EMOTIONS, matrix):
+        lines.append(f"| {emotion} | " + " | ".join(str(int(v)) for v in row) + " |")
+
+    disagreements = [
+        (f["text"], r, p) for f, r, p in zip(fixtures, reference, local) if r != p
+    ]
+    if disagreements:
+        lines += ["", "Disagreements", ""]
+        lines += [f"- {text} (LLM: {r}, local: {p})" for text, r, p in disagreements]
+
+    return "\n".join(lines) + "\n", agreement
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm", action="store_true", help="Compare against live LLM labels.")
+    parser.add_argument("--relabel", action="store_true", help="Rewrite the fixture labels from the LLM.")
+    parser.add_argument("--out", help="Also write the report to this file.")
+    parser.add_argument("--check", type=float, help="Exit 1 if agreement is below this.")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    texts = [f["text"] for f in fixtures]
+    reference, llm_ms = [f["label"] for f in fixtures], None
+
+    if args.llm or args.relabel:
+        reference, llm_ms = asyncio.run(llm_labels(texts))
+
+    if args.relabel:
+        with open(FIXTURES, "w") as f:
+            for fixture, label in zip(fixtures, reference):
+                f.write(json.dumps({**fixture, "label": label}) + "\n")
+
+    local_emotion.load()
+    started = time.perf_counter()
+    local = detect_emotions_local(encode_batch(texts))
+    local_ms = (time.perf_counter() - started) * 1000 / len(texts)
+
+    report, agreement = render(fixtures, reference, local, local_ms, llm_ms)
+    print(report)
+
+    if args.out:
+        Path(args.out).write_text(report)
+
+    if args.check is not None and agreement < args.check:
+        print(f"FAIL: agreement below {args.check:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
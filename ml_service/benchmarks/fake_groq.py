@@ -0,0 +1,254 @@
+# ml_service/benchmarks/fake_groq.py
+#
+# Offline stand-in for the Groq (OpenAI-style) chat-completions API, for
+# load tests without real traffic. Point the ML service at it with
+#   GROQ_BASE_URL=http://127.0.0.1:9100/v1 GROQ_API_KEY=fake
+#
+# - latency: time to first token drawn from --latency (fixed:MS,
+#   uniform:LO,HI or lognormal:MEDIAN,SIGMA), then --token-ms per token
+# - streaming: "stream": true is answered as text/event-stream chunks
+# - 429s: --rate-429 of requests are rejected with retry-after
+# - record: --record FILE proxies to --upstream with UPSTREAM_API_KEY and
+#   appends every answer to FILE (JSONL)
+# - replay: --replay FILE answers recorded prompts verbatim; anything not
+#   recorded gets a synthetic answer (or a 404 with --strict)
+#
+# Usage (from ml_service/):
+#   python benchmarks/fake_groq.py [--port 9100] [--latency lognormal:300,0.5] [--rate-429 0.02]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.emotion_model import ALLOWED_EMOTIONS  # noqa: E402
+from utils.llm_cache import cache_key  # noqa: E402
+
+WORDS = (
+    "the night was quiet and the city hummed below as she walked toward "
+    "the harbour carrying a letter she had never dared to open"
+).split()
+
+
+# ============================
+# CONFIG
+# ============================
+
+def parse_latency(spec):
+    """'fixed:300' | 'uniform:100,500' | 'lognormal:300,0.5' -> callable(rng) -> seconds."""
+
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(0, sigma) * median / 1000
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeConfig:
+
+    def __init__(self, latency="lognormal:300,0.5", token_ms=15.0, tokens=120,
+                 rate_429=0.0, retry_after=1.0, seed=0, record=None, replay=None,
+                 strict=False, upstream="https://api.groq.com/openai/v1"):
+        self.latency = parse_latency(latency)
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.record = record
+        self.strict = strict
+        self.upstream = upstream.rstrip("/")
+        self.recorded = load_recordings(replay) if replay else {}
+        self.stats = {"requests": 0, "rejected_429": 0, "replayed": 0, "recorded": 0}
+
+
+def load_recordings(path):
+    recorded = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recorded[entry["key"]] = entry["content"]
+    return recorded
+
+
+def request_key(body):
+    messages = {m["role"]: m["content"] for m in body.get("messages", [])}
+    return cache_key(
+        body.get("model"),
+        messages.get("system", ""),
+        messages.get("user", ""),
+        body.get("temperature", 1.0),
+        body.get("max_tokens") or 0,
+    )
+
+
+# ============================
+# SYNTHETIC ANSWERS
+# ============================
+
+def synthetic_content(body, config):
+    system = next((m["content"] for m in body.get("messages", []) if m["role"] == "system"), "")
+    prompt = body.get("messages", [{}])[-1].get("content", "")
+
+    # Shapes the ML service parses
+    if "intent classifier" in system.lower():
+        if any(word in prompt.lower() for word in ("story", "script", "tale")):
+            return json.dumps({"task_type": "script_generation", "genre": "general",
+                               "tone": "storyteller", "length": "medium"})
+        return json.dumps({"task_type": "content_enhancement", "tone": "formal", "level": "medium"})
+
+    if "emotion classifier" in system.lower():
+        return config.rng.choice(ALLOWED_EMOTIONS)
+
+    # As many paragraphs as the text to rewrite, like a well-behaved model
+    text = prompt.rsplit("Text:", 1)[-1]
+    paragraphs = max(1, len([p for p in re.split(r"\n\s*\n", text) if p.strip()]))
+
+    count = min(config.tokens, body.get("max_tokens") or config.tokens)
+    per_paragraph = max(1, count // paragraphs)
+    return "\n\n".join(
+        " ".join(config.rng.choice(WORDS) for _ in range(per_paragraph)).capitalize() + "."
+        for _ in range(paragraphs)
+    )
+
+
+async def upstream_content(body, config):
+    async with httpx.AsyncClient(timeout=60) as client:
+        response = await client.post(
+            f"{config.upstream}/chat/completions",
+            json={**body, "stream": False},
+            headers={"Authorization": f"Bearer {os.getenv('UPSTREAM_API_KEY', '')}"}
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+# ============================
+# APP
+# ============================
+
+def completion(content, model, prompt_tokens=0):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content.split())},
+    }
+
+
+def chunk(delta, model, finish=None):
+    return "data: " + json.dumps({
+        "object": "chat.completion.chunk",
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": delta} if delta else {},
+                     "finish_reason": finish}],
+    }) + "\n\n"
+
+
+def create_app(config):
+    app = FastAPI(title="Fake Groq")
+
+    @app.get("/stats")
+    def stats():
+        return config.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        config.stats["requests"] += 1
+
+        if config.rng.random() < config.rate_429:
+            config.stats["rejected_429"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                status_code=429,
+                headers={"retry-after": str(config.retry_after)}
+            )
+
+        key = request_key(body)
+
+        if key in config.recorded:
+            content = config.recorded[key]
+            config.stats["replayed"] += 1
+        elif config.record:
+            content = await upstream_content(body, config)
+            with open(config.record, "a") as f:
+                f.write(json.dumps({"key": key, "content": content}) + "\n")
+            config.recorded[key] = content
+            config.stats["recorded"] += 1
+        elif config.strict and config.recorded:
+            return JSONResponse({"error": {"message": "Not recorded"}}, status_code=404)
+        else:
+            content = synthetic_content(body, config)
+
+        await asyncio.sleep(config.latency(config.rng))
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.token_ms * len(content.split()) / 1000)
+            prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+            return completion(content, model, prompt_tokens)
+
+        async def events():
+            for i, word in enumerate(content.split(" ")):
+                yield chunk(word if i == 0 else " " + word, model)
+                await asyncio.sleep(config.token_ms / 1000)
+            yield chunk(None, model, finish="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:300,0.5", help="Time to first token distribution (ms).")
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    parser.add_argument("--tokens", type=int, default=120, help="Synthetic answer length in words.")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", help="Proxy to --upstream and append answers to this JSONL file.")
+    parser.add_argument("--replay", help="Serve answers recorded in this JSONL file.")
+    parser.add_argument("--strict", action="store_true", help="With --replay, 404 on unrecorded prompts.")
+    parser.add_argument("--upstream", default="https://api.groq.com/openai/v1")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig(
+        latency=args.latency, token_ms=args.token_ms, tokens=args.tokens,
+        rate_429=args.rate_429, retry_after=args.retry_after, seed=args.seed,
+        record=args.record, replay=args.replay, strict=args.strict, upstream=args.upstream
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
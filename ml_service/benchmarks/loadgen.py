@@ -0,0 +1,387 @@
+# ml_service/benchmarks/loadgen.py
+#
+# End-to-end load generator for the Django AI views. Drives
+# /api/writer/, /api/generate/ and /api/enhance/ with JWT auth at a fixed
+# arrival rate (open loop: a slow server does not slow the offered load)
+# and reports throughput, p50/p95/p99 and error rate per endpoint.
+#
+# Texts are drawn from a seeded word mix: --unique-ratio of requests get
+# a freshly generated text (a new paragraph, for /api/enhance/), the rest
+# repeat one of --repeat-pool texts, so the run measures the mix of cache
+# hits and misses you ask for rather than the cache alone. The report
+# includes the share of requests Django coalesced (X-Coalesced) and, from
+# the ML service's /metrics (--ml-url), the LLM cache hit rate.
+#
+# Typical offline run, with the LLM replaced by benchmarks/fake_groq.py:
+#   python benchmarks/fake_groq.py --port 9100 &
+#   GROQ_BASE_URL=http://127.0.0.1:9100/v1 GROQ_API_KEY=fake uvicorn main:app --port 8001 &
+#   (cd ../django_backend && python manage.py runserver 8000) &
+#   python benchmarks/loadgen.py --rps 20 --duration 60 --mix writer=2,generate=1,enhance=1
+#
+# A test user is registered on first use (--username / --password).
+# --json writes the report for comparison between releases; --check-p95
+# and --check-errors turn it into a pass / fail gate.
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+SUBJECTS = ["the captain", "our team", "she", "the committee", "a stranger", "the old dog",
+            "my neighbour", "the engineer", "the village", "his sister", "the new manager"]
+VERBS = ["watched", "shipped", "opened", "reviewed", "carried", "forgot", "rebuilt",
+         "followed", "questioned", "painted", "ignored", "measured"]
+OBJECTS = ["the letter", "a broken violin", "the billing flow", "the river", "a quiet harbour",
+           "the proposal", "an empty train", "the garden wall", "a stolen map", "the last lantern"]
+TAILS = ["before dawn", "without a word", "in the rain", "for three days", "after the storm",
+         "despite the warnings", "with great care", "at the edge of town", "next week", "again"]
+
+GENRES = ["mystery", "sci-fi scene", "bedtime story", "thriller", "comedy sketch", "fable"]
+SETTINGS = ["on a generation ship", "in a lighthouse", "at a night market", "under the sea",
+            "in a snowed-in cabin", "on the last train home", "in a haunted library"]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# ============================
+# PAYLOADS
+# ============================
+
+def sentence(rng):
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(TAILS)}.".capitalize()
+
+
+def make_text(rng):
+    return " ".join(sentence(rng) for _ in range(rng.randint(2, 4)))
+
+
+def make_prompt(rng):
+    return f"A {rng.choice(GENRES)} about {rng.choice(OBJECTS)} {rng.choice(SETTINGS)}"
+
+
+class Payloads:
+    """
+    Seeded request texts: a fresh one with probability ``unique_ratio``,
+    otherwise one of a fixed pool of ``repeat_pool`` repeats.
+    """
+
+    def __init__(self, rng, unique_ratio, repeat_pool):
+        self.rng = rng
+        self.unique_ratio = unique_ratio
+        self.texts = [make_text(rng) for _ in range(repeat_pool)]
+        self.prompts = [make_prompt(rng) for _ in range(repeat_pool)]
+
+    def unique(self):
+        return self.rng.random() < self.unique_ratio
+
+    def text(self):
+        return make_text(self.rng) if self.unique() else self.rng.choice(self.texts)
+
+    def prompt(self):
+        return make_prompt(self.rng) if self.unique() else self.rng.choice(self.prompts)
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in --mix: {sorted(unknown)}")
+    return mix
+
+
+# ============================
+# SETUP
+# ============================
+
+async def authenticate(client, username, password):
+    await client.post("/api/register/", json={
+        "username": username, "email": f"{username}@example.com", "password": password
+    })  # 400 when the user already exists
+
+    response = await client.post("/api/login/", json={"username": username, "password": password})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access']}"
+
+
+async def create_paragraph(client, session_id, text):
+    response = await client.post("/api/paragraph/create/", json={"session": session_id, "content": text})
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def create_fixtures(client, payloads):
+    response = await client.post("/api/session/create/", json={"title": "loadgen"})
+    response.raise_for_status()
+    session_id = response.json()["id"]
+
+    paragraph_ids = [await create_paragraph(client, session_id, text) for text in payloads.texts]
+    return session_id, paragraph_ids
+
+
+async def scrape_llm_outcomes(ml_url):
+    """LLM calls by outcome ("ok", "cache", "error") and coalesced requests so far, or None."""
+
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(f"{ml_url.rstrip('/')}/metrics")
+            response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+
+    counts = {"coalesced": 0.0}
+    for family in text_string_to_metric_families(response.text):
+        for sample in family.samples:
+            if sample.name == "ml_llm_call_seconds_count":
+                outcome = sample.labels["outcome"]
+                counts[outcome] = counts.get(outcome, 0.0) + sample.value
+            elif sample.name == "ml_coalesced_requests_total":
+                counts["coalesced"] += sample.value
+    return counts
+
+
+def cache_report(before, after):
+    if before is None or after is None:
+        return None
+
+    delta = {key: after.get(key, 0.0) - before.get(key, 0.0) for key in after}
+    calls = sum(value for key, value in delta.items() if key != "coalesced")
+    return {
+        "llm_calls": int(calls),
+        "llm_cache_hits": int(delta.get("cache", 0)),
+        "llm_cache_hit_rate": round(delta.get("cache", 0) / calls, 4) if calls else 0.0,
+        "ml_coalesced": int(delta["coalesced"]),
+    }
+
+
+# ============================
+# ENDPOINTS
+# ============================
+
+# Builders run inside the request task; any setup they await (a new
+# paragraph to enhance) is not part of the measured latency.
+
+async def writer_request(client, rng, fixtures, payloads):
+    session_id, _ = fixtures
+    mode = rng.choice(["enhance", "generate"])
+    return "/api/writer/", {
+        "session_id": session_id,
+        "user_input": payloads.text() if mode == "enhance" else payloads.prompt(),
+        "mode": mode,
+    }
+
+
+async def generate_request(client, rng, fixtures, payloads):
+    session_id, _ = fixtures
+    return "/api/generate/", {"session_id": session_id, "prompt": payloads.prompt(), "length": "short"}
+
+
+async def enhance_request(client, rng, fixtures, payloads):
+    session_id, paragraph_ids = fixtures
+    if payloads.unique():
+        paragraph_id = await create_paragraph(client, session_id, make_text(rng))
+    else:
+        paragraph_id = rng.choice(paragraph_ids)
+
+    return "/api/enhance/", {
+        "paragraph_id": paragraph_id,
+        "tone": rng.choice(["formal", "casual", "storyteller"]),
+        "level": rng.choice(["low", "medium", "high"]),
+    }
+
+
+ENDPOINTS = {
+    "writer": writer_request,
+    "generate": generate_request,
+    "enhance": enhance_request,
+}
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def record(self, latency_ms, error=None, coalesced=False):
+        if error is None:
+            self.latencies.append(latency_ms)
+            self.coalesced += coalesced
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self, elapsed):
+        failed = sum(self.errors.values())
+        completed = len(self.latencies) + failed
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "ok": len(self.latencies),
+            "throughput_rps": round(len(self.latencies) / elapsed, 2),
+            "error_rate": round(failed / completed, 4) if completed else 0.0,
+            "coalesced_rate": round(self.coalesced / len(self.latencies), 4) if self.latencies else 0.0,
+            "errors": self.errors,
+            "p50_ms": percentile(self.latencies, 50),
+            "p95_ms": percentile(self.latencies, 95),
+            "p99_ms": percentile(self.latencies, 99),
+        }
+
+
+# ============================
+# RUN
+# ============================
+
+async def fire(client, name, build, stats):
+    try:
+        path, payload = await build
+    except httpx.HTTPError as e:
+        stats[name].record(0, f"setup {type(e).__name__}")
+        return
+
+    started = time.perf_counter()
+    error, coalesced = None, False
+    try:
+        response = await client.post(path, json=payload)
+        if response.status_code >= 400:
+            error = str(response.status_code)
+        coalesced = response.headers.get("X-Coalesced") == "1"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    stats[name].record((time.perf_counter() - started) * 1000, error, coalesced)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    payloads = Payloads(rng, args.unique_ratio, args.repeat_pool)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    stats = {name: EndpointStats() for name in names}
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+
+        await authenticate(client, args.username, args.password)
+        fixtures = await create_fixtures(client, payloads)
+        llm_before = await scrape_llm_outcomes(args.ml_url)
+
+        in_flight = set()
+        interval = 1 / args.rps
+        started = time.perf_counter()
+        deadline = started + args.duration
+        next_at = started
+
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            next_at += rng.expovariate(args.rps) if args.poisson else interval
+
+            name = rng.choices(names, weights)[0]
+            stats[name].sent += 1
+
+            # Past the cap the server is saturated; count it rather than queue
+            if len(in_flight) >= args.max_in_flight:
+                stats[name].dropped += 1
+                continue
+
+            build = ENDPOINTS[name](client, rng, fixtures, payloads)
+            task = asyncio.create_task(fire(client, name, build, stats))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+        elapsed = time.perf_counter() - started
+
+    return {
+        "target_rps": args.rps,
+        "duration_s": round(elapsed, 2),
+        "unique_ratio": args.unique_ratio,
+        "endpoints": {name: s.summary(elapsed) for name, s in stats.items()},
+        "cache": cache_report(llm_before, await scrape_llm_outcomes(args.ml_url)),
+    }
+
+
+def render(report):
+    print(f"target {report['target_rps']} rps over {report['duration_s']} s, unique ratio {report['unique_ratio']}")
+    print(f"{'endpoint':<10} {'sent':>6} {'ok':>6} {'rps':>7} {'err%':>6} {'coal%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+
+    def ms(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    for name, s in report["endpoints"].items():
+        print(
+            f"{name:<10} {s['sent']:>6} {s['ok']:>6} {s['throughput_rps']:>7} "
+            f"{s['error_rate'] * 100:>5.1f}% {s['coalesced_rate'] * 100:>5.1f}% "
+            f"{ms(s['p50_ms']):>8} {ms(s['p95_ms']):>8} {ms(s['p99_ms']):>8}"
+        )
+        if s["errors"] or s["dropped"]:
+            print(f"{'':<10} errors {s['errors']} dropped {s['dropped']}")
+
+    cache = report["cache"]
+    if cache is None:
+        print("LLM cache: ML /metrics not reachable")
+    else:
+        print(
+            f"LLM cache: {cache['llm_cache_hits']}/{cache['llm_calls']} calls "
+            f"({cache['llm_cache_hit_rate']:.1%}), ML coalesced {cache['ml_coalesced']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="loadgen")
+    parser.add_argument("--password", default="loadgen-password")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", default="writer=1,generate=1,enhance=1", help="Endpoint weights.")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times.")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--unique-ratio", type=float, default=0.8,
+                        help="Share of requests with a freshly generated text (0 = repeats only).")
+    parser.add_argument("--repeat-pool", type=int, default=8, help="Number of distinct repeated texts.")
+    parser.add_argument("--ml-url", default="http://127.0.0.1:8001", help="ML service, for the LLM cache hit rate.")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    parser.add_argument("--check-p95", type=float, help="Exit 1 if any endpoint p95 exceeds this (ms).")
+    parser.add_argument("--check-errors", type=float, help="Exit 1 if any endpoint error rate exceeds this.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    render(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    for name, s in report["endpoints"].items():
+        if args.check_p95 is not None and (s["p95_ms"] is None or s["p95_ms"] > args.check_p95):
+            failures.append(f"{name} p95 {s['p95_ms']} ms")
+        if args.check_errors is not None and s["error_rate"] > args.check_errors:
+            failures.append(f"{name} error rate {s['error_rate']:.1%}")
+
+    if failures:
+        print("FAIL: " + ", ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
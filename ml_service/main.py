@@ -1,23 +1,137 @@
 # ml_service/main.py
 
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import json
 
-from models.embedding_model import analyze_consistency
-from models.readability_model import analyze_readability
+from models.embedding_model import (
+    embed,
+    encode_batch,
+    update_consistency,
+    update_consistency_batch,
+    get_model,
+    is_model_loaded,
+    model_stats,
+    pack_embedding,
+    warm_up
+)
+from models.readability_model import analyze_readability, analyze_readability_batch
 from models.explainability_model import generate_explainability
-from models.emotion_model import detect_emotion
-from models.style_model import rewrite_with_llm
-from models.intent_model import analyze_intent
+from models.emotion_model import (
+    EMOTION_BACKEND,
+    detect_emotion,
+    detect_emotion_local,
+    detect_emotions_local,
+    local_emotion
+)
+from models.style_model import rewrite_with_llm, rewrite_with_llm_stream
+from models.intent_model import IntentParseError, analyze_intent
 from models.planner_model import plan_story
-from models.script_model import generate_script
+from models.script_model import generate_script, generate_script_stream
+from pipelines.long_document import (
+    LONG_CHUNK_TOKENS,
+    LONG_MAX_CONCURRENCY,
+    aggregate_readability,
+    clean_rewrite,
+    dominant,
+    output_budget,
+    split_into_chunks,
+    stitch
+)
+from pipelines.stage_graph import StageGraph, cpu_pool
+from utils import llm_gateway
+from utils.batching import SingleFlight, bounded_gather
+from utils.llm_cache import llm_cache
+from utils.metrics import COALESCED, MetricsMiddleware, observe_stage, render as render_metrics
 
 app = FastAPI(title="AI-Powered Writer API")
+app.add_middleware(MetricsMiddleware)
+
+# Load the embedder and run a dummy batch right after startup.
+ML_WARMUP = os.getenv("ML_WARMUP", "1") == "1"
+
+startup_report = {
+    "import_ms": round((time.perf_counter() - IMPORT_STARTED) * 1000, 2),
+    "startup_ms": None,
+    "ready_ms": None
+}
+
+
+async def load_and_warm():
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(cpu_pool, warm_up)
+        if EMOTION_BACKEND == "local":
+            await loop.run_in_executor(cpu_pool, local_emotion.load)
+    except Exception as e:
+        print("⚠ Model warm-up failed:", str(e))
+        return
+    startup_report["ready_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 2)
+    print(f"Model ready: {startup_report} {model_stats}")
+
+
+@app.on_event("startup")
+async def report_startup():
+    startup_report["startup_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 2)
+    print(f"ML service started: {startup_report}")
+
+    # In the background, so /healthz answers while the model loads. The
+    # task is kept on app.state so it is not garbage-collected mid-run.
+    app.state.warmup = None
+    if ML_WARMUP:
+        app.state.warmup = asyncio.ensure_future(load_and_warm())
+        app.state.warmup.add_done_callback(report_warmup_error)
+
+
+def report_warmup_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        print("⚠ Model warm-up failed:", repr(task.exception()))
+
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await llm_gateway.aclose()
+
+
+# ============================
+# HEALTH / READINESS
+# ============================
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+
+    if not is_model_loaded():
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(cpu_pool, get_model)
+        except Exception as e:
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unavailable", "error": str(e)}
+            )
+
+    return {
+        "status": "ready",
+        "startup": startup_report,
+        "model": model_stats
+    }
 
 
 # ============================
@@ -48,36 +162,105 @@ class ScriptRequest(BaseModel):
     target_words: int | None = None
 
 
+class BatchEnhancementItem(BaseModel):
+    text: str
+    tone: str = "formal"
+    level: str = "medium"
+
+
+class BatchEnhancementRequest(BaseModel):
+    session_id: int
+    items: list[BatchEnhancementItem]
+    max_concurrency: int = 8
+
+
+class LongEnhancementRequest(BaseModel):
+    session_id: int
+    text: str
+    tone: str = "formal"
+    level: str = "medium"
+    max_chunk_tokens: int = LONG_CHUNK_TOKENS
+    max_concurrency: int = LONG_MAX_CONCURRENCY
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str]
+
+
 class WriterRequest(BaseModel):
     session_id: int
     user_input: str
 
 
 # ============================
-# ENHANCEMENT ENDPOINT
+# PIPELINE GRAPHS
 # ============================
 
-@app.post("/analyze")
-def analyze_content(data: EnhancementRequest):
+async def rewrite_stage(text, tone, level):
+    return clean_text(await rewrite_with_llm(text, tone, level))
 
-    readability_before = analyze_readability(data.text)
 
-    enhanced_text = rewrite_with_llm(
-        data.text,
-        data.tone,
-        data.level
-    )
+async def script_stage(plan, tone, length, target_words):
+    return clean_text(await generate_script(plan, tone, length, target_words))
 
-    enhanced_text = clean_text(enhanced_text)
 
-    readability_after = analyze_readability(enhanced_text)
+def with_emotion(graph, text_key):
+    """Add the emotion stage: the local head reads the embedding, the LLM the text."""
+
+    if EMOTION_BACKEND == "local":
+        return graph.add("emotion", detect_emotion_local, ["embedding"], kind="cpu")
+    return graph.add("emotion", detect_emotion, [text_key])
 
-    consistency = analyze_consistency(
-        enhanced_text,
-        data.session_id
-    )
 
-    emotion = detect_emotion(enhanced_text)
+# Enhancement: the rewrite gates everything else; readability, consistency
+# and emotion of the rewritten text then run side by side.
+enhancement_graph = with_emotion(
+    StageGraph(inputs=("text", "tone", "level", "session_id"))
+    .add("readability_before", analyze_readability, ["text"], kind="cpu")
+    .add("enhanced_text", rewrite_stage, ["text", "tone", "level"])
+    .add("readability_after", analyze_readability, ["enhanced_text"], kind="cpu")
+    .add("embedding", embed, ["enhanced_text"])
+    .add("consistency", update_consistency, ["embedding", "session_id"], kind="cpu"),
+    "enhanced_text"
+)
+
+# Generation: plan -> script, then the same fan-out over the script.
+generation_graph = with_emotion(
+    StageGraph(inputs=("prompt", "genre", "tone", "length", "target_words", "session_id"))
+    .add("plan", plan_story, ["prompt", "genre"])
+    .add("generated_text", script_stage, ["plan", "tone", "length", "target_words"])
+    .add("embedding", embed, ["generated_text"])
+    .add("consistency", update_consistency, ["embedding", "session_id"], kind="cpu")
+    .add("readability", analyze_readability, ["generated_text"], kind="cpu"),
+    "generated_text"
+)
+
+
+# Post-LLM stages only, for the streaming endpoints where the LLM text
+# has already been produced token by token.
+enhancement_followup_graph = with_emotion(
+    StageGraph(inputs=("enhanced_text", "session_id"))
+    .add("readability_after", analyze_readability, ["enhanced_text"], kind="cpu")
+    .add("embedding", embed, ["enhanced_text"])
+    .add("consistency", update_consistency, ["embedding", "session_id"], kind="cpu"),
+    "enhanced_text"
+)
+
+generation_followup_graph = with_emotion(
+    StageGraph(inputs=("generated_text", "session_id"))
+    .add("embedding", embed, ["generated_text"])
+    .add("consistency", update_consistency, ["embedding", "session_id"], kind="cpu")
+    .add("readability", analyze_readability, ["generated_text"], kind="cpu"),
+    "generated_text"
+)
+
+
+def enhancement_response(data: EnhancementRequest, results, timings):
+
+    enhanced_text = results["enhanced_text"]
+    readability_before = results["readability_before"]
+    readability_after = results["readability_after"]
+    consistency = results["consistency"]
 
     explanation = generate_explainability(
         original=data.text,
@@ -91,66 +274,421 @@ def analyze_content(data: EnhancementRequest):
     return {
         "mode": "enhancement",
         "enhanced_text": enhanced_text,
-        "emotion": emotion,
+        "emotion": results["emotion"],
         "drift_score": consistency["drift_score"],
         "consistency_score": consistency["consistency_score"],
+        "window_drift": consistency["window_drift"],
+        "centroid_drift": consistency["centroid_drift"],
+        "embedding": consistency["embedding"],
         "readability_before": readability_before,
         "readability_after": readability_after,
-        "explanation": explanation
+        "explanation": explanation,
+        "timings_ms": timings
     }
 
 
+def generation_response(results, timings):
+
+    consistency = results["consistency"]
+
+    return {
+        "mode": "script_generation",
+        "generated_text": results["generated_text"],
+        "emotion": results["emotion"],
+        "drift_score": consistency["drift_score"],
+        "consistency_score": consistency["consistency_score"],
+        "window_drift": consistency["window_drift"],
+        "centroid_drift": consistency["centroid_drift"],
+        "embedding": consistency["embedding"],
+        "readability": results["readability"],
+        "plan_used": clean_text(results["plan"]),
+        "timings_ms": timings
+    }
+
+
+# ============================
+# REQUEST COALESCING
+# ============================
+#
+# Identical requests in flight at the same time (double clicks, client
+# retries) share one pipeline run, so the LLM is called and the session
+# memory updated once. Repeats within ML_COALESCE_WINDOW seconds after it
+# finished get the same answer too.
+
+ML_COALESCE = os.getenv("ML_COALESCE", "1") == "1"
+ML_COALESCE_WINDOW = float(os.getenv("ML_COALESCE_WINDOW", "2"))
+
+single_flight = SingleFlight(window=ML_COALESCE_WINDOW)
+
+
+async def coalesced(endpoint, data: BaseModel, run):
+
+    if not ML_COALESCE:
+        return await run()
+
+    key = (endpoint, json.dumps(data.model_dump(), sort_keys=True))
+    result, shared = await single_flight.do(key, run)
+
+    if shared:
+        COALESCED.labels(endpoint=endpoint).inc()
+        result["coalesced"] = True
+
+    return result
+
+
+# ============================
+# ENHANCEMENT ENDPOINT
+# ============================
+
+@app.post("/analyze")
+async def analyze_content(data: EnhancementRequest):
+    return await coalesced("analyze", data, lambda: run_analysis(data))
+
+
+async def run_analysis(data: EnhancementRequest):
+
+    results, timings = await enhancement_graph.run(
+        text=data.text,
+        tone=data.tone,
+        level=data.level,
+        session_id=data.session_id
+    )
+
+    return enhancement_response(data, results, timings)
+
+
 # ============================
 # SCRIPT GENERATION ENDPOINT
 # ============================
 
 @app.post("/generate")
-def generate_content(data: ScriptRequest):
+async def generate_content(data: ScriptRequest):
+    return await coalesced("generate", data, lambda: run_generation(data))
+
 
-    plan = plan_story(data.prompt, data.genre)
+async def run_generation(data: ScriptRequest):
 
-    generated_text = generate_script(
-        plan,
-        data.tone,
-        data.length,
-        data.target_words
+    results, timings = await generation_graph.run(
+        prompt=data.prompt,
+        genre=data.genre,
+        tone=data.tone,
+        length=data.length,
+        target_words=data.target_words,
+        session_id=data.session_id
     )
 
-    generated_text = clean_text(generated_text)
+    return generation_response(results, timings)
 
-    consistency = analyze_consistency(
-        generated_text,
-        data.session_id
+
+# ============================
+# BATCH ENHANCEMENT ENDPOINT
+# ============================
+
+@app.post("/analyze/batch")
+async def analyze_content_batch(data: BatchEnhancementRequest):
+    """
+    Enhance many texts of one session in a single request.
+
+    LLM calls fan out with bounded concurrency, all rewritten texts are
+    embedded in one batch, and drift is then computed in item order so
+    the session memory sees the paragraphs in session order.
+    """
+
+    loop = asyncio.get_running_loop()
+    timings = {}
+    limit = max(1, min(data.max_concurrency, 32))
+    texts = [item.text for item in data.items]
+
+    started = time.perf_counter()
+    readability_before = await loop.run_in_executor(cpu_pool, analyze_readability_batch, texts)
+
+    enhanced_texts = await bounded_gather(
+        lambda item: rewrite_stage(item.text, item.tone, item.level),
+        data.items,
+        limit
     )
+    timings["enhanced_text"] = round((time.perf_counter() - started) * 1000, 2)
 
-    emotion = detect_emotion(generated_text)
+    embedded = loop.run_in_executor(cpu_pool, encode_batch, enhanced_texts)
 
-    readability = analyze_readability(generated_text)
+    async def consistency_all():
+        stage_started = time.perf_counter()
+        embeddings = await embedded
+        consistency = await loop.run_in_executor(
+            cpu_pool, update_consistency_batch, embeddings, data.session_id
+        )
+        timings["consistency"] = round((time.perf_counter() - stage_started) * 1000, 2)
+        return consistency
+
+    async def emotions_all():
+        stage_started = time.perf_counter()
+        if EMOTION_BACKEND == "local":
+            # Same batch of embeddings, one matmul for every item
+            embeddings = await embedded
+            emotions = await loop.run_in_executor(cpu_pool, detect_emotions_local, embeddings)
+        else:
+            emotions = await bounded_gather(detect_emotion, enhanced_texts, limit)
+        timings["emotion"] = round((time.perf_counter() - stage_started) * 1000, 2)
+        return emotions
+
+    async def readability_all():
+        return await loop.run_in_executor(cpu_pool, analyze_readability_batch, enhanced_texts)
+
+    consistency, emotions, readability_after = await asyncio.gather(
+        consistency_all(),
+        emotions_all(),
+        readability_all()
+    )
+
+    results = []
+    for i, item in enumerate(data.items):
+        response = enhancement_response(
+            EnhancementRequest(
+                session_id=data.session_id,
+                text=item.text,
+                tone=item.tone,
+                level=item.level
+            ),
+            {
+                "enhanced_text": enhanced_texts[i],
+                "readability_before": readability_before[i]["flesch"],
+                "readability_after": readability_after[i]["flesch"],
+                "consistency": consistency[i],
+                "emotion": emotions[i]
+            },
+            None
+        )
+        del response["timings_ms"]
+        results.append(response)
+
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+
+    for stage in ("enhanced_text", "consistency", "emotion"):
+        observe_stage(f"batch.{stage}", timings[stage] / 1000)
 
     return {
-        "mode": "script_generation",
-        "generated_text": generated_text,
-        "emotion": emotion,
-        "drift_score": consistency["drift_score"],
-        "consistency_score": consistency["consistency_score"],
-        "readability": readability,
-        "plan_used": clean_text(plan)
+        "mode": "enhancement_batch",
+        "results": results,
+        "timings_ms": timings
     }
 
 
+# ============================
+# LONG DOCUMENT ENDPOINT
+# ============================
+
+@app.post("/analyze/long")
+async def analyze_long(data: LongEnhancementRequest):
+    return await coalesced("analyze_long", data, lambda: run_long_analysis(data))
+
+
+async def run_long_analysis(data: LongEnhancementRequest):
+    """
+    Enhance a manuscript chunk by chunk (see pipelines/long_document.py).
+
+    Chunks are rewritten concurrently, so the rewrite takes about as long
+    as the slowest chunk. The result keeps the paragraph breaks, and
+    readability, drift and emotion are reported per chunk and for the
+    whole text. Chunks enter the session memory in reading order.
+    """
+
+    loop = asyncio.get_running_loop()
+    timings = {}
+    limit = max(1, min(data.max_concurrency, 32))
+    chunks = split_into_chunks(data.text, max(64, data.max_chunk_tokens))
+
+    if not chunks:
+        return {"error": "Empty text"}
+
+    started = time.perf_counter()
+    readability_before = await loop.run_in_executor(
+        cpu_pool, analyze_readability_batch, [c.text for c in chunks]
+    )
+
+    rewrite_ms = [0.0] * len(chunks)
+
+    async def rewrite_paragraph(paragraph):
+        return clean_text(await rewrite_with_llm(paragraph, data.tone, data.level, max_tokens=output_budget(paragraph)))
+
+    async def rewrite(chunk):
+        chunk_started = time.perf_counter()
+        rewritten = await rewrite_with_llm(chunk.text, data.tone, data.level, max_tokens=output_budget(chunk.text))
+        cleaned = clean_rewrite(chunk, rewritten)
+
+        if cleaned is None:
+            # The model moved the paragraph breaks; redo the chunk paragraph by paragraph
+            print(f"⚠ Chunk {chunk.index}: paragraph count changed, rewriting {len(chunk.paragraphs)} paragraphs separately")
+            cleaned = "\n\n".join(await asyncio.gather(*(rewrite_paragraph(p) for p in chunk.paragraphs)))
+
+        rewrite_ms[chunk.index] = round((time.perf_counter() - chunk_started) * 1000, 2)
+        return cleaned
+
+    enhanced = await bounded_gather(rewrite, chunks, limit)
+    timings["enhanced_text"] = round((time.perf_counter() - started) * 1000, 2)
+    observe_stage("long.enhanced_text", timings["enhanced_text"] / 1000)
+
+    stage_started = time.perf_counter()
+    embeddings = await loop.run_in_executor(cpu_pool, encode_batch, enhanced)
+    consistency = await loop.run_in_executor(cpu_pool, update_consistency_batch, embeddings, data.session_id)
+    readability_after = await loop.run_in_executor(cpu_pool, analyze_readability_batch, enhanced)
+
+    if EMOTION_BACKEND == "local":
+        emotions = await loop.run_in_executor(cpu_pool, detect_emotions_local, embeddings)
+    else:
+        emotions = await bounded_gather(detect_emotion, enhanced, limit)
+    timings["analysis"] = round((time.perf_counter() - stage_started) * 1000, 2)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+
+    drifts = [c["drift_score"] for c in consistency]
+    words = [r["words"] for r in readability_after]
+
+    return {
+        "mode": "enhancement_long",
+        "enhanced_text": stitch(chunks, enhanced),
+        "chunks": [
+            {
+                "index": chunk.index,
+                "paragraphs": len(chunk.paragraphs),
+                "words_before": readability_before[chunk.index]["words"],
+                "words_after": words[chunk.index],
+                "readability_before": readability_before[chunk.index]["flesch"],
+                "readability_after": readability_after[chunk.index]["flesch"],
+                "drift_score": consistency[chunk.index]["drift_score"],
+                "consistency_score": consistency[chunk.index]["consistency_score"],
+                "emotion": emotions[chunk.index],
+                "rewrite_ms": rewrite_ms[chunk.index],
+            }
+            for chunk in chunks
+        ],
+        "aggregate": {
+            "chunks": len(chunks),
+            "readability_before": aggregate_readability(readability_before),
+            "readability_after": aggregate_readability(readability_after),
+            "drift_mean": round(sum(drifts) / len(drifts), 4),
+            "drift_max": round(max(drifts), 4),
+            "consistency_mean": round(sum(c["consistency_score"] for c in consistency) / len(consistency), 4),
+            "centroid_drift": consistency[-1]["centroid_drift"],
+            "emotion": dominant(emotions, words),
+            "slowest_chunk_ms": max(rewrite_ms),
+        },
+        "timings_ms": timings
+    }
+
+
+# ============================
+# STREAMING ENDPOINTS (SSE)
+# ============================
+#
+# Events:
+#   token   {"delta": "..."}      LLM text as it arrives
+#   plan    {"plan": "..."}       /generate/stream only, before the tokens
+#   result  {...}                 same body as the non-streaming endpoint
+#   error   {"error": "..."}
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(events):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/analyze/stream")
+async def analyze_content_stream(data: EnhancementRequest):
+
+    async def events():
+        try:
+            started = time.perf_counter()
+            # Off the event loop, overlapping the rewrite stream
+            readability_before = asyncio.get_running_loop().run_in_executor(
+                cpu_pool, analyze_readability, data.text
+            )
+            parts = []
+
+            async for delta in rewrite_with_llm_stream(data.text, data.tone, data.level):
+                parts.append(delta)
+                yield sse("token", {"delta": delta})
+
+            rewrite_ms = round((time.perf_counter() - started) * 1000, 2)
+            observe_stage("enhanced_text", rewrite_ms / 1000)
+
+            results, timings = await enhancement_followup_graph.run(
+                enhanced_text=clean_text("".join(parts)),
+                session_id=data.session_id
+            )
+            results["readability_before"] = await readability_before
+
+            yield sse("result", enhancement_response(
+                data, results, {"enhanced_text": rewrite_ms, **timings}
+            ))
+
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+
+    return event_stream(events())
+
+
+@app.post("/generate/stream")
+async def generate_content_stream(data: ScriptRequest):
+
+    async def events():
+        try:
+            started = time.perf_counter()
+            plan = await plan_story(data.prompt, data.genre)
+            plan_ms = round((time.perf_counter() - started) * 1000, 2)
+            observe_stage("plan", plan_ms / 1000)
+            yield sse("plan", {"plan": clean_text(plan)})
+
+            started = time.perf_counter()
+            parts = []
+
+            async for delta in generate_script_stream(
+                plan, data.tone, data.length, data.target_words
+            ):
+                parts.append(delta)
+                yield sse("token", {"delta": delta})
+
+            script_ms = round((time.perf_counter() - started) * 1000, 2)
+            observe_stage("generated_text", script_ms / 1000)
+
+            results, timings = await generation_followup_graph.run(
+                generated_text=clean_text("".join(parts)),
+                session_id=data.session_id
+            )
+            results["plan"] = plan
+
+            yield sse("result", generation_response(
+                results, {"plan": plan_ms, "generated_text": script_ms, **timings}
+            ))
+
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+
+    return event_stream(events())
+
+
 # ============================
 # AUTO ROUTER
 # ============================
 
 @app.post("/writer")
-def auto_writer(data: WriterRequest):
+async def auto_writer(data: WriterRequest):
+    return await coalesced("writer", data, lambda: run_writer(data))
 
-    intent_raw = analyze_intent(data.user_input)
 
+async def run_writer(data: WriterRequest):
+
+    started = time.perf_counter()
     try:
-        intent = json.loads(intent_raw)
-    except:
-        return {"error": "Intent parsing failed", "raw_output": intent_raw}
+        intent, intent_info = await analyze_intent(data.user_input)
+    except IntentParseError as e:
+        return {"error": "Intent parsing failed", "raw_output": e.raw_output}
+    intent_ms = round((time.perf_counter() - started) * 1000, 2)
+    observe_stage("intent", intent_ms / 1000)
 
     task_type = intent.get("task_type")
 
@@ -159,7 +697,7 @@ def auto_writer(data: WriterRequest):
         tone = intent.get("tone", "formal")
         level = intent.get("level", "medium")
 
-        return analyze_content(
+        result = await analyze_content(
             EnhancementRequest(
                 session_id=data.session_id,
                 text=data.user_input,
@@ -174,7 +712,7 @@ def auto_writer(data: WriterRequest):
         tone = intent.get("tone", "storyteller")
         length = intent.get("length", "medium")
 
-        return generate_content(
+        result = await generate_content(
             ScriptRequest(
                 session_id=data.session_id,
                 prompt=data.user_input,
@@ -184,4 +722,52 @@ def auto_writer(data: WriterRequest):
             )
         )
 
-    return {"error": "Could not determine task type"}
\ No newline at end of file
+    else:
+        return {"error": "Could not determine task type"}
+
+    # "rule", "long_input" or "prototype" when no LLM call was needed
+    result["intent_source"] = intent_info["source"]
+    result["timings_ms"]["intent"] = intent_ms
+    return result
+
+
+# ============================
+# EMBEDDINGS
+# ============================
+
+@app.post("/embed")
+async def embed_texts(data: EmbedRequest):
+    """
+    Raw MiniLM embeddings (packed float32, base64) for search queries and
+    backfills. Nothing is added to any session's memory.
+    """
+
+    if not data.texts:
+        return {"embeddings": [], "dim": None}
+
+    loop = asyncio.get_running_loop()
+    embeddings = await loop.run_in_executor(cpu_pool, encode_batch, data.texts)
+
+    return {
+        "embeddings": [pack_embedding(e) for e in embeddings],
+        "dim": int(len(embeddings[0]))
+    }
+
+
+# ============================
+# METRICS
+# ============================
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: stage / LLM histograms and in-flight gauges."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# ============================
+# CACHE STATS
+# ============================
+
+@app.get("/cache/stats")
+def cache_stats():
+    return llm_cache.stats()
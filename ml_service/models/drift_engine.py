@@ -0,0 +1,85 @@
+# ml_service/models/drift_engine.py
+
+import os
+
+import numpy as np
+
+DRIFT_WINDOW = int(os.getenv("DRIFT_WINDOW", "8"))
+DRIFT_EMA_ALPHA = float(os.getenv("DRIFT_EMA_ALPHA", "0.2"))
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def similarity_to(vector, direction):
+    """Cosine of unit ``vector`` and an unnormalised ``direction``."""
+    return float(np.dot(vector, direction) / max(float(np.linalg.norm(direction)), 1e-12))
+
+
+class DriftEngine:
+    """
+    Per-session drift with O(dim) work per paragraph.
+
+    Every vector is stored normalised, so each comparison is one dot
+    product. Alongside the session's ring (utils/session_store.py) the
+    engine keeps two running vectors:
+
+    - an exponential moving centroid of the whole session, and
+    - the sum of the last ``window`` vectors, updated by adding the new
+      vector and subtracting the one leaving the window (read back from
+      the ring), and re-summed exactly once per ``window`` updates so
+      float32 rounding cannot accumulate.
+
+    ``update`` reports drift against the last paragraph, the window mean
+    and the centroid, then folds the new vector in.
+    """
+
+    def __init__(self, store, window=DRIFT_WINDOW, alpha=DRIFT_EMA_ALPHA):
+        self.store = store
+        self.window = window
+        self.alpha = alpha
+
+    def update(self, session_id, embedding):
+        vector = unit(embedding)
+
+        with self.store.session(session_id) as slot:
+            window = max(1, min(self.window, slot.capacity))
+
+            if slot.count == 0:
+                # First paragraph → fully consistent
+                slot.centroid[:] = vector
+                slot.window_sum[:] = vector
+                slot.push(vector)
+                return scores(1.0, 1.0, 1.0)
+
+            if not slot.centroid.any():
+                # Slot written before the store kept drift state
+                filled = np.arange(min(window, slot.count))
+                slot.window_sum[:] = slot.recent(filled).sum(axis=0)
+                slot.centroid[:] = slot.recent(0)
+
+            last = similarity_to(vector, slot.recent(0))
+            window_similarity = similarity_to(vector, slot.window_sum)
+            centroid_similarity = similarity_to(vector, slot.centroid)
+
+            if slot.count >= window:
+                slot.window_sum -= slot.recent(window - 1)
+            slot.window_sum += vector
+            slot.centroid[:] = (1 - self.alpha) * slot.centroid + self.alpha * vector
+            slot.push(vector)
+
+            if slot.count % window == 0:
+                slot.window_sum[:] = slot.recent(np.arange(window)).sum(axis=0)
+
+        return scores(last, window_similarity, centroid_similarity)
+
+
+def scores(last, window, centroid):
+    return {
+        "drift_score": 1 - last,
+        "consistency_score": last,
+        "window_drift": 1 - window,
+        "centroid_drift": 1 - centroid
+    }
@@ -1,47 +1,120 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import base64
 import numpy as np
+import os
+import threading
+import time
 
-# Load model once
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+from models.drift_engine import DriftEngine
+from pipelines.stage_graph import cpu_pool
+from utils.batching import MicroBatcher
+from utils.session_store import create_session_store
 
-# Session memory (simple in-memory store)
-session_memory = {}
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
 
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-def analyze_consistency(text: str, session_id: int):
+# torch | onnx | onnx-int8
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+
+def load_model(backend=EMBEDDING_BACKEND):
+
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_NAME)
+
+    if backend in ("onnx", "onnx-int8"):
+        from models.onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder(MODEL_NAME, quantize=backend == "onnx-int8")
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+# Loaded on first use, not at import, so the app (and /healthz) come up
+# without paying for torch and the MiniLM weights.
+_model = None
+_model_lock = threading.Lock()
+
+model_stats = {
+    "backend": EMBEDDING_BACKEND,
+    "load_ms": None,
+    "warmup_ms": None
+}
+
+
+def get_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                started = time.perf_counter()
+                _model = load_model()
+                model_stats["load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    return _model
 
-    # Generate embedding
-    embedding = model.encode([text])
 
-    if session_id not in session_memory:
-        session_memory[session_id] = []
+def is_model_loaded():
+    return _model is not None
 
-    previous_embeddings = session_memory[session_id]
 
-    if not previous_embeddings:
-        # First paragraph → fully consistent
-        session_memory[session_id].append(embedding[0])
-        return {
-            "drift_score": 0.0,
-            "consistency_score": 1.0
-        }
+def warm_up(batch_size=8):
+    model = get_model()
+    started = time.perf_counter()
+    model.encode(["warm up"] * batch_size, batch_size=batch_size)
+    model_stats["warmup_ms"] = round((time.perf_counter() - started) * 1000, 2)
 
-    # Compare with last paragraph
-    last_embedding = previous_embeddings[-1].reshape(1, -1)
 
-    similarity = cosine_similarity(last_embedding, embedding)[0][0]
+# Bounded, persistent session memory (see utils/session_store.py)
+session_memory = create_session_store()
+drift_engine = DriftEngine(session_memory)
 
-    drift_score = 1 - similarity
-    consistency_score = similarity
 
-    # Store current embedding
-    session_memory[session_id].append(embedding[0])
+def encode_batch(texts):
+    return get_model().encode(list(texts), batch_size=EMBED_MAX_BATCH)
+
+
+# Concurrent requests share one forward pass through MiniLM.
+embedding_batcher = MicroBatcher(
+    encode_batch,
+    max_batch_size=EMBED_MAX_BATCH,
+    max_wait_ms=EMBED_MAX_WAIT_MS,
+    executor=cpu_pool
+)
+
+
+async def embed(text: str):
+    return await embedding_batcher.submit(text)
+
+
+def pack_embedding(embedding):
+    """float32 bytes, base64-encoded: the form clients store (e.g. Django's Paragraph.embedding)."""
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode()
+
+
+def update_consistency(embedding, session_id: int):
+    """
+    Last-paragraph, window and centroid drift of ``embedding`` within the
+    session (see models/drift_engine.py), which then absorbs it. The
+    packed embedding is returned too, so callers can persist it.
+    """
 
     return {
-        "drift_score": float(drift_score),
-        "consistency_score": float(consistency_score)
+        **drift_engine.update(session_id, embedding),
+        "embedding": pack_embedding(embedding)
     }
 
 
-    
\ No newline at end of file
+def update_consistency_batch(embeddings, session_id: int):
+    """``update_consistency`` for each embedding in order. Blocks on the store's lock: run it in cpu_pool."""
+    return [update_consistency(e, session_id) for e in embeddings]
+
+
+async def analyze_consistency(text: str, session_id: int):
+
+    # Generate embedding
+    embedding = await embed(text)
+
+    return update_consistency(embedding, session_id)
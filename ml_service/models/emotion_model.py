@@ -1,7 +1,11 @@
 # ml_service/models/emotion_model.py
 
 import os
-from groq import Groq
+
+import numpy as np
+
+from models.embedding_model import encode_batch
+from utils.llm_gateway import complete
 
 ALLOWED_EMOTIONS = [
     "joy", "sadness", "anger",
@@ -9,15 +13,19 @@ ALLOWED_EMOTIONS = [
     "neutral"
 ]
 
+# llm | local
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", "llm")
+
+# Below this cosine to every prototype the local head answers "neutral"
+EMOTION_MIN_SIMILARITY = float(os.getenv("EMOTION_MIN_SIMILARITY", "0.2"))
 
-def detect_emotion(text: str):
+
+async def detect_emotion(text: str):
 
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         return "neutral"
 
-    client = Groq(api_key=api_key)
-
     prompt = f"""
 Classify the dominant emotion.
 
@@ -30,19 +38,116 @@ Text:
 {text}
 """
 
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role": "system", "content": "Emotion classifier."},
-            {"role": "user", "content": prompt}
-        ],
+    response = await complete(
+        "Emotion classifier.",
+        prompt,
         temperature=0,
-        max_tokens=10
+        max_tokens=10,
+        site="emotion"
     )
 
-    emotion = response.choices[0].message.content.strip().lower()
+    emotion = response.lower()
 
     if emotion not in ALLOWED_EMOTIONS:
         return "neutral"
 
-    return emotion
\ No newline at end of file
+    return emotion
+
+
+# ============================
+# LOCAL BACKEND
+# ============================
+#
+# Nearest prototype on the MiniLM embedding the pipeline already computes
+# for consistency, so classifying costs one (prototypes x dim) product.
+
+EMOTION_PROTOTYPES = {
+    "joy": [
+        "She laughed with delight as the whole family gathered around the table.",
+        "We finally won the championship and everyone was cheering.",
+        "I am so happy and grateful for this wonderful day.",
+        "The sun came out and the children ran through the meadow, giggling.",
+    ],
+    "sadness": [
+        "He sat alone in the empty house, missing her more than words could say.",
+        "Tears rolled down her cheeks as she read the final letter.",
+        "I feel hopeless and tired, nothing seems to matter anymore.",
+        "The funeral was quiet, and the rain would not stop.",
+    ],
+    "anger": [
+        "He slammed the door and shouted that he was sick of their lies.",
+        "I am furious that they ignored every complaint we made.",
+        "Her voice shook with rage as she confronted the man who betrayed her.",
+        "This is outrageous and completely unacceptable.",
+    ],
+    "fear": [
+        "Something was breathing in the dark hallway behind him.",
+        "Her hands trembled as the footsteps came closer to the door.",
+        "I am terrified that I will lose everything tomorrow.",
+        "The ship groaned and the crew panicked as water poured in.",
+    ],
+    "surprise": [
+        "To everyone's astonishment, the old man stood up and began to dance.",
+        "I could not believe it when I opened the door and saw them all there.",
+        "Suddenly the wall slid open, revealing a hidden staircase.",
+        "Wow, I never expected the results to turn out like this!",
+    ],
+    "disgust": [
+        "The stench of rotting food made him gag.",
+        "I find their cruelty to animals absolutely revolting.",
+        "Maggots crawled across the spoiled meat on the counter.",
+        "She recoiled from the slimy, filthy water.",
+    ],
+    "neutral": [
+        "The meeting is scheduled for Tuesday at ten in conference room B.",
+        "The report summarises quarterly revenue and operating costs.",
+        "Water boils at one hundred degrees Celsius at sea level.",
+        "Please submit the form before the end of the month.",
+    ],
+}
+
+
+class PrototypeEmotionClassifier:
+
+    def __init__(self, encode, min_similarity=EMOTION_MIN_SIMILARITY):
+        # ``encode(texts)`` -> (n, dim) embeddings, e.g. embedding_model.encode_batch
+        self.encode = encode
+        self.min_similarity = min_similarity
+        self.prototypes = None
+        self.labels = None
+
+    def load(self):
+        if self.prototypes is None:
+            labels, texts = [], []
+            for emotion, examples in EMOTION_PROTOTYPES.items():
+                labels += [emotion] * len(examples)
+                texts += examples
+            prototypes = np.asarray(self.encode(texts), dtype=np.float32)
+            self.labels = np.array(labels)
+            self.prototypes = prototypes / np.linalg.norm(prototypes, axis=1, keepdims=True)
+        return self.prototypes
+
+    def classify_batch(self, embeddings):
+        """One label from ALLOWED_EMOTIONS per embedding, in a single matmul."""
+
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+        similarities = embeddings @ self.load().T
+        best = similarities.argmax(axis=1)
+
+        return [
+            str(self.labels[j]) if similarities[i, j] >= self.min_similarity else "neutral"
+            for i, j in enumerate(best)
+        ]
+
+
+local_emotion = PrototypeEmotionClassifier(encode_batch)
+
+
+def detect_emotion_local(embedding):
+    return local_emotion.classify_batch([embedding])[0]
+
+
+def detect_emotions_local(embeddings):
+    return local_emotion.classify_batch(embeddings)
@@ -0,0 +1,197 @@
+# ml_service/models/intent_classifier.py
+#
+# Local intent fast path for /writer: cheap lexical rules first, then
+# nearest-prototype scoring on the MiniLM embeddings. Anything below the
+# confidence threshold is left to the LLM (models/intent_model.py).
+
+import asyncio
+import os
+import re
+
+import numpy as np
+
+from models.tone_engine import TONE_PROFILES, LEVEL_PROFILES
+from pipelines.stage_graph import cpu_pool
+
+ENHANCEMENT = "content_enhancement"
+GENERATION = "script_generation"
+
+# Cosine margin between the best and second-best class needed to answer locally
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.08"))
+
+# Inputs this long that carry no generation cue are text to be enhanced
+LONG_INPUT_WORDS = 60
+
+# Weaker than the GENERATION rule: enough to keep a long input away from
+# the long-input shortcut, not enough to answer "generation" on its own
+GENERATION_CUE = re.compile(
+    r"\b(story|stories|script|screenplay|scene|tale|poem|plot|episode|dialogue|narrative|sketch)\b"
+    r"|\b(tell me|imagine|invent|come up with)\b",
+    re.IGNORECASE
+)
+
+LANGUAGE_TAG = re.compile(r"^\s*\[OUTPUT IN [A-Z ]+\]\s*")
+
+RULES = {
+    # An imperative request (a sentence that opens with the verb, or a
+    # "please" / "can you" before it): "She sat down to write a story..."
+    # or "The story of our founding..." is prose to enhance, not a request
+    GENERATION: re.compile(
+        r"(?:^\s*|[.!?:]\s+|\b(?:please|can you|could you|would you|i want you to|i need you to)\s+)"
+        r"(?:please\s+)?(?:write|generate|create|compose|draft|produce|tell|give|make|invent|come up with)"
+        r"(?:\s+(?:me|us))?\b[^.!?]{0,40}"
+        r"\b(story|script|screenplay|scene|tale|poem|plot|episode|dialogue|narrative)\b",
+        re.IGNORECASE | re.MULTILINE
+    ),
+    ENHANCEMENT: re.compile(
+        r"\b(rewrite|rephrase|paraphrase|improve|enhance|polish|proofread|edit|refine|"
+        r"fix|correct|simplify|shorten|tighten|reword)\b"
+        r"|\bmake (this|it) (more|less|sound)\b",
+        re.IGNORECASE
+    ),
+}
+
+# Short labelled examples; each class is scored by its nearest prototype.
+PROTOTYPES = {
+    ENHANCEMENT: [
+        "Improve the flow of this paragraph.",
+        "Please make my writing sound more professional.",
+        "Can you clean up the grammar in the following text?",
+        "This sentence feels clunky, help me say it better.",
+        "Turn this into polished academic prose.",
+        "Make the tone of this email friendlier.",
+        "The meeting was postponed due to unforeseen circumstances and we apologise.",
+        "I has went to the market yesterday and buyed three apple.",
+        "Our quarterly revenue grew by twelve percent, driven mostly by new customers.",
+    ],
+    GENERATION: [
+        "Tell me a story about a dragon who is afraid of fire.",
+        "I need a short horror script set in an abandoned hospital.",
+        "Come up with a sci-fi plot about a colony on Mars.",
+        "A detective story in 1920s Chicago, please.",
+        "Invent a bedtime tale for my five year old about a brave rabbit.",
+        "Produce a comedy sketch between two robots at a coffee shop.",
+        "Imagine a fantasy adventure with a thief and a talking sword.",
+        "Script for a YouTube video introducing our new app.",
+    ],
+}
+
+GENRES = [
+    "fantasy", "horror", "sci-fi", "science fiction", "romance", "mystery",
+    "thriller", "comedy", "drama", "adventure", "fairy tale", "detective",
+]
+
+LENGTHS = {"short": "short", "brief": "short", "long": "long", "detailed": "long"}
+
+
+def normalise(matrix):
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def first_keyword(text, keywords):
+    lowered = text.lower()
+    found = [(lowered.find(k), k) for k in keywords if re.search(rf"\b{re.escape(k)}\b", lowered)]
+    return min(found)[1] if found else None
+
+
+def fill_slots(task_type, text):
+    """Tone / level / genre / length from keywords, with the /writer defaults."""
+
+    if task_type == ENHANCEMENT:
+        return {
+            "task_type": ENHANCEMENT,
+            "tone": first_keyword(text, TONE_PROFILES) or "formal",
+            "level": first_keyword(text, LEVEL_PROFILES) or "medium",
+        }
+
+    genre = first_keyword(text, GENRES) or "general"
+    length = first_keyword(text, LENGTHS)
+
+    return {
+        "task_type": GENERATION,
+        "genre": "sci-fi" if genre == "science fiction" else genre,
+        "tone": first_keyword(text, TONE_PROFILES) or "storyteller",
+        "length": LENGTHS[length] if length else "medium",
+    }
+
+
+def apply_rules(text):
+    """``(task_type, reason)`` when the lexical rules are decisive, else ``(None, None)``."""
+
+    matched = [task for task, pattern in RULES.items() if pattern.search(text)]
+
+    if len(matched) == 1:
+        return matched[0], "rule"
+
+    if not matched and len(text.split()) >= LONG_INPUT_WORDS and not GENERATION_CUE.search(text):
+        return ENHANCEMENT, "long_input"
+
+    return None, None
+
+
+class IntentClassifier:
+
+    def __init__(self, encode, min_margin=INTENT_MIN_MARGIN):
+        # ``encode(texts)`` -> (n, dim) embeddings, e.g. embedding_model.encode_batch
+        self.encode = encode
+        self.min_margin = min_margin
+        self.labels = None
+        self.prototypes = None
+
+    def _load_prototypes(self):
+        if self.prototypes is None:
+            labels, texts = [], []
+            for task, examples in PROTOTYPES.items():
+                labels += [task] * len(examples)
+                texts += examples
+            prototypes = normalise(np.asarray(self.encode(texts), dtype=np.float32))
+            self.labels = np.array(labels)
+            self.prototypes = prototypes
+        return self.prototypes
+
+    def score(self, embedding):
+        """Best cosine per class against its prototypes."""
+
+        prototypes = self._load_prototypes()
+        similarities = prototypes @ normalise(np.asarray(embedding, dtype=np.float32))
+        return {
+            task: float(similarities[self.labels == task].max())
+            for task in PROTOTYPES
+        }
+
+    def classify(self, text, embedding=None):
+        """
+        ``(intent, info)``. ``intent`` is the same dict the LLM returns, or
+        None when the input should go to the LLM; ``info`` says why.
+        """
+
+        text = LANGUAGE_TAG.sub("", text)
+
+        task, reason = apply_rules(text)
+        if task is not None:
+            return fill_slots(task, text), {"source": reason, "confidence": 1.0}
+
+        if embedding is None:
+            embedding = self.encode([text])[0]
+
+        scores = self.score(embedding)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        margin = ranked[0][1] - ranked[1][1]
+        info = {"source": "prototype", "confidence": round(margin, 4), "scores": scores}
+
+        if margin < self.min_margin:
+            return None, info
+
+        return fill_slots(ranked[0][0], text), info
+
+    async def aclassify(self, text, embed):
+        """``classify`` with the embedding taken from the async ``embed`` (the micro-batcher)."""
+
+        stripped = LANGUAGE_TAG.sub("", text)
+        if apply_rules(stripped)[0] is not None:
+            return self.classify(text)
+
+        embedding = await embed(stripped)
+        if self.prototypes is None:
+            await asyncio.get_running_loop().run_in_executor(cpu_pool, self._load_prototypes)
+        return self.classify(text, embedding=embedding)
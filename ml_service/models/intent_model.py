@@ -1,17 +1,69 @@
 # ml_service/models/intent_model.py
 
+import json
 import os
-from groq import Groq
+import re
 
+from models.embedding_model import embed, encode_batch
+from models.intent_classifier import IntentClassifier
+from utils.llm_gateway import complete
 
-def analyze_intent(text: str):
+# Set INTENT_LOCAL=0 to send every input to the LLM
+INTENT_LOCAL = os.getenv("INTENT_LOCAL", "1") == "1"
 
-    api_key = os.getenv("GROQ_API_KEY")
+DEFAULT_INTENT = {"task_type": "content_enhancement", "tone": "formal", "level": "medium"}
 
-    if not api_key:
-        return '{"task_type":"content_enhancement","tone":"formal","level":"medium"}'
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
 
-    client = Groq(api_key=api_key)
+local_classifier = IntentClassifier(encode_batch)
+
+
+class IntentParseError(Exception):
+
+    def __init__(self, raw_output):
+        super().__init__("Intent parsing failed")
+        self.raw_output = raw_output
+
+
+def parse_intent(raw):
+    """The JSON object in the LLM reply (tolerating code fences or stray text)."""
+
+    match = JSON_OBJECT.search(raw or "")
+    if match is None:
+        raise IntentParseError(raw)
+
+    try:
+        intent = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        raise IntentParseError(raw)
+
+    if not isinstance(intent, dict):
+        raise IntentParseError(raw)
+    return intent
+
+
+async def analyze_intent(text: str):
+    """
+    ``(intent, info)`` for a /writer input: the local classifier when it
+    is confident, the LLM otherwise. Raises IntentParseError when the LLM
+    reply holds no JSON object.
+    """
+
+    info = {"source": "default"}
+
+    if INTENT_LOCAL:
+        intent, info = await local_classifier.aclassify(text, embed)
+        if intent is not None:
+            return intent, info
+
+    if not os.getenv("GROQ_API_KEY"):
+        return dict(DEFAULT_INTENT), {**info, "source": "default"}
+
+    raw = await classify_with_llm(text)
+    return parse_intent(raw), {**info, "source": "llm"}
+
+
+async def classify_with_llm(text: str):
 
     prompt = f"""
 You are an AI intent classification system.
@@ -46,14 +98,10 @@ User Input:
 {text}
 """
 
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role": "system", "content": "Strict JSON intent classifier."},
-            {"role": "user", "content": prompt}
-        ],
+    return await complete(
+        "Strict JSON intent classifier.",
+        prompt,
         temperature=0,
-        max_tokens=200
-    )
-
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+        max_tokens=200,
+        site="intent"
+    )
\ No newline at end of file
@@ -0,0 +1,156 @@
+# ml_service/models/onnx_embedder.py
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ONNX_CACHE_DIR = os.getenv(
+    "ONNX_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent / "data" / "onnx")
+)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = onnxruntime default
+MAX_SEQ_LENGTH = 256
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def model_dir(model_name: str) -> Path:
+    return Path(ONNX_CACHE_DIR) / model_name.replace("/", "__")
+
+
+def export_onnx(model_name: str) -> Path:
+    """
+    Export the transformer body to ONNX once and cache it on disk along
+    with its tokenizer. Only this step needs torch / transformers.
+
+    Workers starting on a cold cache may export at the same time: each
+    writes into its own temporary directory and moves the files into
+    place with ``os.replace``, ``model.onnx`` last, so a reader never
+    sees a half-written model or a model without its tokenizer.
+    """
+
+    target = model_dir(model_name)
+    onnx_path = target / "model.onnx"
+
+    if onnx_path.exists():
+        return onnx_path
+
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    target.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    dummy = tokenizer(["export warm up"], return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+
+    with tempfile.TemporaryDirectory(dir=target, prefix=".export-") as scratch:
+        scratch = Path(scratch)
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in INPUT_NAMES),
+                str(scratch / "model.onnx"),
+                input_names=INPUT_NAMES,
+                output_names=["last_hidden_state"],
+                dynamic_axes={name: axes for name in INPUT_NAMES + ["last_hidden_state"]},
+                opset_version=14
+            )
+
+        tokenizer.save_pretrained(str(scratch))
+
+        for path in sorted(scratch.iterdir(), key=lambda p: p.name == "model.onnx"):
+            os.replace(path, target / path.name)
+
+    return onnx_path
+
+
+def quantize_onnx(onnx_path: Path) -> Path:
+    """Dynamic int8 quantization of the weights (activations stay fp32)."""
+
+    quantized_path = onnx_path.with_name("model.int8.onnx")
+
+    if quantized_path.exists():
+        return quantized_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # Written aside and moved into place, as in export_onnx
+    with tempfile.TemporaryDirectory(dir=onnx_path.parent, prefix=".quantize-") as scratch:
+        partial = Path(scratch) / quantized_path.name
+        quantize_dynamic(str(onnx_path), str(partial), weight_type=QuantType.QInt8)
+        os.replace(partial, quantized_path)
+
+    return quantized_path
+
+
+class OnnxEmbedder:
+    """
+    Drop-in replacement for the parts of SentenceTransformer we use:
+    ``encode`` (mean pooling + L2 normalisation, as all-MiniLM-L6-v2 does)
+    and ``get_sentence_embedding_dimension``.
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        onnx_path = export_onnx(model_name)
+        if quantize:
+            onnx_path = quantize_onnx(onnx_path)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir(model_name) / "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            str(onnx_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts, batch_size=32):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        rows = [
+            self._encode_batch(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ]
+        embeddings = np.vstack(rows) if rows else np.zeros((0, self.dimension), dtype=np.float32)
+
+        return embeddings[0] if single else embeddings
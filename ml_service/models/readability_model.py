@@ -1,25 +1,38 @@
+import os
 import re
+from functools import lru_cache
+
+SYLLABLE_CACHE_SIZE = int(os.getenv("SYLLABLE_CACHE_SIZE", "65536"))
+
+# One tokenizer for everything: words, sentence terminators, and any
+# other non-space character (which still makes a sentence non-empty).
+TOKEN_PATTERN = re.compile(r"\w+|[.!?]+|\S")
+TERMINATORS = frozenset(".!?")
+SENTENCE_SPLIT = re.compile(r"[.!?]+")
+WORD_PATTERN = re.compile(r"\w+")
+
+VOWELS = frozenset("aeiouy")
 
 
 def count_sentences(text):
-    sentences = re.split(r'[.!?]+', text)
+    sentences = SENTENCE_SPLIT.split(text)
     sentences = [s.strip() for s in sentences if s.strip()]
     return max(len(sentences), 1)
 
 
 def count_words(text):
-    words = re.findall(r'\w+', text)
+    words = WORD_PATTERN.findall(text)
     return max(len(words), 1)
 
 
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
 def count_syllables(word):
     word = word.lower()
-    vowels = "aeiouy"
     syllables = 0
     prev_char_was_vowel = False
 
     for char in word:
-        if char in vowels:
+        if char in VOWELS:
             if not prev_char_was_vowel:
                 syllables += 1
             prev_char_was_vowel = True
@@ -32,17 +45,61 @@ def count_syllables(word):
     return max(syllables, 1)
 
 
-def analyze_readability(text: str):
+def readability_stats(text: str):
+    """
+    Flesch reading ease, Flesch-Kincaid grade and counts from a single
+    pass over the text. Counting rules match ``count_sentences`` /
+    ``count_words`` / ``count_syllables``.
+    """
+
+    words = 0
+    syllables = 0
+    sentences = 0
+    in_sentence = False
+
+    for token in TOKEN_PATTERN.findall(text):
+        first = token[0]
+
+        if first in TERMINATORS:
+            if in_sentence:
+                sentences += 1
+            in_sentence = False
+            continue
+
+        in_sentence = True
 
-    sentences = count_sentences(text)
-    words = re.findall(r'\w+', text)
+        # \w is exactly "isalnum() or underscore"
+        if first == "_" or first.isalnum():
+            words += 1
+            syllables += count_syllables(token)
 
-    total_words = max(len(words), 1)
-    total_syllables = sum(count_syllables(word) for word in words)
+    if in_sentence:
+        sentences += 1
+
+    return readability_from_counts(words, max(sentences, 1), syllables)
+
+
+def readability_from_counts(words, sentences, syllables):
+    """Scores from raw counts; summed counts give the exact score of concatenated texts."""
+
+    total_words = max(words, 1)
+    sentences = max(sentences, 1)
 
     asl = total_words / sentences
-    asw = total_syllables / total_words
+    asw = syllables / total_words
+
+    return {
+        "flesch": round(206.835 - (1.015 * asl) - (84.6 * asw), 2),
+        "fk_grade": round((0.39 * asl) + (11.8 * asw) - 15.59, 2),
+        "words": words,
+        "sentences": sentences,
+        "syllables": syllables
+    }
+
+
+def analyze_readability(text: str):
+    return readability_stats(text)["flesch"]
 
-    flesch_score = 206.835 - (1.015 * asl) - (84.6 * asw)
 
-    return round(flesch_score, 2)
\ No newline at end of file
+def analyze_readability_batch(texts):
+    return [readability_stats(text) for text in texts]
@@ -1,33 +1,28 @@
 # ml_service/models/script_model.py
 
 import os
-from groq import Groq
+from utils.llm_gateway import complete, stream
 
+SYSTEM_PROMPT = "You write cinematic high-quality stories."
 
-def generate_script(plan, tone, length, target_words=None, target_sentences=None):
 
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        return plan
+def build_script_prompt(plan, tone, length, target_words=None, target_sentences=None):
 
-    try:
-        client = Groq(api_key=api_key)
+    # -------------------------
+    # Length Instruction Logic
+    # -------------------------
+    length_instruction = ""
 
-        # -------------------------
-        # Length Instruction Logic
-        # -------------------------
-        length_instruction = ""
+    if target_words:
+        length_instruction += f"Write approximately {target_words} words. "
 
-        if target_words:
-            length_instruction += f"Write approximately {target_words} words. "
+    if target_sentences:
+        length_instruction += f"Use about {target_sentences} sentences. "
 
-        if target_sentences:
-            length_instruction += f"Use about {target_sentences} sentences. "
-
-        # -------------------------
-        # Final Prompt
-        # -------------------------
-        final_prompt = f"""
+    # -------------------------
+    # Final Prompt
+    # -------------------------
+    return f"""
 You are a professional creative writer.
 
 Write a {tone} story.
@@ -47,18 +42,49 @@ Story Plan:
 {plan}
 """
 
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You write cinematic high-quality stories."},
-                {"role": "user", "content": final_prompt}
-            ],
+
+async def generate_script(plan, tone, length, target_words=None, target_sentences=None):
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        return plan
+
+    try:
+        return await complete(
+            SYSTEM_PROMPT,
+            build_script_prompt(plan, tone, length, target_words, target_sentences),
             temperature=0.8,
-            max_tokens=900
+            max_tokens=900,
+            site="script"
         )
 
-        return response.choices[0].message.content.strip()
-
     except Exception as e:
         print("⚠ Script generation error:", str(e))
-        return plan
\ No newline at end of file
+        return plan
+
+
+async def generate_script_stream(plan, tone, length, target_words=None, target_sentences=None):
+    """Yield the story as it is generated; falls back to ``plan``."""
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        yield plan
+        return
+
+    produced = False
+
+    try:
+        async for delta in stream(
+            SYSTEM_PROMPT,
+            build_script_prompt(plan, tone, length, target_words, target_sentences),
+            temperature=0.8,
+            max_tokens=900,
+            site="script"
+        ):
+            produced = True
+            yield delta
+
+    except Exception as e:
+        print("⚠ Script generation stream error:", str(e))
+        if not produced:
+            yield plan
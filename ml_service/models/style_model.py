@@ -1,45 +1,77 @@
 # ml_service/models/style_model.py
 
 import os
-from groq import Groq
+from utils.llm_gateway import complete, stream
 
+SYSTEM_PROMPT = "Professional writing assistant."
 
-def rewrite_with_llm(text: str, tone: str, level: str):
+PARAGRAPH_NOTE = "\nKeep the paragraph breaks (blank lines) exactly where they are."
 
-    api_key = os.getenv("GROQ_API_KEY")
-
-    if not api_key or api_key.strip() == "":
-        print("⚠ GROQ_API_KEY missing in rewrite_with_llm")
-        return text
-
-    try:
-        client = Groq(api_key=api_key)
 
-        prompt = f"""
+def build_rewrite_prompt(text: str, tone: str, level: str):
+    paragraphs = PARAGRAPH_NOTE if "\n\n" in text else ""
+    return f"""
 Rewrite the following text.
 
 Tone: {tone}
 Enhancement level: {level}
 
 Preserve original meaning.
-Do not change the length drastically.
+Do not change the length drastically.{paragraphs}
 
 Text:
 {text}
 """
 
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "Professional writing assistant."},
-                {"role": "user", "content": prompt}
-            ],
+
+async def rewrite_with_llm(text: str, tone: str, level: str, max_tokens: int = 400):
+
+    api_key = os.getenv("GROQ_API_KEY")
+
+    if not api_key or api_key.strip() == "":
+        print("⚠ GROQ_API_KEY missing in rewrite_with_llm")
+        return text
+
+    try:
+        return await complete(
+            SYSTEM_PROMPT,
+            build_rewrite_prompt(text, tone, level),
             temperature=0.7,
-            max_tokens=400
+            max_tokens=max_tokens,
+            site="rewrite",
+            # Re-enhancing an unchanged paragraph returns the earlier rewrite.
+            cache=True
         )
 
-        return response.choices[0].message.content.strip()
-
     except Exception as e:
         print("⚠ LLM rewrite error:", str(e))
-        return text
\ No newline at end of file
+        return text
+
+
+async def rewrite_with_llm_stream(text: str, tone: str, level: str):
+    """Yield the rewrite as it is generated; falls back to ``text``."""
+
+    api_key = os.getenv("GROQ_API_KEY")
+
+    if not api_key or api_key.strip() == "":
+        print("⚠ GROQ_API_KEY missing in rewrite_with_llm_stream")
+        yield text
+        return
+
+    produced = False
+
+    try:
+        async for delta in stream(
+            SYSTEM_PROMPT,
+            build_rewrite_prompt(text, tone, level),
+            temperature=0.7,
+            max_tokens=400,
+            site="rewrite"
+        ):
+            produced = True
+            yield delta
+
+    except Exception as e:
+        print("⚠ LLM rewrite stream error:", str(e))
+        if not produced:
+            yield text
@@ -1,34 +1,8 @@
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from models.embedding_model import get_embedding
-
-# Temporary in-memory session memory
-session_memory = {}
-
-def analyze_consistency(text: str, session_id: int):
-
-    embedding = get_embedding(text)
-
-    if session_id not in session_memory:
-        session_memory[session_id] = embedding
-        return {
-            "drift_score": 0.0,
-            "consistency_score": 1.0
-        }
-
-    previous_embedding = session_memory[session_id]
-
-    similarity = cosine_similarity(
-        [embedding],
-        [previous_embedding]
-    )[0][0]
-
-    drift = 1 - similarity
-
-    # Update session memory (running average)
-    session_memory[session_id] = (previous_embedding + embedding) / 2
-
-    return {
-        "drift_score": float(drift),
-        "consistency_score": float(similarity)
-    }
\ No newline at end of file
+# ml_service/pipelines/consistency_pipeline.py
+#
+# Consistency used to be prototyped here with a running average and a
+# per-request sklearn cosine_similarity. It now lives in
+# models/drift_engine.py (EMA centroid, ring window, dot products on unit
+# vectors); this module only re-exports the entry points.
+
+from models.embedding_model import analyze_consistency, update_consistency  # noqa: F401
@@ -0,0 +1,166 @@
+# ml_service/pipelines/long_document.py
+#
+# Long-document mode for /analyze/long: split a manuscript on paragraph
+# and sentence boundaries into token-budgeted chunks, and stitch the
+# rewritten chunks back together with the original paragraph breaks.
+# The endpoint in main.py rewrites the chunks concurrently.
+
+import math
+import os
+import re
+
+from models.readability_model import readability_from_counts
+
+# Input budget per chunk. The rewrite is allowed OUTPUT_RATIO times as
+# many tokens, so a chunk is never cut off by max_tokens.
+LONG_CHUNK_TOKENS = int(os.getenv("LONG_CHUNK_TOKENS", "350"))
+LONG_MAX_CONCURRENCY = int(os.getenv("LONG_MAX_CONCURRENCY", "8"))
+OUTPUT_RATIO = 1.5
+OUTPUT_MARGIN = 64
+
+BLANK_LINE = re.compile(r"\n\s*\n")
+# A sentence runs to its terminator plus any closing quotes / brackets
+SENTENCE = re.compile(r"\S.*?(?:[.!?…]+[\"'”’)\]]*(?=\s|$)|$)")
+
+
+def estimate_tokens(text):
+    """About four characters per token for English with the Llama tokenizer."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def output_budget(chunk_text):
+    return int(estimate_tokens(chunk_text) * OUTPUT_RATIO) + OUTPUT_MARGIN
+
+
+def collapse(text):
+    return " ".join(text.split())
+
+
+def split_paragraphs(text):
+    """Blank lines separate paragraphs; without any, every line is one."""
+
+    separator = BLANK_LINE if BLANK_LINE.search(text) else re.compile(r"\n")
+    return [collapse(p) for p in separator.split(text) if p.strip()]
+
+
+def split_sentences(paragraph, max_tokens):
+    """Sentences of ``paragraph``; a sentence over budget is cut between words."""
+
+    pieces = []
+    for sentence in SENTENCE.findall(paragraph):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+
+        words, current = sentence.split(), []
+        for word in words:
+            if current and estimate_tokens(" ".join(current + [word])) > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+
+    return [p for p in pieces if p]
+
+
+class Chunk:
+
+    def __init__(self, index):
+        self.index = index
+        # Paragraph fragments; joined with blank lines
+        self.paragraphs = []
+        # True when the last fragment carries on in the next chunk
+        self.continues = False
+
+    @property
+    def text(self):
+        return "\n\n".join(self.paragraphs)
+
+    def tokens(self):
+        return estimate_tokens(self.text) if self.paragraphs else 0
+
+
+def split_into_chunks(text, max_tokens=LONG_CHUNK_TOKENS):
+    """
+    Chunks of at most ``max_tokens`` estimated tokens, in reading order.
+    Short paragraphs are packed together; a paragraph over budget gets
+    chunks of its own, cut between sentences.
+    """
+
+    chunks = [Chunk(0)]
+
+    def new_chunk(continues=False):
+        if chunks[-1].paragraphs:
+            chunks[-1].continues = continues
+            chunks.append(Chunk(len(chunks)))
+
+    for paragraph in split_paragraphs(text):
+
+        if estimate_tokens(paragraph) <= max_tokens:
+            if chunks[-1].tokens() + estimate_tokens(paragraph) + 1 > max_tokens:
+                new_chunk()
+            chunks[-1].paragraphs.append(paragraph)
+            continue
+
+        new_chunk()
+        fragment = []
+        for sentence in split_sentences(paragraph, max_tokens):
+            if fragment and estimate_tokens(" ".join(fragment + [sentence])) > max_tokens:
+                chunks[-1].paragraphs.append(" ".join(fragment))
+                new_chunk(continues=True)
+                fragment = []
+            fragment.append(sentence)
+
+        chunks[-1].paragraphs.append(" ".join(fragment))
+        new_chunk()
+
+    if not chunks[-1].paragraphs:
+        chunks.pop()
+
+    return chunks
+
+
+def clean_rewrite(chunk, rewritten):
+    """
+    Whitespace-normalise one rewritten chunk; a single fragment stays one
+    paragraph. None when the model merged or split the paragraphs of a
+    multi-paragraph chunk, so the caller can rewrite them one by one.
+    """
+
+    if len(chunk.paragraphs) == 1:
+        return collapse(rewritten)
+
+    paragraphs = [collapse(p) for p in BLANK_LINE.split(rewritten) if p.strip()]
+    if len(paragraphs) != len(chunk.paragraphs):
+        return None
+    return "\n\n".join(paragraphs)
+
+
+def stitch(chunks, texts):
+    """Join rewritten chunk texts: a space inside a paragraph, a blank line between paragraphs."""
+
+    parts = []
+    for chunk, text in zip(chunks, texts):
+        parts.append(text)
+        parts.append(" " if chunk.continues else "\n\n")
+    return "".join(parts[:-1])
+
+
+def aggregate_readability(stats):
+    """Document scores from per-chunk ``readability_stats``, exact rather than averaged."""
+
+    return readability_from_counts(
+        sum(s["words"] for s in stats),
+        sum(s["sentences"] for s in stats),
+        sum(s["syllables"] for s in stats),
+    )
+
+
+def dominant(labels, weights):
+    """The label with the largest total weight (e.g. emotion by words)."""
+
+    totals = {}
+    for label, weight in zip(labels, weights):
+        totals[label] = totals.get(label, 0) + weight
+    return max(totals, key=totals.get) if totals else None
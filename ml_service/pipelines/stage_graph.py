@@ -0,0 +1,118 @@
+# ml_service/pipelines/stage_graph.py
+
+import asyncio
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import observe_stage
+
+
+# ============================
+# WORKER POOLS
+# ============================
+
+# CPU-bound stages (embeddings, readability) share one bounded pool.
+# Threads rather than processes: the embedder and the session memory live
+# in this process, and torch / numpy release the GIL during inference.
+CPU_WORKERS = int(os.getenv("ML_CPU_WORKERS", os.cpu_count() or 2))
+
+# Blocking network stages get their own pool so a slow LLM call never
+# starves CPU work.
+IO_WORKERS = int(os.getenv("ML_IO_WORKERS", "32"))
+
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="ml-cpu")
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="ml-io")
+
+
+# ============================
+# STAGE GRAPH
+# ============================
+
+class Stage:
+
+    def __init__(self, name, fn, deps, kind):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.kind = kind
+
+
+class StageGraph:
+    """
+    A small DAG of pipeline stages.
+
+    Each stage receives the results of its ``deps`` as positional
+    arguments and starts as soon as all of them are available. Graph
+    inputs passed to ``run`` can be used as dependencies like any stage.
+    Stages must be added after the stages they depend on, which keeps
+    the graph acyclic by construction.
+    """
+
+    def __init__(self, inputs=()):
+        self.inputs = tuple(inputs)
+        self.stages = {}
+
+    def add(self, name, fn, deps=(), kind="io"):
+
+        if kind not in ("io", "cpu"):
+            raise ValueError(f"Unknown stage kind: {kind}")
+
+        if name in self.stages or name in self.inputs:
+            raise ValueError(f"Duplicate stage: {name}")
+
+        for dep in deps:
+            if dep not in self.stages and dep not in self.inputs:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+        self.stages[name] = Stage(name, fn, deps, kind)
+        return self
+
+    async def run(self, **inputs):
+        """
+        Execute every stage and return ``(results, timings)``.
+
+        ``timings`` maps stage name to wall-clock milliseconds spent in
+        the stage itself (not waiting for its dependencies).
+        """
+
+        missing = set(self.inputs) - set(inputs)
+        if missing:
+            raise ValueError(f"Missing graph inputs: {sorted(missing)}")
+
+        loop = asyncio.get_running_loop()
+        results = dict(inputs)
+        timings = {}
+        tasks = {}
+
+        async def execute(stage):
+
+            if stage.deps:
+                await asyncio.gather(*(tasks[d] for d in stage.deps if d in tasks))
+
+            args = [results[d] for d in stage.deps]
+            started = time.perf_counter()
+
+            if inspect.iscoroutinefunction(stage.fn):
+                value = await stage.fn(*args)
+            else:
+                pool = cpu_pool if stage.kind == "cpu" else io_pool
+                value = await loop.run_in_executor(pool, stage.fn, *args)
+
+            elapsed = time.perf_counter() - started
+            observe_stage(stage.name, elapsed)
+            timings[stage.name] = round(elapsed * 1000, 2)
+            results[stage.name] = value
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.ensure_future(execute(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        return results, timings
@@ -0,0 +1,14 @@
+# ml_service/tests/conftest.py
+#
+# Run from the repo root or ml_service/: python -m pytest ml_service/tests
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Tests that import main must not write to the real session store or
+# load MiniLM at startup
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+os.environ.setdefault("ML_WARMUP", "0")
@@ -0,0 +1,237 @@
+# ml_service/tests/test_batching.py
+
+import asyncio
+import time
+
+from utils.batching import MicroBatcher, SingleFlight
+
+
+class FakeEncoder:
+    """Records each batch it is given; ``fail`` makes every call raise."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail:
+            raise ValueError("encode failed")
+        return [f"row:{item}" for item in items]
+
+
+# ============================
+# MICRO-BATCHER
+# ============================
+
+def test_each_caller_gets_its_own_row():
+    encoder = FakeEncoder()
+
+    async def go():
+        batcher = MicroBatcher(encoder, max_batch_size=8, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5))), batcher
+
+    results, batcher = asyncio.run(go())
+
+    assert results == [f"row:{i}" for i in range(5)]
+    assert encoder.batches == [[0, 1, 2, 3, 4]]
+    assert batcher.stats() == {"batches": 1, "items": 5, "mean_batch_size": 5.0}
+
+
+def test_failed_encode_reaches_every_waiting_caller():
+    encoder = FakeEncoder(fail=True)
+
+    async def go():
+        batcher = MicroBatcher(encoder, max_batch_size=8, max_wait_ms=5)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), timeout=2
+        )
+
+    results = asyncio.run(go())
+
+    assert len(encoder.batches) == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_full_batch_flushes_without_waiting():
+    encoder = FakeEncoder()
+
+    async def go():
+        batcher = MicroBatcher(encoder, max_batch_size=3, max_wait_ms=10_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3))), timeout=2
+        )
+
+    assert asyncio.run(go()) == ["row:0", "row:1", "row:2"]
+    assert encoder.batches == [[0, 1, 2]]
+
+
+def test_overflow_waits_for_its_own_window():
+    encoder = FakeEncoder()
+
+    async def go():
+        batcher = MicroBatcher(encoder, max_batch_size=3, max_wait_ms=200)
+        tasks = [asyncio.ensure_future(batcher.submit(i)) for i in range(4)]
+
+        first = await asyncio.gather(*tasks[:3])
+        overflow_waiting = not tasks[3].done()
+        return first, overflow_waiting, await tasks[3]
+
+    first, overflow_waiting, last = asyncio.run(go())
+
+    assert first == ["row:0", "row:1", "row:2"]
+    assert overflow_waiting
+    assert last == "row:3"
+    assert encoder.batches == [[0, 1, 2], [3]]
+
+
+def test_lone_item_flushes_after_max_wait():
+    encoder = FakeEncoder()
+
+    async def go():
+        batcher = MicroBatcher(encoder, max_batch_size=32, max_wait_ms=40)
+        started = time.perf_counter()
+        result = await batcher.submit("only")
+        return result, (time.perf_counter() - started) * 1000
+
+    result, elapsed_ms = asyncio.run(go())
+
+    assert result == "row:only"
+    assert elapsed_ms >= 35
+    assert encoder.batches == [["only"]]
+
+
+# ============================
+# SINGLE FLIGHT
+# ============================
+
+class SlowCall:
+    """An async ``fn`` for ``SingleFlight.do`` that counts its runs."""
+
+    def __init__(self, result=None, error=None, delay=0.02):
+        self.result = result if result is not None else {"items": [1, 2]}
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.finished = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_joiners_share_one_run_and_only_they_are_marked():
+    call = SlowCall()
+
+    async def go():
+        flight = SingleFlight(window=0)
+        return await asyncio.gather(*(flight.do("k", call) for _ in range(3))), flight
+
+    results, flight = asyncio.run(go())
+
+    assert call.calls == 1
+    assert [shared for _, shared in results] == [False, True, True]
+    assert flight.stats() == {"leaders": 1, "shared": 2, "in_flight": 0}
+
+
+def test_results_are_deep_copies():
+    call = SlowCall()
+
+    async def go():
+        flight = SingleFlight(window=5)
+        first, second = await asyncio.gather(flight.do("k", call), flight.do("k", call))
+        first[0]["items"].append("mutated")
+        third, _ = await flight.do("k", call)
+        return first[0], second[0], third
+
+    first, second, third = asyncio.run(go())
+
+    assert call.calls == 1
+    assert second == third == {"items": [1, 2]}
+    assert call.result == {"items": [1, 2]}
+    assert first is not second and first["items"] is not second["items"]
+
+
+def test_shared_run_survives_a_cancelled_caller():
+    call = SlowCall(delay=0.05)
+
+    async def go():
+        flight = SingleFlight(window=0)
+        leader = asyncio.ensure_future(flight.do("k", call))
+        await asyncio.sleep(0)
+        joiner = asyncio.ensure_future(flight.do("k", call))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        result, shared = await joiner
+        return leader, result, shared
+
+    leader, result, shared = asyncio.run(go())
+
+    assert leader.cancelled()
+    assert (result, shared) == ({"items": [1, 2]}, True)
+    assert (call.calls, call.finished) == (1, 1)
+
+
+def test_failures_reach_joiners_and_are_not_remembered():
+    call = SlowCall(error=RuntimeError("llm down"))
+
+    async def go():
+        flight = SingleFlight(window=5)
+        failed = await asyncio.gather(flight.do("k", call), flight.do("k", call), return_exceptions=True)
+
+        call.error = None
+        retried = await flight.do("k", call)
+        return failed, retried
+
+    failed, retried = asyncio.run(go())
+
+    assert all(isinstance(e, RuntimeError) for e in failed)
+    assert retried == ({"items": [1, 2]}, False)
+    assert call.calls == 2
+
+
+def test_window_expires():
+    call = SlowCall(delay=0)
+
+    async def go():
+        flight = SingleFlight(window=0.05)
+        first = await flight.do("k", call)
+        repeat = await flight.do("k", call)
+        await asyncio.sleep(0.08)
+        expired = await flight.do("k", call)
+        other = await flight.do("other", call)
+        return first, repeat, expired, other
+
+    first, repeat, expired, other = asyncio.run(go())
+
+    assert [shared for _, shared in (first, repeat, expired, other)] == [False, True, False, False]
+    assert call.calls == 3
+
+
+def test_coalesced_marks_only_the_joined_responses():
+    import main
+
+    runs = []
+
+    async def run():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return {"mode": "enhancement"}
+
+    async def go():
+        data = main.EnhancementRequest(session_id=1, text="Same text twice.")
+        return await asyncio.gather(
+            main.coalesced("test", data, run),
+            main.coalesced("test", data, run)
+        )
+
+    leader, joiner = asyncio.run(go())
+
+    assert len(runs) == 1
+    assert "coalesced" not in leader
+    assert joiner == {"mode": "enhancement", "coalesced": True}
@@ -0,0 +1,128 @@
+# ml_service/tests/test_drift_engine.py
+#
+# The incremental drift engine against a brute-force recomputation from
+# the full paragraph history.
+
+import numpy as np
+import pytest
+
+from models.drift_engine import DriftEngine, unit
+from utils.session_store import create_session_store
+
+DIM = 16
+WINDOW = 4
+ALPHA = 0.2
+TOLERANCE = 1e-4
+
+
+def make_store(backend, directory, max_vectors):
+    kwargs = {"dim": DIM, "max_vectors": max_vectors}
+    if backend == "mmap":
+        kwargs.update(directory=str(directory), shards=1, slots=2)
+    return create_session_store(backend, **kwargs)
+
+
+def paragraphs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    position = rng.normal(size=DIM)
+    for _ in range(count):
+        position = position + 0.5 * rng.normal(size=DIM)
+        yield position.astype(np.float32)
+
+
+def drift(vector, direction):
+    return 1 - float(np.dot(vector, direction) / np.linalg.norm(direction))
+
+
+def expected_scores(history, vector, centroid):
+    return (
+        drift(vector, history[-1]),
+        drift(vector, np.sum(history[-WINDOW:], axis=0, dtype=np.float64)),
+        drift(vector, centroid),
+    )
+
+
+def got_scores(result):
+    return result["drift_score"], result["window_drift"], result["centroid_drift"]
+
+
+@pytest.fixture(params=["memory", "mmap"])
+def backend(request):
+    return request.param
+
+
+def test_matches_recomputation_across_ring_wrap(backend, tmp_path):
+    # A ring of 6 wraps many times over 50 paragraphs
+    store = make_store(backend, tmp_path, max_vectors=6)
+    engine = DriftEngine(store, window=WINDOW, alpha=ALPHA)
+
+    history, centroid = [], None
+
+    for embedding in paragraphs(50):
+        vector = unit(embedding)
+        result = engine.update(1, embedding)
+
+        if not history:
+            assert got_scores(result) == (0.0, 0.0, 0.0)
+            centroid = vector.astype(np.float64)
+        else:
+            expected = expected_scores(history, vector, centroid)
+            assert got_scores(result) == pytest.approx(expected, abs=TOLERANCE)
+            centroid = (1 - ALPHA) * centroid + ALPHA * vector
+
+        history.append(vector)
+
+    assert store.get(1).shape == (6, DIM)
+
+
+def test_window_sum_is_resummed_once_per_window(backend, tmp_path):
+    store = make_store(backend, tmp_path, max_vectors=6)
+    engine = DriftEngine(store, window=WINDOW, alpha=ALPHA)
+
+    for count, embedding in enumerate(paragraphs(3 * WINDOW + 1), start=1):
+        engine.update(1, embedding)
+
+        with store.session(1) as slot:
+            exact = slot.recent(np.arange(min(WINDOW, count))).sum(axis=0)
+            if count % WINDOW == 0:
+                # Re-summed from the ring, not carried over
+                np.testing.assert_array_equal(slot.window_sum, exact)
+            else:
+                np.testing.assert_allclose(slot.window_sum, exact, atol=1e-5)
+
+
+def test_seeds_a_slot_written_before_the_drift_state(backend, tmp_path):
+    store = make_store(backend, tmp_path, max_vectors=6)
+    engine = DriftEngine(store, window=WINDOW, alpha=ALPHA)
+
+    # Written by the old engine: ring only, no centroid or window sum
+    history = [unit(e) for e in paragraphs(7, seed=1)]
+    for vector in history:
+        store.append(1, vector)
+
+    # The upgrade seeds the centroid from the newest vector and the window
+    # sum from the ring
+    centroid = history[-1].astype(np.float64)
+
+    for embedding in paragraphs(10, seed=2):
+        vector = unit(embedding)
+        result = engine.update(1, embedding)
+
+        expected = expected_scores(history, vector, centroid)
+        assert got_scores(result) == pytest.approx(expected, abs=TOLERANCE)
+
+        centroid = (1 - ALPHA) * centroid + ALPHA * vector
+        history.append(vector)
+
+
+def test_sessions_do_not_share_state(backend, tmp_path):
+    store = make_store(backend, tmp_path, max_vectors=6)
+    engine = DriftEngine(store, window=WINDOW, alpha=ALPHA)
+
+    a, b = list(paragraphs(2, seed=3)), list(paragraphs(1, seed=4))
+
+    engine.update(1, a[0])
+    assert got_scores(engine.update(2, b[0])) == (0.0, 0.0, 0.0)
+
+    expected = drift(unit(a[1]), unit(a[0]))
+    assert engine.update(1, a[1])["drift_score"] == pytest.approx(expected, abs=TOLERANCE)
@@ -0,0 +1,134 @@
+# ml_service/tests/test_llm_cache.py
+
+import asyncio
+import sqlite3
+import time
+
+from utils.llm_cache import DiskTier, LLMCache, MemoryTier, cache_key
+
+BASE = ("llama-3.1-8b-instant", "system", "prompt", 0, 200)
+
+
+# ============================
+# KEY
+# ============================
+
+def test_key_covers_model_system_prompt_temperature_and_max_tokens():
+    key = cache_key(*BASE)
+
+    assert cache_key(*BASE) == key
+    assert cache_key("llama-3.1-8b-instant", "system", "prompt", 0.0, 200) == key
+
+    for position, other in enumerate(["other-model", "other system", "other prompt", 0.7, 400]):
+        changed = list(BASE)
+        changed[position] = other
+        assert cache_key(*changed) != key
+
+    # Fields are not simply concatenated
+    assert cache_key("m", "ab", "c", 0, 1) != cache_key("m", "a", "bc", 0, 1)
+
+
+# ============================
+# MEMORY TIER
+# ============================
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryTier(max_size=2, ttl=60)
+
+    tier.set("a", "1")
+    tier.set("b", "2")
+    assert tier.get("a") == "1"  # "b" is now the LRU
+    tier.set("c", "3")
+
+    assert tier.get("b") is None
+    assert (tier.get("a"), tier.get("c")) == ("1", "3")
+    assert tier.evictions == 1
+    assert len(tier) == 2
+
+
+def test_memory_tier_expires_entries():
+    tier = MemoryTier(max_size=8, ttl=60)
+
+    tier.set("short", "1", ttl=0.01)
+    tier.set("long", "2")
+    time.sleep(0.02)
+
+    assert tier.get("short") is None
+    assert tier.get("long") == "2"
+    assert len(tier) == 1
+
+
+# ============================
+# DISK TIER
+# ============================
+
+def test_disk_tier_expires_entries(tmp_path):
+    tier = DiskTier(str(tmp_path / "cache.sqlite3"), max_rows=100, ttl=60)
+
+    tier.set("short", "1", ttl=0.01)
+    tier.set("long", "2")
+    time.sleep(0.02)
+
+    assert tier.get("short") is None
+    assert tier.get("long") == "2"
+    assert tier.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone() == (1,)
+
+
+def test_disk_tier_evicts_least_recently_accessed_rows(tmp_path):
+    tier = DiskTier(str(tmp_path / "cache.sqlite3"), max_rows=3, ttl=60)
+    tier.EVICT_EVERY = 1
+
+    for key in ("a", "b", "c"):
+        tier.set(key, key)
+        time.sleep(0.002)
+    tier.get("a")
+    time.sleep(0.002)
+    tier.set("d", "d")
+    tier.set("e", "e")
+
+    keys = {row[0] for row in tier.conn.execute("SELECT key FROM llm_cache")}
+    assert keys == {"a", "d", "e"}
+
+
+def test_disk_tier_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    DiskTier(path, max_rows=10, ttl=60).set("k", "v")
+
+    assert DiskTier(path, max_rows=10, ttl=60).get("k") == "v"
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    conn.close()
+
+
+# ============================
+# TWO TIERS
+# ============================
+
+def test_disk_hits_are_promoted_into_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = LLMCache(max_size=4, ttl=60, path=path)
+    reader = LLMCache(max_size=4, ttl=60, path=path)
+
+    async def go():
+        await writer.set("k", "v")
+        return [await reader.get("k"), await reader.get("k"), await reader.get("missing")]
+
+    assert asyncio.run(go()) == ["v", "v", None]
+
+    stats = reader.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    assert stats["memory_entries"] == 1
+
+
+def test_memory_only_cache_without_a_path():
+    cache = LLMCache(max_size=1, ttl=60, path="")
+
+    async def go():
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        return await cache.get("a"), await cache.get("b")
+
+    assert asyncio.run(go()) == (None, "2")
+    assert cache.stats()["disk_enabled"] is False
+    assert cache.stats()["memory_evictions"] == 1
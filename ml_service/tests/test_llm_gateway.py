@@ -0,0 +1,183 @@
+# ml_service/tests/test_llm_gateway.py
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from benchmarks.fake_groq import FakeConfig, chunk, completion, create_app
+from utils import llm_gateway
+from utils.llm_gateway import LLMError, LLMGateway
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0.0)
+
+
+def make_gateway(transport, **kwargs):
+    gateway = LLMGateway(base_url="http://fake/v1", **kwargs)
+    gateway._client = httpx.AsyncClient(transport=transport, base_url="http://fake/v1")
+    return gateway
+
+
+def ok(content="fine"):
+    return httpx.Response(200, json=completion(content, "fake"))
+
+
+def events(*deltas):
+    body = "".join(chunk(d, "fake") for d in deltas) + "data: [DONE]\n\n"
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body.encode())
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """An event stream that drops the connection after its first delta."""
+
+    async def __aiter__(self):
+        yield chunk("first", "fake").encode()
+        raise httpx.ReadError("connection reset")
+
+
+class Script:
+    """MockTransport handler answering each request with the next scripted step."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(json.loads(request.content))
+        step = self.steps.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+async def complete(gateway):
+    return await gateway.complete("system", "prompt", temperature=0.7, cache=False)
+
+
+async def collect(gateway):
+    return [delta async for delta in gateway.stream("system", "prompt")]
+
+
+# ============================
+# COMPLETIONS
+# ============================
+
+def test_retries_429_5xx_and_transport_errors():
+    script = Script(
+        httpx.Response(429),
+        httpx.Response(503),
+        httpx.ConnectError("refused"),
+        ok("answer"),
+    )
+    gateway = make_gateway(httpx.MockTransport(script), max_retries=3)
+
+    assert asyncio.run(complete(gateway)) == "answer"
+    assert len(script.requests) == 4
+
+
+def test_gives_up_after_max_retries():
+    script = Script(*[httpx.Response(502)] * 3)
+    gateway = make_gateway(httpx.MockTransport(script), max_retries=2)
+
+    with pytest.raises(LLMError, match="status 502"):
+        asyncio.run(complete(gateway))
+    assert len(script.requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    script = Script(httpx.Response(400, text="bad request"), ok())
+    gateway = make_gateway(httpx.MockTransport(script), max_retries=3)
+
+    with pytest.raises(LLMError, match="status 400"):
+        asyncio.run(complete(gateway))
+    assert len(script.requests) == 1
+
+
+def test_honours_retry_after():
+    script = Script(httpx.Response(429, headers={"retry-after": "0.2"}), ok())
+    gateway = make_gateway(httpx.MockTransport(script), max_retries=1)
+
+    started = time.perf_counter()
+    asyncio.run(complete(gateway))
+
+    assert time.perf_counter() - started >= 0.2
+    assert gateway._backoff(0, httpx.Response(429, headers={"retry-after": "3"})) == 3.0
+    assert gateway._backoff(0, httpx.Response(429, headers={"retry-after": "soon"})) == 0.0
+
+
+def test_caps_calls_in_flight():
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return ok()
+
+    gateway = make_gateway(httpx.MockTransport(handler), max_concurrency=2)
+
+    async def go():
+        return await asyncio.gather(*(complete(gateway) for _ in range(6)))
+
+    assert asyncio.run(go()) == ["fine"] * 6
+    assert peak == 2
+
+
+# ============================
+# STREAMING
+# ============================
+
+def test_stream_retries_before_the_first_token():
+    script = Script(httpx.Response(503), httpx.ReadError("reset"), events("Hello", " world"))
+    gateway = make_gateway(httpx.MockTransport(script), max_retries=2)
+
+    assert asyncio.run(collect(gateway)) == ["Hello", " world"]
+    assert len(script.requests) == 3
+    assert all(r["stream"] for r in script.requests)
+
+
+def test_stream_does_not_retry_after_the_first_token():
+    script = Script(
+        httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=BrokenStream()),
+        events("never", " sent"),
+    )
+    gateway = make_gateway(httpx.MockTransport(script), max_retries=3)
+    received = []
+
+    async def go():
+        async for delta in gateway.stream("system", "prompt"):
+            received.append(delta)
+
+    with pytest.raises(LLMError, match="LLM stream failed"):
+        asyncio.run(go())
+    assert received == ["first"]
+    assert len(script.requests) == 1
+
+
+# ============================
+# AGAINST THE FAKE GROQ SERVER
+# ============================
+
+def test_against_fake_groq_with_rate_limits():
+    config = FakeConfig(latency="fixed:1", token_ms=0, tokens=5, rate_429=0.5, retry_after=0.01, seed=3)
+    gateway = make_gateway(httpx.ASGITransport(app=create_app(config)), max_retries=10)
+
+    async def go():
+        answers = await asyncio.gather(*(complete(gateway) for _ in range(10)))
+        streamed = await collect(gateway)
+        return answers, streamed
+
+    answers, streamed = asyncio.run(go())
+
+    assert all(answers)
+    assert "".join(streamed).strip()
+    assert config.stats["rejected_429"] > 0
+    assert config.stats["requests"] == 11 + config.stats["rejected_429"]
@@ -0,0 +1,54 @@
+# ml_service/tests/test_onnx_parity.py
+#
+# The ONNX backends must embed like the PyTorch model they replace
+# (same thresholds as benchmarks/bench_embedding.py --check). Skipped
+# when onnxruntime, sentence-transformers or the model weights are not
+# available.
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("transformers")
+
+from benchmarks.bench_embedding import CORPUS, MODEL_NAME, PARITY_THRESHOLDS  # noqa: E402
+from models.onnx_embedder import OnnxEmbedder  # noqa: E402
+
+
+def normalised(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    from sentence_transformers import SentenceTransformer
+
+    try:
+        model = SentenceTransformer(MODEL_NAME)
+    except OSError as e:
+        pytest.skip(f"{MODEL_NAME} not available: {e}")
+    return normalised(model.encode(CORPUS, batch_size=32))
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_matches_torch(backend, reference):
+    model = OnnxEmbedder(MODEL_NAME, quantize=backend == "onnx-int8")
+
+    embeddings = normalised(model.encode(CORPUS, batch_size=32))
+    cosines = (reference * embeddings).sum(axis=1)
+
+    assert embeddings.shape == reference.shape
+    assert cosines.min() >= PARITY_THRESHOLDS[backend]
+
+
+def test_single_text_and_batch_agree(reference):
+    model = OnnxEmbedder(MODEL_NAME)
+
+    single = model.encode(CORPUS[0])
+    batched = model.encode(CORPUS[:4], batch_size=2)
+
+    assert single.shape == (model.get_sentence_embedding_dimension(),)
+    np.testing.assert_allclose(single, batched[0], atol=1e-4)
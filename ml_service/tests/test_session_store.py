@@ -0,0 +1,216 @@
+# ml_service/tests/test_session_store.py
+
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from utils.session_store import (
+    COUNT, EMPTY, LAST_USED, SID,
+    MemorySessionStore, MmapSessionStore, _ordered, create_session_store
+)
+
+DIM = 4
+
+
+def vec(*values):
+    return np.array(values + (0.0,) * (DIM - len(values)), dtype=np.float32)
+
+
+def mmap_store(directory, **kwargs):
+    options = {"shards": 1, "slots": 4, "max_vectors": 8, "dim": DIM}
+    options.update(kwargs)
+    return MmapSessionStore(str(directory), **options)
+
+
+# ============================
+# RING ORDER
+# ============================
+
+def test_ordered_before_and_after_wrap():
+    ring = np.arange(4, dtype=np.float32).reshape(4, 1)
+
+    assert _ordered(ring, 0).shape == (0, 1)
+    assert _ordered(ring, 3)[:, 0].tolist() == [0, 1, 2]
+    assert _ordered(ring, 4)[:, 0].tolist() == [0, 1, 2, 3]
+    # count 6: slots 0 and 1 were overwritten by the 5th and 6th vectors
+    assert _ordered(ring, 6)[:, 0].tolist() == [2, 3, 0, 1]
+
+
+@pytest.mark.parametrize("backend", ["memory", "mmap"])
+def test_get_and_last_keep_the_newest_vectors_in_order(backend, tmp_path):
+    kwargs = {"dim": DIM, "max_vectors": 3}
+    if backend == "mmap":
+        kwargs.update(directory=str(tmp_path), shards=2, slots=2)
+    store = create_session_store(backend, **kwargs)
+
+    assert store.last(7) is None
+    assert store.get(7).shape == (0, DIM)
+
+    for i in range(5):
+        store.append(7, vec(i))
+
+    assert store.get(7)[:, 0].tolist() == [2, 3, 4]
+    assert store.last(7)[0] == 4
+
+    store.clear(7)
+    assert store.last(7) is None
+
+
+# ============================
+# SLOT REUSE
+# ============================
+
+def test_empty_then_idle_slot_is_reused_before_the_lru(tmp_path):
+    store = mmap_store(tmp_path, slots=3, idle_ttl=3600)
+    shard = store.shards[0]
+
+    for session_id in (1, 2, 3):
+        store.append(session_id, vec(session_id))
+
+    # A cleared slot is taken first
+    store.clear(2)
+    store.append(4, vec(4))
+    assert shard.idx[:, SID].tolist() == [1, 4, 3]
+    assert shard.idx[1, COUNT] == 1
+
+    # Slot 0 idle, slot 2 idle for longer: the LRU would be slot 2, but
+    # the first idle slot wins
+    shard.idx[0, LAST_USED] -= 7200
+    shard.idx[2, LAST_USED] -= 9000
+    store.append(5, vec(5))
+
+    assert shard.idx[:, SID].tolist() == [5, 4, 3]
+    assert store.get(5)[:, 0].tolist() == [5]
+    assert store.get(1).shape == (0, DIM)
+
+
+def test_full_shard_reuses_the_least_recently_used_slot(tmp_path):
+    store = mmap_store(tmp_path, slots=3)
+    shard = store.shards[0]
+
+    for session_id in (1, 2, 3):
+        store.append(session_id, vec(session_id))
+    # None idle; slot 1 is the least recently used
+    now = time.time()
+    shard.idx[:, LAST_USED] = [now - 100, now - 300, now - 200]
+
+    store.append(4, vec(4))
+
+    assert shard.idx[:, SID].tolist() == [1, 4, 3]
+    # The reused slot starts empty, not with session 2's vectors
+    assert store.get(4)[:, 0].tolist() == [4]
+
+
+def test_memory_store_evicts_the_lru_session():
+    store = MemorySessionStore(dim=DIM, max_vectors=4, max_sessions=2)
+
+    store.append(1, vec(1))
+    store.append(2, vec(2))
+    store.append(1, vec(1))
+    store.append(3, vec(3))
+
+    assert store.last(2) is None
+    assert store.last(1)[0] == 1
+    assert store.last(3)[0] == 3
+
+
+def test_stale_hot_entry_after_another_worker_reuses_the_slot(tmp_path):
+    first = mmap_store(tmp_path, slots=1)
+    second = mmap_store(tmp_path, slots=1)
+
+    first.append(1, vec(1))
+    assert first.hot[1] == 0
+
+    # The other worker takes the only slot for session 2
+    second.append(2, vec(2))
+
+    # ``first`` still maps session 1 to slot 0 but must not read or
+    # write session 2's ring through it
+    assert first.hot[1] == 0
+    assert first.last(1) is None
+    assert first.get(1).shape == (0, DIM)
+
+    first.append(1, vec(10))
+    assert second.get(2).shape == (0, DIM)
+    assert second.get(1)[:, 0].tolist() == [10]
+
+
+# ============================
+# CONCURRENT WORKERS
+# ============================
+
+PROCESSES = 4
+APPENDS = 25
+
+
+def _append_from_worker(directory, worker):
+    store = mmap_store(directory, slots=4, max_vectors=PROCESSES * APPENDS)
+    for i in range(APPENDS):
+        store.append(1, vec(worker, i))
+        store.append(5, vec(worker, i))  # same shard, other slot
+
+
+def test_processes_appending_to_one_shard(tmp_path):
+    mmap_store(tmp_path, slots=4, max_vectors=PROCESSES * APPENDS)
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_append_from_worker, args=(str(tmp_path), worker))
+        for worker in range(PROCESSES)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    store = mmap_store(tmp_path, slots=4, max_vectors=PROCESSES * APPENDS)
+    assert np.count_nonzero(store.shards[0].idx[:, SID] != EMPTY) == 2
+
+    for session_id in (1, 5):
+        history = store.get(session_id)
+        assert history.shape == (PROCESSES * APPENDS, DIM)
+
+        # No append was lost, and each worker's appends kept their order
+        for worker in range(PROCESSES):
+            mine = history[history[:, 0] == worker][:, 1]
+            assert mine.tolist() == list(range(APPENDS))
+
+
+# ============================
+# RESTART
+# ============================
+
+def test_reopened_store_keeps_sessions(tmp_path):
+    store = mmap_store(tmp_path, shards=2)
+    for i in range(3):
+        store.append(3, vec(i))
+    with store.session(3) as slot:
+        slot.centroid[:] = vec(9)
+    del store
+
+    reopened = mmap_store(tmp_path, shards=2)
+
+    assert reopened.get(3)[:, 0].tolist() == [0, 1, 2]
+    with reopened.session(3) as slot:
+        assert slot.count == 3
+        assert slot.centroid[0] == 9
+
+
+def test_reopen_adds_drift_state_to_an_older_store(tmp_path):
+    store = mmap_store(tmp_path)
+    store.append(1, vec(1))
+    del store
+
+    # A store laid out before the drift state existed
+    (tmp_path / "shard_0.state").unlink()
+
+    reopened = mmap_store(tmp_path)
+
+    assert (tmp_path / "shard_0.state").exists()
+    assert reopened.get(1)[:, 0].tolist() == [1]
+    with reopened.session(1) as slot:
+        assert not slot.centroid.any()
+        assert not slot.window_sum.any()
@@ -0,0 +1,154 @@
+# ml_service/utils/batching.py
+
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item calls into one batched call.
+
+    ``fn`` takes a list of items and returns a sequence of results in the
+    same order. Items submitted within ``max_wait_ms`` of the first item
+    of a batch (or until ``max_batch_size`` is reached) are run together
+    in ``executor``; each caller awaits only its own row.
+    """
+
+    def __init__(self, fn, max_batch_size=32, max_wait_ms=5.0, executor=None):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.pending = []
+        self.timer = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        batch, self.pending = self.pending[:self.max_batch_size], self.pending[self.max_batch_size:]
+        if not batch:
+            return
+
+        # Anything left over starts its own wait window.
+        if self.pending:
+            self.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        loop = asyncio.get_running_loop()
+
+        try:
+            results = await loop.run_in_executor(self.executor, self.fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(items)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
+
+
+class SingleFlight:
+    """
+    Share one computation between concurrent identical calls.
+
+    The first ``do(key, fn)`` for a key runs ``fn()`` as its own task;
+    calls with the same key made while it runs, or up to ``window``
+    seconds after it succeeded, get (a copy of) the same result. A caller
+    that goes away does not cancel the shared task. Failures are not
+    remembered.
+    """
+
+    def __init__(self, window=2.0, max_entries=1024):
+        self.window = window
+        self.max_entries = max_entries
+        self.inflight = {}
+        self.recent = OrderedDict()
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key, fn):
+        """``(result, shared)``; ``shared`` is True when another call did the work."""
+
+        recent = self.recent.get(key)
+        if recent is not None and recent[0] > time.monotonic():
+            self.shared += 1
+            return copy.deepcopy(recent[1]), True
+
+        task = self.inflight.get(key)
+        shared = task is not None
+
+        if shared:
+            self.shared += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._settle(key, t))
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result), shared
+
+    def _settle(self, key, task):
+        self.inflight.pop(key, None)
+
+        if task.cancelled() or task.exception() is not None or self.window <= 0:
+            return
+
+        self.recent[key] = (time.monotonic() + self.window, task.result())
+        self.recent.move_to_end(key)
+
+        now = time.monotonic()
+        while self.recent and (len(self.recent) > self.max_entries or next(iter(self.recent.values()))[0] <= now):
+            self.recent.popitem(last=False)
+
+    def stats(self):
+        return {
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "in_flight": len(self.inflight),
+        }
+
+
+async def bounded_gather(fn, items, limit):
+    """Run ``await fn(item)`` for every item, at most ``limit`` at a time, preserving order."""
+
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,201 @@
+# ml_service/utils/llm_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+
+# Optional on-disk tier, shared by every worker on the host.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX_ROWS = int(os.getenv("LLM_CACHE_DISK_MAX_ROWS", "100000"))
+
+
+def cache_key(model, system, prompt, temperature, max_tokens):
+    raw = json.dumps(
+        [model, system, prompt, float(temperature), int(max_tokens)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ============================
+# IN-PROCESS LRU TIER
+# ============================
+
+class MemoryTier:
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.time() + (ttl or self.ttl), value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# ============================
+# SQLITE DISK TIER
+# ============================
+
+class DiskTier:
+
+    # Eviction is amortised: the row count is only checked every N writes.
+    EVICT_EVERY = 256
+
+    def __init__(self, path, max_rows, ttl):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.writes = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            if row[1] < now:
+                self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+
+            self.conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.conn.commit()
+            return row[0]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + (ttl or self.ttl), now)
+            )
+            self.writes += 1
+
+            if self.writes % self.EVICT_EVERY == 0:
+                self._evict(now)
+
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+
+        if count > self.max_rows:
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_rows,)
+            )
+
+
+# ============================
+# TWO-TIER CACHE
+# ============================
+
+class LLMCache:
+    """
+    Content-addressed cache for chat completions.
+
+    Lookups go memory first, then disk (if configured); disk hits are
+    promoted into memory.
+    """
+
+    def __init__(self, max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL,
+                 path=LLM_CACHE_PATH, disk_max_rows=LLM_CACHE_DISK_MAX_ROWS):
+        self.memory = MemoryTier(max_size, ttl)
+        self.disk = DiskTier(path, disk_max_rows, ttl) if path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, ttl)
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_enabled": self.disk is not None
+        }
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,317 @@
+# ml_service/utils/llm_gateway.py
+
+import asyncio
+import json
+import os
+import random
+import time
+
+import httpx
+
+from utils.llm_cache import cache_key, llm_cache
+from utils.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_IN_FLIGHT, LLM_RETRIES, observe_llm
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMGateway:
+    """
+    One pooled, async HTTP client for every chat-completion call.
+
+    Connections (HTTP/2 when ``h2`` is installed, keep-alive HTTP/1.1
+    otherwise) are reused across requests, in-flight calls are capped by
+    a semaphore, and 429 / 5xx / transport errors are retried with
+    exponential backoff.
+    """
+
+    def __init__(self, base_url=GROQ_BASE_URL, max_concurrency=LLM_MAX_CONCURRENCY,
+                 timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._semaphore = None
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=_http2_available(),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=5.0)
+            )
+        return self._client
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return LLM_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, LLM_BACKOFF_BASE)
+
+    async def _post(self, payload, timeout, site):
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise LLMError("GROQ_API_KEY missing")
+
+        client = self._get_client()
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        for attempt in range(self.max_retries + 1):
+
+            response = None
+
+            try:
+                async with self._get_semaphore():
+                    response = await client.post(
+                        "/chat/completions",
+                        json=payload,
+                        headers=headers,
+                        timeout=timeout or self.timeout
+                    )
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt == self.max_retries:
+                    raise LLMError(f"LLM request failed: {e}") from e
+                LLM_RETRIES.labels(site=site, reason="transport").inc()
+            else:
+                if response.status_code < 400:
+                    return response.json()
+
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise LLMError(f"LLM request failed with status {response.status_code}: {response.text[:200]}")
+                LLM_RETRIES.labels(site=site, reason=str(response.status_code)).inc()
+
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def complete(self, system, prompt, model=DEFAULT_MODEL,
+                       temperature=0.7, max_tokens=400, timeout=None, cache=None, site="other"):
+        """
+        Return the completion text for one system + user prompt.
+
+        Deterministic (temperature 0) calls are cached by default; other
+        call sites opt in with ``cache=True``. ``site`` labels the call in
+        the latency and token metrics.
+        """
+
+        started = time.perf_counter()
+
+        if cache is None:
+            cache = temperature == 0
+
+        key = None
+        if cache:
+            key = cache_key(model, system, prompt, temperature, max_tokens)
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                observe_llm(site, time.perf_counter() - started, "cache")
+                return cached
+
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+
+        try:
+            with LLM_IN_FLIGHT.labels(site=site).track_inprogress():
+                data = await self._post(payload, timeout, site)
+            text = data["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError) as e:
+            observe_llm(site, time.perf_counter() - started, "error")
+            raise LLMError("Malformed LLM response") from e
+        except BaseException:
+            observe_llm(site, time.perf_counter() - started, "error")
+            raise
+
+        observe_llm(site, time.perf_counter() - started, "ok", data.get("usage"))
+
+        if key is not None:
+            await llm_cache.set(key, text)
+
+        return text
+
+    async def stream(self, system, prompt, model=DEFAULT_MODEL,
+                     temperature=0.7, max_tokens=400, timeout=None, site="other"):
+        """
+        Yield completion text deltas as the server produces them.
+
+        Connection errors and 429 / 5xx are retried only until the first
+        token has been received; after that they propagate.
+        """
+
+        clock = time.perf_counter()
+        usage, deltas, outcome = {}, 0, "error"
+        LLM_IN_FLIGHT.labels(site=site).inc()
+        try:
+            async for delta in self._stream(system, prompt, model, temperature, max_tokens, timeout, site, usage):
+                if deltas == 0:
+                    LLM_FIRST_TOKEN_SECONDS.labels(site=site).observe(time.perf_counter() - clock)
+                deltas += 1
+                yield delta
+            outcome = "ok"
+        finally:
+            LLM_IN_FLIGHT.labels(site=site).dec()
+            # Without a usage block in the stream, count one token per delta
+            if "completion_tokens" not in usage:
+                usage["completion_tokens"] = deltas
+            observe_llm(site, time.perf_counter() - clock, outcome, usage)
+
+    async def _stream(self, system, prompt, model, temperature, max_tokens, timeout, site, usage):
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise LLMError("GROQ_API_KEY missing")
+
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        headers = {"Authorization": f"Bearer {api_key}"}
+        client = self._get_client()
+        started = False
+
+        for attempt in range(self.max_retries + 1):
+
+            response = None
+
+            try:
+                async with self._get_semaphore():
+                    async with client.stream(
+                        "POST",
+                        "/chat/completions",
+                        json=payload,
+                        headers=headers,
+                        timeout=timeout or self.timeout
+                    ) as response:
+
+                        if response.status_code < 400:
+                            async for delta in _iter_deltas(response, usage):
+                                started = True
+                                yield delta
+                            return
+
+                        body = (await response.aread()).decode("utf-8", "replace")
+
+                        if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                            raise LLMError(f"LLM stream failed with status {response.status_code}: {body[:200]}")
+
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if started or attempt == self.max_retries:
+                    raise LLMError(f"LLM stream failed: {e}") from e
+
+            LLM_RETRIES.labels(site=site, reason=str(response.status_code) if response is not None else "transport").inc()
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def _iter_deltas(response, usage=None):
+    """
+    Parse an OpenAI-style ``text/event-stream`` body into text deltas.
+    A usage block on the final chunk (``x_groq.usage`` on Groq) is copied
+    into ``usage``.
+    """
+
+    async for line in response.aiter_lines():
+
+        if not line.startswith("data:"):
+            continue
+
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+
+        try:
+            chunk = json.loads(data)
+            delta = chunk["choices"][0]["delta"].get("content")
+        except (ValueError, KeyError, IndexError, TypeError):
+            continue
+
+        reported = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+        if usage is not None and reported:
+            usage.update(reported)
+
+        if delta:
+            yield delta
+
+
+gateway = LLMGateway()
+
+
+async def complete(system, prompt, model=DEFAULT_MODEL, temperature=0.7,
+                   max_tokens=400, timeout=None, cache=None, site="other"):
+    return await gateway.complete(
+        system,
+        prompt,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        cache=cache,
+        site=site
+    )
+
+
+async def stream(system, prompt, model=DEFAULT_MODEL, temperature=0.7,
+                 max_tokens=400, timeout=None, site="other"):
+    async for delta in gateway.stream(
+        system,
+        prompt,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        site=site
+    ):
+        yield delta
+
+
+async def aclose():
+    await gateway.aclose()
@@ -0,0 +1,142 @@
+# ml_service/utils/metrics.py
+#
+# Prometheus metrics (GET /metrics, prometheus_client's default registry,
+# process series included) and per-request tracing for the ML service.
+# One process = one set of series, which is what uvicorn with a single
+# worker gives us.
+
+import json
+import os
+import time
+import uuid
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+from starlette.routing import Match
+
+# Print one JSON line per request with its stage and LLM timings
+ML_TIMING_LOG = os.getenv("ML_TIMING_LOG", "0") == "1"
+
+# Seconds; pipeline stages range from sub-millisecond to full LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+disable_created_metrics()
+
+
+def render():
+    return generate_latest().decode()
+
+
+# ============================
+# SERIES
+# ============================
+
+REQUEST_SECONDS = Histogram("ml_request_seconds", "HTTP request latency.", ["path", "status"], buckets=DEFAULT_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("ml_requests_in_flight", "HTTP requests being served.", ["path"])
+
+STAGE_SECONDS = Histogram("ml_stage_seconds", "Pipeline stage wall time.", ["stage"], buckets=DEFAULT_BUCKETS)
+COALESCED = Counter("ml_coalesced_requests_total", "Requests answered by an identical request's run.", ["endpoint"])
+
+LLM_SECONDS = Histogram(
+    "ml_llm_call_seconds", "LLM call latency per call site.", ["site", "outcome"], buckets=DEFAULT_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "ml_llm_first_token_seconds", "Time to first streamed token.", ["site"], buckets=DEFAULT_BUCKETS
+)
+LLM_TOKENS = Counter("ml_llm_tokens_total", "LLM tokens per call site.", ["site", "kind"])
+LLM_RETRIES = Counter("ml_llm_retries_total", "LLM attempts retried.", ["site", "reason"])
+LLM_IN_FLIGHT = Gauge("ml_llm_in_flight", "LLM calls in flight.", ["site"])
+
+
+# ============================
+# TRACING
+# ============================
+
+request_id = ContextVar("request_id", default=None)
+
+# Stage / LLM milliseconds of the current request, for the timing log
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def _add_timing(name, seconds):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0) + seconds * 1000, 2)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    _add_timing(stage, seconds)
+
+
+def observe_llm(site, seconds, outcome, usage=None):
+    LLM_SECONDS.labels(site=site, outcome=outcome).observe(seconds)
+    _add_timing(f"llm.{site}", seconds)
+
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage and usage.get(kind):
+            LLM_TOKENS.labels(site=site, kind=kind.split("_")[0]).inc(usage[kind])
+
+
+def route_template(scope):
+    """The path template of the route that will serve ``scope`` ("/sessions/{id}"), else "unmatched"."""
+
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency / in-flight series, the
+    ``X-Request-ID`` (taken from Django or generated) in a context
+    variable and on the response, and the optional timing log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        # Label by template so arbitrary URLs cannot mint new series
+        path = route_template(scope)
+        headers = dict(scope.get("headers") or [])
+        rid = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        rid_token = request_id.set(rid)
+        timings_token = _request_timings.set({})
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.labels(path=path).inc()
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.labels(path=path).dec()
+            REQUEST_SECONDS.labels(path=path, status=status).observe(elapsed)
+
+            if ML_TIMING_LOG:
+                print(json.dumps({
+                    "request_id": rid,
+                    "path": scope["path"],
+                    "status": status,
+                    "ms": round(elapsed * 1000, 2),
+                    "timings_ms": _request_timings.get(),
+                }))
+
+            _request_timings.reset(timings_token)
+            request_id.reset(rid_token)
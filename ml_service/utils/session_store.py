@@ -0,0 +1,327 @@
+# ml_service/utils/session_store.py
+
+import fcntl
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "mmap")
+SESSION_STORE_DIR = os.getenv(
+    "SESSION_STORE_DIR",
+    str(Path(__file__).resolve().parent.parent / "data" / "session_store")
+)
+SESSION_STORE_SHARDS = int(os.getenv("SESSION_STORE_SHARDS", "8"))
+SESSION_STORE_SLOTS = int(os.getenv("SESSION_STORE_SLOTS", "256"))
+SESSION_MAX_VECTORS = int(os.getenv("SESSION_MAX_VECTORS", "32"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(7 * 24 * 3600)))
+SESSION_HOT_CACHE = int(os.getenv("SESSION_HOT_CACHE", "4096"))
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+
+EMPTY = -1.0
+
+# Columns of the per-slot header
+SID, COUNT, LAST_USED = 0, 1, 2
+
+# Rows of the per-slot drift state (see models/drift_engine.py)
+CENTROID, WINDOW_SUM = 0, 1
+STATE_ROWS = 2
+
+
+class SessionSlot:
+    """
+    Writable view of one session's ring and drift state, valid only
+    inside the store's ``session()`` block (the store writes ``count``
+    back when the block exits).
+    """
+
+    def __init__(self, ring, count, state):
+        self.ring = ring
+        self.count = count
+        self.centroid = state[CENTROID]
+        self.window_sum = state[WINDOW_SUM]
+
+    @property
+    def capacity(self):
+        return self.ring.shape[0]
+
+    def recent(self, back):
+        """The vector ``back`` steps before the newest (0 = newest); ``back`` may be an array."""
+        return self.ring[(self.count - 1 - back) % self.capacity]
+
+    def push(self, vector):
+        self.ring[self.count % self.capacity] = vector
+        self.count += 1
+
+
+# ============================
+# IN-MEMORY BACKEND
+# ============================
+
+class MemorySessionStore:
+    """
+    Process-local store: one fixed ring buffer per session, an LRU over
+    sessions and idle eviction. Useful for development and tests; it is
+    neither persistent nor shared between workers.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, max_vectors=SESSION_MAX_VECTORS,
+                 max_sessions=SESSION_STORE_SHARDS * SESSION_STORE_SLOTS,
+                 idle_ttl=SESSION_IDLE_TTL):
+        self.dim = dim
+        self.max_vectors = max_vectors
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _evict_idle(self, now):
+        while self.sessions:
+            session_id, entry = next(iter(self.sessions.items()))
+            if now - entry["last_used"] <= self.idle_ttl and len(self.sessions) < self.max_sessions:
+                break
+            del self.sessions[session_id]
+
+    @contextmanager
+    def session(self, session_id):
+        now = time.time()
+        with self.lock:
+            entry = self.sessions.get(session_id)
+
+            if entry is None:
+                self._evict_idle(now)
+                entry = {
+                    "ring": np.zeros((self.max_vectors, self.dim), dtype=np.float32),
+                    "state": np.zeros((STATE_ROWS, self.dim), dtype=np.float32),
+                    "count": 0,
+                    "last_used": now
+                }
+                self.sessions[session_id] = entry
+
+            slot = SessionSlot(entry["ring"], entry["count"], entry["state"])
+            yield slot
+
+            entry["count"] = slot.count
+            entry["last_used"] = now
+            self.sessions.move_to_end(session_id)
+
+    def append(self, session_id, vector):
+        with self.session(session_id) as slot:
+            slot.push(vector)
+
+    def last(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None or entry["count"] == 0:
+                return None
+            return entry["ring"][(entry["count"] - 1) % self.max_vectors].copy()
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            return _ordered(entry["ring"], entry["count"])
+
+    def clear(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+
+# ============================
+# MEMORY-MAPPED BACKEND
+# ============================
+
+class _Shard:
+
+    def __init__(self, directory, index, slots, max_vectors, dim):
+        base = Path(directory) / f"shard_{index}"
+        self.lock_path = base.with_suffix(".lock")
+        self.idx_path = base.with_suffix(".idx")
+        self.vec_path = base.with_suffix(".vec")
+        self.state_path = base.with_suffix(".state")
+        self.slots = slots
+        self.thread_lock = threading.Lock()
+
+        self.lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        # The first process to get here lays out the files; the others
+        # wait on the lock and then just map them.
+        with self.locked(exclusive=True):
+            if not self.idx_path.exists():
+                idx = np.memmap(self.idx_path, dtype=np.float64, mode="w+", shape=(slots, 3))
+                idx[:, SID] = EMPTY
+                idx.flush()
+                del idx
+                vec = np.memmap(self.vec_path, dtype=np.float32, mode="w+",
+                                shape=(slots, max_vectors, dim))
+                vec.flush()
+                del vec
+
+            # Added after the first layout; older stores get it on upgrade.
+            if not self.state_path.exists():
+                state = np.memmap(self.state_path, dtype=np.float32, mode="w+",
+                                  shape=(slots, STATE_ROWS, dim))
+                state.flush()
+                del state
+
+            self.idx = np.memmap(self.idx_path, dtype=np.float64, mode="r+", shape=(slots, 3))
+            self.vec = np.memmap(self.vec_path, dtype=np.float32, mode="r+",
+                                 shape=(slots, max_vectors, dim))
+            self.state = np.memmap(self.state_path, dtype=np.float32, mode="r+",
+                                   shape=(slots, STATE_ROWS, dim))
+
+    @contextmanager
+    def locked(self, exclusive):
+        # flock excludes other processes; the thread lock covers threads of
+        # this process, which share the same open file description.
+        with self.thread_lock:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+
+class MmapSessionStore:
+    """
+    Fixed-size float32 ring buffers in memory-mapped shard files.
+
+    Each shard holds ``slots`` sessions; a slot is a header row
+    ``(session_id, count, last_used)``, a ``(max_vectors, dim)`` ring and
+    a ``(2, dim)`` drift state (EMA centroid, window sum).
+    Sessions map to shards by id, and to slots through a scan of the
+    header (backed by an in-process LRU of hot session -> slot entries).
+    When a shard is full, idle slots are reused first, then the least
+    recently used one. Every access takes an flock on the shard, so
+    several uvicorn workers on one host can share the files.
+    """
+
+    def __init__(self, directory=SESSION_STORE_DIR, shards=SESSION_STORE_SHARDS,
+                 slots=SESSION_STORE_SLOTS, max_vectors=SESSION_MAX_VECTORS,
+                 dim=EMBEDDING_DIM, idle_ttl=SESSION_IDLE_TTL, hot_cache=SESSION_HOT_CACHE):
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.max_vectors = max_vectors
+        self.idle_ttl = idle_ttl
+        self.shards = [
+            _Shard(directory, i, slots, max_vectors, dim)
+            for i in range(shards)
+        ]
+        self.hot = OrderedDict()
+        self.hot_size = hot_cache
+        self.hot_lock = threading.Lock()
+
+    def _shard(self, session_id):
+        return self.shards[int(session_id) % len(self.shards)]
+
+    def _remember(self, session_id, slot):
+        with self.hot_lock:
+            self.hot[session_id] = slot
+            self.hot.move_to_end(session_id)
+            while len(self.hot) > self.hot_size:
+                self.hot.popitem(last=False)
+
+    def _find_slot(self, shard, session_id):
+        # Must be called with the shard locked.
+        with self.hot_lock:
+            slot = self.hot.get(session_id)
+
+        # Another worker may have evicted and reused the slot.
+        if slot is not None and shard.idx[slot, SID] == session_id:
+            return slot
+
+        matches = np.flatnonzero(shard.idx[:, SID] == float(session_id))
+        if matches.size == 0:
+            return None
+
+        slot = int(matches[0])
+        self._remember(session_id, slot)
+        return slot
+
+    def _allocate(self, shard, session_id, now):
+        header = shard.idx
+        free = np.flatnonzero(
+            (header[:, SID] == EMPTY) | (now - header[:, LAST_USED] > self.idle_ttl)
+        )
+        slot = int(free[0]) if free.size else int(np.argmin(header[:, LAST_USED]))
+
+        header[slot] = (float(session_id), 0.0, now)
+        self._remember(session_id, slot)
+        return slot
+
+    @contextmanager
+    def session(self, session_id):
+        """Exclusive, read-modify-write access to one session's slot."""
+
+        shard = self._shard(session_id)
+        now = time.time()
+
+        with shard.locked(exclusive=True):
+            slot = self._find_slot(shard, session_id)
+            if slot is None:
+                slot = self._allocate(shard, session_id, now)
+
+            view = SessionSlot(shard.vec[slot], int(shard.idx[slot, COUNT]), shard.state[slot])
+            yield view
+
+            shard.idx[slot, COUNT] = view.count
+            shard.idx[slot, LAST_USED] = now
+
+    def append(self, session_id, vector):
+        with self.session(session_id) as slot:
+            slot.push(vector)
+
+    def last(self, session_id):
+        shard = self._shard(session_id)
+
+        with shard.locked(exclusive=False):
+            slot = self._find_slot(shard, session_id)
+            if slot is None:
+                return None
+
+            count = int(shard.idx[slot, COUNT])
+            if count == 0:
+                return None
+            return np.array(shard.vec[slot, (count - 1) % self.max_vectors])
+
+    def get(self, session_id):
+        shard = self._shard(session_id)
+
+        with shard.locked(exclusive=False):
+            slot = self._find_slot(shard, session_id)
+            if slot is None:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            return _ordered(shard.vec[slot], int(shard.idx[slot, COUNT]))
+
+    def clear(self, session_id):
+        shard = self._shard(session_id)
+
+        with shard.locked(exclusive=True):
+            slot = self._find_slot(shard, session_id)
+            if slot is not None:
+                shard.idx[slot] = (EMPTY, 0.0, 0.0)
+
+        with self.hot_lock:
+            self.hot.pop(session_id, None)
+
+
+def _ordered(ring, count):
+    """Return the filled part of a ring buffer, oldest vector first."""
+    size = ring.shape[0]
+    if count <= size:
+        return np.array(ring[:count])
+    start = count % size
+    return np.concatenate([ring[start:], ring[:start]])
+
+
+def create_session_store(backend=SESSION_STORE_BACKEND, **kwargs):
+    if backend == "mmap":
+        return MmapSessionStore(**kwargs)
+    if backend == "memory":
+        return MemorySessionStore(**kwargs)
+    raise ValueError(f"Unknown session store backend: {backend}")